@@ -4,18 +4,25 @@ Tienda Pago RAG Agent - Main agent implementation.
 Implements a RAG workflow with semantic routing for Tienda Pago knowledge base.
 Uses LangGraph to manage the state graph.
 """
+import asyncio
+import time
+from typing import Any, Dict
+
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
 from langchain_core.messages import AIMessage, HumanMessage
 
 from agents.state import AgentState
+from agents.profiles import NodeStats, TurnPolicy, node_stats
 from agents.prompts import (
     ROUTER_SYSTEM_PROMPT,
     GENERATOR_SYSTEM_PROMPT,
     FALLBACK_PROMPT,
     HUMANIZE_PROMPT
 )
-from db.models import SessionLocal
+from db.models import ChatHistory, ReadSessionLocal
 from db.repository import KnowledgeBaseRepository
+from db.search_index import BM25Index, get_knowledge_index
 
 
 class TiendapagoAgent:
@@ -26,19 +33,48 @@ class TiendapagoAgent:
     START → router_node → [conditional]
                           ├─ doc_id_match → retriever_node → generator_node → END
                           └─ no match → fallback_node → END
+
+    Executors:
+    - "graph": compiled LangGraph workflow
+    - "direct": the same nodes as plain calls over AgentState (no graph runtime)
+
+    Model tiering: each node calls the model of the profile chosen by the
+    TurnPolicy (router, generator, fallback, trivial); trivial turns skip the
+    router and answer with the trivial profile.
     """
 
-    def __init__(self, model):
+    EXECUTORS = ("graph", "direct")
+
+    def __init__(self, model, index: BM25Index = None, router_top_k: int = 5,
+                 chat_history: ChatHistory = None, executor: str = "graph",
+                 models: Dict[str, Any] = None, policy: TurnPolicy = None, stats: NodeStats = None):
         """
         Initialize Tienda Pago Agent.
 
         Args:
-            model: LangChain model instance (e.g., ChatOpenAI)
+            model: LangChain model instance (e.g., ChatOpenAI), used by any
+                profile missing from `models`
+            index: Search index over the knowledge base (shared one if None)
+            router_top_k: Maximum number of documents shown to the router
+            chat_history: History of this conversation (process-wide FIFO if None)
+            executor: "graph" (LangGraph) or "direct" (plain calls, same results)
+            models: Model per profile name (see agents.profiles.build_models)
+            policy: Picks the profile of each node call (TurnPolicy() if None)
+            stats: Per-node latency/token recorder (process-wide one if None)
         """
         if model is None:
             raise ValueError("Model is required.")
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor}")
         
         self.model = model
+        self.index = index or get_knowledge_index()
+        self.router_top_k = router_top_k
+        self.chat_history = chat_history
+        self.executor = executor
+        self.models = models or {}
+        self.policy = policy or TurnPolicy()
+        self.stats = stats or node_stats
         self.workflow = self._build_workflow()
         self.workflow.name = "tiendapago_rag_agent"
 
@@ -47,22 +83,45 @@ class TiendapagoAgent:
         """Get compiled workflow graph."""
         return self.workflow
 
+    def _history(self) -> ChatHistory:
+        """In-memory FIFO of this conversation."""
+        if self.chat_history is not None:
+            return self.chat_history
+        from db.models import chat_history
+        return chat_history
+
     def _load_chat_history(self) -> str:
         """Load recent conversation history from in-memory FIFO."""
-        from db.models import chat_history
-        return chat_history.get_formatted()
+        return self._history().get_formatted()
 
-    def _get_available_contexts(self) -> str:
-        """Get all document summaries for router."""
-        with SessionLocal() as session:
-            repo = KnowledgeBaseRepository(session)
-            summaries = repo.get_all_summaries()
-            
-            contexts = []
-            for doc in summaries:
-                contexts.append(f"- {doc['doc_id']}: {doc['topic_summary']}")
-            
-            return "\n".join(contexts)
+    def _recent_user_messages(self) -> str:
+        """User messages from the in-memory FIFO (follow-up questions fall back to them)."""
+        return " ".join(msg["message"] for msg in self._history().get_history() if msg["role"] == "human")
+
+    def _invoke(self, node: str, question: str, messages: list):
+        """Call the model of the profile the policy picks for this node and record it."""
+        profile = self.policy.profile_for(node, question)
+        model = self.models.get(profile, self.model)
+        start = time.perf_counter()
+        try:
+            response = model.invoke(messages)
+        except Exception:
+            self.stats.record(node, profile, time.perf_counter() - start, error=True)
+            raise
+        self.stats.record(node, profile, time.perf_counter() - start, response)
+        return response
+
+    def _get_available_contexts(self, question: str) -> str:
+        """Get the summaries of the top-k candidate documents for router."""
+        candidates = self.index.candidates(
+            question, self.router_top_k, fallback_query=self._recent_user_messages()
+        )
+
+        contexts = []
+        for doc_id in candidates:
+            contexts.append(f"- {doc_id}: {self.index.summary(doc_id)}")
+
+        return "\n".join(contexts)
 
     def _router_node(self, state: AgentState) -> dict:
         """
@@ -75,17 +134,30 @@ class TiendapagoAgent:
         
         question = state.get("question", "")
         chat_history = self._load_chat_history()
-        available_contexts = self._get_available_contexts()
+
+        # Greeting/thanks/goodbye: no document can help, skip the LLM call
+        if self.policy.is_trivial(question):
+            print("   Router decidió: none (turno trivial)")
+            self.stats.skip("router", "trivial")
+            return {"doc_id_match": None, "chat_history": [chat_history]}
+
+        available_contexts = self._get_available_contexts(question)
         
         print(f"   Pregunta: {question}")
         print(f"   Contextos: {available_contexts[:100]}...")
+
+        # No candidate shares a term with the question: skip the LLM call
+        if not available_contexts:
+            print("   Router decidió: none (sin candidatos)")
+            self.stats.skip("router", "no_candidates")
+            return {"doc_id_match": None, "chat_history": [chat_history]}
         
         prompt = ROUTER_SYSTEM_PROMPT.format(
             chat_history=f"HISTORIAL:\n{chat_history}",
             available_contexts=available_contexts
         )
         
-        response = self.model.invoke([
+        response = self._invoke("router", question, [
             HumanMessage(content=prompt),
             HumanMessage(content=f"Pregunta del usuario: {question}")
         ])
@@ -93,9 +165,8 @@ class TiendapagoAgent:
         doc_id = response.content.strip().lower()
         print(f"   Router decidió: {doc_id}")
         
-        # Validate doc_id
-        valid_ids = ["finanzas", "operaciones", "bienestar"]
-        if doc_id not in valid_ids:
+        # Validate doc_id against the indexed documents
+        if not self.index.contains(doc_id):
             doc_id = None
         
         return {
@@ -115,7 +186,7 @@ class TiendapagoAgent:
         doc_id = state.get("doc_id_match")
         print(f"   Recuperando documento: {doc_id}")
         
-        with SessionLocal() as session:
+        with ReadSessionLocal() as session:
             repo = KnowledgeBaseRepository(session)
             content = repo.get_document_by_id(doc_id)
         
@@ -143,7 +214,7 @@ class TiendapagoAgent:
             question=question
         )
         
-        response = self.model.invoke([HumanMessage(content=prompt)])
+        response = self._invoke("generator", question, [HumanMessage(content=prompt)])
         final_response = response.content.strip()
         
         print(f"   📢 Respuesta: {final_response}")
@@ -163,7 +234,7 @@ class TiendapagoAgent:
         
         prompt = FALLBACK_PROMPT.format(question=question)
         
-        response = self.model.invoke([HumanMessage(content=prompt)])
+        response = self._invoke("fallback", question, [HumanMessage(content=prompt)])
         final_response = response.content.strip()
         
         print(f"   📢 Fallback: {final_response}")
@@ -229,7 +300,7 @@ class TiendapagoAgent:
         Returns:
             Agent's text response
         """
-        result = await self.workflow.ainvoke({
+        state = {
             "question": message,
             "session_id": "default",
             "chat_history": [],
@@ -237,9 +308,37 @@ class TiendapagoAgent:
             "retrieved_context": "",
             "final_response": "",
             "messages": []
-        })
+        }
+        if self.executor == "direct":
+            # Nodes are blocking (model.invoke, SQLite): one thread hop for the whole turn
+            result = await asyncio.to_thread(self._run_direct, state)
+        else:
+            result = await self.workflow.ainvoke(state)
         return result.get("final_response", "No pude procesar tu mensaje.")
 
+    def _run_direct(self, state: AgentState) -> AgentState:
+        """
+        Run the workflow as plain function calls.
+
+        Same nodes, routing and state merge as the compiled graph, without
+        its channels, reducers and checkpointing.
+        """
+        state = self._apply_update(state, self._router_node(state))
+        if self._route_after_router(state) == "retriever":
+            state = self._apply_update(state, self._retriever_node(state))
+            state = self._apply_update(state, self._generator_node(state))
+        else:
+            state = self._apply_update(state, self._fallback_node(state))
+        return state
+
+    @staticmethod
+    def _apply_update(state: AgentState, update: dict) -> AgentState:
+        """Merge a node update like the graph: last value wins, messages use add_messages."""
+        merged = {**state, **update}
+        if "messages" in update:
+            merged["messages"] = add_messages(state.get("messages", []), update["messages"])
+        return merged
+
 
 # Alias for backwards compatibility
 LibreraAgent = TiendapagoAgent
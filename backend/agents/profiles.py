@@ -0,0 +1,174 @@
+"""
+LLM invocation profiles per agent node, cheap-turn policy and per-node metrics.
+
+Each node of TiendapagoAgent (router, generator, fallback) calls the model
+through a profile: model name, max output tokens, reasoning effort,
+temperature and timeout. TurnPolicy picks the profile for every call and
+sends trivial turns (greetings, thanks, goodbyes) straight to the cheapest
+one without a router call. NodeStats records latency and token usage per
+node and profile; it is served under "agent" in GET /metrics.
+"""
+import json
+import re
+import threading
+import unicodedata
+from collections import deque
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, Optional
+
+NODES = ("router", "generator", "fallback")
+# Profile used for trivial turns (greetings, thanks, goodbyes)
+TRIVIAL_PROFILE = "trivial"
+
+
+@dataclass(frozen=True)
+class LLMProfile:
+    """How a node invokes the model. None leaves the provider default."""
+    model: str = "gpt-5-nano"
+    max_tokens: Optional[int] = None
+    reasoning_effort: Optional[str] = None
+    temperature: Optional[float] = None
+    timeout: Optional[float] = None
+
+    def build(self, api_key: str = None):
+        """Chat model configured with this profile."""
+        from langchain_openai import ChatOpenAI
+
+        options = {key: value for key, value in asdict(self).items() if value is not None}
+        return ChatOpenAI(api_key=api_key, max_retries=1, **options)
+
+
+# The router only emits a doc_id label; generator and fallback answer in
+# 1-30 words for voice. max_tokens includes reasoning tokens on gpt-5 models.
+DEFAULT_PROFILES: Dict[str, LLMProfile] = {
+    "router": LLMProfile(max_tokens=64, reasoning_effort="minimal", timeout=10),
+    "generator": LLMProfile(max_tokens=1024, reasoning_effort="low", timeout=20),
+    "fallback": LLMProfile(max_tokens=256, reasoning_effort="minimal", timeout=10),
+    TRIVIAL_PROFILE: LLMProfile(max_tokens=128, reasoning_effort="minimal", timeout=8),
+}
+
+
+def load_profiles(overrides: str = None, model: str = None) -> Dict[str, LLMProfile]:
+    """
+    Default profiles with overrides applied.
+
+    Args:
+        overrides: JSON object {profile: {field: value}}, e.g.
+            '{"generator": {"model": "gpt-5-mini", "reasoning_effort": "minimal"}}'
+        model: Model name for every profile not overriding it
+
+    Raises:
+        ValueError: Unknown profile or field
+    """
+    profiles = dict(DEFAULT_PROFILES)
+    if model:
+        profiles = {name: replace(profile, model=model) for name, profile in profiles.items()}
+    for name, fields in (json.loads(overrides) if overrides else {}).items():
+        if name not in profiles:
+            raise ValueError(f"Unknown LLM profile: {name}")
+        try:
+            profiles[name] = replace(profiles[name], **fields)
+        except TypeError as e:
+            raise ValueError(f"Invalid fields for LLM profile {name}: {e}") from None
+    return profiles
+
+
+def build_models(profiles: Dict[str, LLMProfile], api_key: str = None) -> Dict[str, Any]:
+    """One chat model per profile (stateless: share them across connections)."""
+    return {name: profile.build(api_key) for name, profile in profiles.items()}
+
+
+# Greetings, thanks and goodbyes only. Answers such as "si", "no", "claro" or
+# "ok" reply to the previous turn and must go through the router with history.
+_TRIVIAL_WORDS = frozenset("""
+    hola holi hey buenas buenos dias tardes noches saludos que tal como estas esta estan va todo
+    gracias muchas mil muy amable adios chao chau hasta luego pronto manana nos vemos bye
+    de nada igualmente
+""".split())
+
+
+class TurnPolicy:
+    """Decides which profile serves each node call."""
+
+    def __init__(self, trivial_max_words: int = 6):
+        """
+        Args:
+            trivial_max_words: Longest message (in words) considered trivial; 0 disables it
+        """
+        self.trivial_max_words = trivial_max_words
+
+    def is_trivial(self, question: str) -> bool:
+        """Short message made only of greeting/courtesy words."""
+        text = unicodedata.normalize("NFKD", question.lower())
+        text = "".join(char for char in text if not unicodedata.combining(char))
+        words = re.findall(r"[a-zñ]+", text)
+        return 0 < len(words) <= self.trivial_max_words and all(word in _TRIVIAL_WORDS for word in words)
+
+    def profile_for(self, node: str, question: str) -> str:
+        """Profile name for a node call in this turn."""
+        if node == "fallback" and self.is_trivial(question):
+            return TRIVIAL_PROFILE
+        return node
+
+
+class NodeStats:
+    """Per node and profile: calls, errors, latency and token usage; skipped model calls per node."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._window = window
+        self._nodes: Dict[str, dict] = {}
+
+    def record(self, node: str, profile: str, seconds: float, message=None, error: bool = False):
+        """Record one model call; token usage comes from the message usage_metadata."""
+        usage = getattr(message, "usage_metadata", None) or {}
+        reasoning = (usage.get("output_token_details") or {}).get("reasoning") or 0
+        with self._lock:
+            profiles = self._node(node)["profiles"]
+            if profile not in profiles:
+                profiles[profile] = {
+                    "calls": 0, "errors": 0, "latencies": deque(maxlen=self._window),
+                    "input_tokens": 0, "output_tokens": 0, "reasoning_tokens": 0,
+                }
+            entry = profiles[profile]
+            entry["calls"] += 1
+            entry["errors"] += int(error)
+            entry["latencies"].append(seconds)
+            entry["input_tokens"] += usage.get("input_tokens", 0)
+            entry["output_tokens"] += usage.get("output_tokens", 0)
+            entry["reasoning_tokens"] += reasoning
+
+    def skip(self, node: str, reason: str):
+        """Record a node that finished without calling the model."""
+        with self._lock:
+            skipped = self._node(node)["skipped"]
+            skipped[reason] = skipped.get(reason, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                node: {
+                    "skipped": dict(entry["skipped"]),
+                    "profiles": {name: self._summary(stats) for name, stats in entry["profiles"].items()},
+                }
+                for node, entry in self._nodes.items()
+            }
+
+    def _node(self, node: str) -> dict:
+        return self._nodes.setdefault(node, {"skipped": {}, "profiles": {}})
+
+    @staticmethod
+    def _summary(stats: dict) -> dict:
+        ordered = sorted(stats["latencies"])
+        summary = {key: value for key, value in stats.items() if key != "latencies"}
+        if ordered:
+            summary["latency_ms"] = {
+                "mean": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p50": round(ordered[len(ordered) // 2] * 1000, 1),
+                "p95": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1),
+            }
+        return summary
+
+
+# Process-wide stats shared by every agent of the worker
+node_stats = NodeStats()
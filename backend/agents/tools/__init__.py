@@ -3,14 +3,25 @@ Tienda Pago Agent Tools.
 
 Available tools:
 - get_document_by_id: Retrieve full document content by ID
+
+The tools import LangChain's tool machinery, which the graph does not need,
+so they load on first attribute access instead of on package import.
 """
-from agents.tools.get_document import get_document_by_id
+import importlib
 
-ALL_TOOLS = [
-    get_document_by_id,
-]
+_TOOLS = {
+    "get_document_by_id": "agents.tools.get_document",
+}
 
 __all__ = [
     "get_document_by_id",
     "ALL_TOOLS"
 ]
+
+
+def __getattr__(name):
+    if name in _TOOLS:
+        return getattr(importlib.import_module(_TOOLS[name]), name)
+    if name == "ALL_TOOLS":
+        return [__getattr__(tool) for tool in _TOOLS]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,7 +2,7 @@
 Tool for retrieving documents from knowledge base.
 """
 from langchain_core.tools import tool
-from db.models import SessionLocal
+from db.models import ReadSessionLocal
 from db.repository import KnowledgeBaseRepository
 
 
@@ -17,7 +17,7 @@ def get_document_by_id(doc_id: str) -> str:
     Returns:
         Contenido completo del documento, o mensaje de error si no existe
     """
-    with SessionLocal() as session:
+    with ReadSessionLocal() as session:
         repo = KnowledgeBaseRepository(session)
         content = repo.get_document_by_id(doc_id)
         
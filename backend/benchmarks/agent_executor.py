@@ -0,0 +1,111 @@
+"""
+Benchmark: per-turn framework overhead, LangGraph executor vs direct executor.
+
+Usage:
+    python benchmarks/agent_executor.py [--turns 2000]
+
+Runs TiendapagoAgent.process_message with a stub model (instant answers) and
+an in-memory knowledge base, so the measured time is the framework overhead
+of each executor. Half the questions go router → retriever → generator and
+half router → fallback. It also checks that both executors return the same
+final responses and the same message lists.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+
+from agents.agent import TiendapagoAgent
+from db.models import ChatHistory
+from db.search_index import BM25Index
+
+DOCUMENTS = [
+    {"doc_id": "finanzas", "topic_summary": "Ahorro, créditos y deudas.", "full_content": "Guarde el 5% de sus ganancias."},
+    {"doc_id": "operaciones", "topic_summary": "Pagos a proveedores e inventario.", "full_content": "Abra la app y pague."},
+    {"doc_id": "bienestar", "topic_summary": "Manejo del estrés.", "full_content": "Haga una pausa de un minuto."},
+]
+
+QUESTIONS = ["¿Cómo puedo ahorrar dinero?", "¿Cuál es la capital de Francia?"]
+
+
+class StubModel:
+    """Instant model: routes ahorro questions to finanzas, everything else to none"""
+
+    def invoke(self, messages):
+        last = messages[-1].content
+        if last.startswith("Pregunta del usuario:"):
+            return AIMessage(content="finanzas" if "ahorrar" in last else "none")
+        return AIMessage(content="Respuesta corta.")
+
+
+class InMemoryAgent(TiendapagoAgent):
+    """Retriever served from memory: no SQLite in the measured path"""
+
+    def _retriever_node(self, state):
+        content = next(doc["full_content"] for doc in DOCUMENTS if doc["doc_id"] == state.get("doc_id_match"))
+        return {"retrieved_context": content}
+
+
+async def time_turns(agent: TiendapagoAgent, turns: int) -> list:
+    latencies = []
+    for i in range(turns):
+        start = time.perf_counter()
+        await agent.process_message(QUESTIONS[i % len(QUESTIONS)])
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def check_equivalence(index: BM25Index):
+    """Both executors: same final response, same message contents, same doc_id."""
+    graph = InMemoryAgent(StubModel(), index=index, chat_history=ChatHistory(), executor="graph")
+    direct = InMemoryAgent(StubModel(), index=index, chat_history=ChatHistory(), executor="direct")
+    for question in QUESTIONS:
+        state = {"question": question, "session_id": "default", "chat_history": [], "doc_id_match": None,
+                 "retrieved_context": "", "final_response": "", "messages": []}
+        graph_result = graph.workflow.invoke(dict(state))
+        direct_result = direct._run_direct(dict(state))
+        for key in ("final_response", "doc_id_match", "retrieved_context", "chat_history"):
+            assert graph_result[key] == direct_result[key], (key, graph_result[key], direct_result[key])
+        assert [m.content for m in graph_result["messages"]] == [m.content for m in direct_result["messages"]]
+    print("✅ Mismos resultados con ambos ejecutores\n")
+
+
+async def run(turns: int):
+    index = BM25Index(DOCUMENTS)
+    check_equivalence(index)
+
+    # Quiet node logs while timing
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        results = {}
+        for executor in TiendapagoAgent.EXECUTORS:
+            agent = InMemoryAgent(StubModel(), index=index, chat_history=ChatHistory(), executor=executor)
+            await time_turns(agent, 50)  # warm up
+            results[executor] = await time_turns(agent, turns)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    for executor, latencies in results.items():
+        ordered = sorted(latencies)
+        print(f"{executor:<8} mean {statistics.mean(latencies) * 1e6:8.1f} µs   "
+              f"p50 {ordered[len(ordered) // 2] * 1e6:8.1f} µs   p99 {ordered[int(0.99 * (len(ordered) - 1))] * 1e6:8.1f} µs")
+    speedup = statistics.mean(results["graph"]) / statistics.mean(results["direct"])
+    print(f"\ndirect es {speedup:.1f}x más rápido por turno (overhead del framework)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LangGraph vs direct executor overhead")
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.turns))
+
+
+if __name__ == "__main__":
+    main()
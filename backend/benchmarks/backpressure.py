@@ -0,0 +1,148 @@
+"""
+Benchmark: outbound queue behaviour with a slow consumer.
+
+Usage:
+    python benchmarks/backpressure.py [--turns 12] [--read-interval 0.5] [--audio-kb 400]
+
+A real WebSocketHandler (stub agent, answers served from an in-memory speech
+bundle, so no TTS/visemas services) talks to a client on a throttled link:
+small socket buffers on both ends and one frame read every `--read-interval`
+seconds, like a merchant on 3G. The client fires `--turns` messages at once.
+
+For each outbound configuration it reports:
+
+- handler ms/turn: time the handler spends per turn (it never waits for the socket)
+- peak buffered: max bytes pending for the connection (queue + transport)
+- delivered / dropped frames, and whether the connection was closed as a slow consumer
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+
+import outbound
+from db.models import ChatHistory, DatabaseManager
+from main import WebSocketHandler
+from vox.bundle import SpeechBundle
+
+ANSWER = "Respuesta de prueba con audio largo."
+LINK_BUFFER = 16 * 1024
+
+
+class StubAgent:
+    async def process_message(self, message: str) -> str:
+        return ANSWER
+
+
+class NullDatabase(DatabaseManager):
+    async def save_conversation(self, user_message: str, agent_response: str):
+        pass
+
+
+def speech_bundle(audio_kb: int) -> SpeechBundle:
+    audio = base64.b64encode(os.urandom(audio_kb * 1024 * 3 // 4)).decode()
+    visemas = [{"visema": "aa" if i % 2 else "oh", "tiempo": round(i * 0.05, 2)} for i in range(100)]
+    return SpeechBundle({"entries": {ANSWER: {"audio_base64": audio, "audio_format": "wav", "visemas": visemas}}})
+
+
+async def run_scenario(config: dict, args) -> dict:
+    bundle = speech_bundle(args.audio_kb)
+    turn_seconds, queues = [], []
+
+    class TimedHandler(WebSocketHandler):
+        async def main(self, *a, **kw):
+            start = time.perf_counter()
+            await super().main(*a, **kw)
+            turn_seconds.append(time.perf_counter() - start)
+
+    async def handler(websocket):
+        # Slow link: small kernel send buffer on the server side
+        websocket.transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, LINK_BUFFER)
+        ws_handler = TimedHandler(StubAgent(), NullDatabase(ChatHistory()), websocket, bundle)
+        ws_handler.outbound = outbound.OutboundQueue(websocket, **config)
+        queues.append(ws_handler.outbound)
+        await ws_handler.handler()
+
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")  # handler logs
+    try:
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            sock = socket.socket()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, LINK_BUFFER)
+            sock.connect(("127.0.0.1", port))
+            delivered, closed = [], None
+            peak = 0
+            async with websockets.connect(f"ws://127.0.0.1:{port}", sock=sock, max_size=None,
+                                          max_queue=1) as ws:
+                for turn in range(args.turns):
+                    await ws.send(json.dumps({"message": "hola", "id": f"t{turn}"}))
+                deadline = time.monotonic() + args.turns * args.read_interval + 5
+                while time.monotonic() < deadline and len(delivered) < args.turns:
+                    if queues:
+                        peak = max(peak, queues[0].buffered_bytes())
+                    try:
+                        frame = json.loads(await asyncio.wait_for(ws.recv(), args.read_interval * 4))
+                    except asyncio.TimeoutError:
+                        continue
+                    except websockets.ConnectionClosed as e:
+                        closed = e.rcvd.code if e.rcvd else "abort"
+                        break
+                    delivered.append(frame.get("message_id"))
+                    await asyncio.sleep(args.read_interval)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    queue = queues[0]
+    return {
+        "turn_ms": statistics.mean(turn_seconds) * 1000 if turn_seconds else 0.0,
+        "peak": max(peak, queue.peak_bytes),
+        "delivered": delivered,
+        "dropped": queue.dropped_frames,
+        "closed": closed,
+    }
+
+
+async def run(args):
+    unbounded = 1 << 40
+    scenarios = {
+        "sin límite": {"high_watermark": unbounded, "low_watermark": unbounded, "max_bytes": unbounded},
+        "drop": {"high_watermark": args.high_kb * 1024, "low_watermark": args.low_kb * 1024,
+                 "max_bytes": args.max_kb * 1024, "policy": "drop"},
+        "close": {"high_watermark": args.high_kb * 1024, "low_watermark": args.low_kb * 1024,
+                  "max_bytes": args.max_kb * 1024, "policy": "close"},
+    }
+    print(f"{args.turns} turnos de ~{args.audio_kb} KiB, cliente lee 1 frame cada {args.read_interval:g} s, "
+          f"high/low/max {args.high_kb}/{args.low_kb}/{args.max_kb} KiB\n")
+    print(f"{'config':<11} {'handler ms/turno':>16} {'pico pendiente':>15} {'entregados':>10} {'descartados':>11}  cierre")
+    for name, config in scenarios.items():
+        result = await run_scenario(config, args)
+        print(f"{name:<11} {result['turn_ms']:>16.2f} {result['peak'] / 1024:>12.0f} KiB "
+              f"{len(result['delivered']):>10} {result['dropped']:>11}  {result['closed'] or '-'}")
+        if result["delivered"]:
+            print(f"{'':<11} turnos recibidos: {', '.join(result['delivered'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outbound queue with a slow consumer")
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--read-interval", type=float, default=0.5)
+    parser.add_argument("--audio-kb", type=int, default=400)
+    parser.add_argument("--high-kb", type=int, default=1024)
+    parser.add_argument("--low-kb", type=int, default=256)
+    parser.add_argument("--max-kb", type=int, default=4096)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
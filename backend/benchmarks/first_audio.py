@@ -0,0 +1,137 @@
+"""
+Benchmark: time to first audio with frame protocol v1 vs v2.
+
+Usage:
+    python benchmarks/first_audio.py [--turns 20] [--tts-ms 400] [--visemas-ms 150] [--save-ms 30]
+
+A real WebSocketHandler answers through stub agent, TTS, visemas client and
+database, each sleeping for the given latency (no external services). The
+client sends one message at a time and measures, per protocol version:
+
+- first audio: message sent -> frame carrying audio_base64 received
+- visemas: message sent -> visemas available (same frame in v1, own frame in v2)
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+
+import protocol
+from db.models import ChatHistory, DatabaseManager
+from main import WebSocketHandler
+
+ANSWER = "Claro, con gusto le ayudo con su pedido."
+
+
+def silent_wav(seconds: float = 2.0, rate: int = 16000) -> str:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\0\0" * int(seconds * rate))
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class StubAgent:
+    async def process_message(self, message: str) -> str:
+        return ANSWER
+
+
+class SlowDatabase(DatabaseManager):
+    def __init__(self, seconds: float):
+        super().__init__(ChatHistory())
+        self.seconds = seconds
+
+    async def save_conversation(self, user_message: str, agent_response: str):
+        await asyncio.sleep(self.seconds)
+
+
+class StubTTS:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.audio = silent_wav()
+
+    async def speech_to_text(self, text: str) -> dict:
+        await asyncio.sleep(self.seconds)
+        return {"audio_url": "http://tts.local/voice/1", "audio_base64": self.audio, "audio_format": "wav"}
+
+
+class StubVisemas:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def generate_visemes(self, text: str, audio_url: str, duration: float = None,
+                               audio_path: str = None) -> dict:
+        await asyncio.sleep(self.seconds)
+        return {"visemas": [{"visema": "aa", "tiempo": round(i * 0.1, 1)} for i in range(20)]}
+
+
+async def run_version(version: int, args) -> dict:
+    async def handler(websocket):
+        ws_handler = WebSocketHandler(StubAgent(), SlowDatabase(args.save_ms / 1000), websocket)
+        ws_handler.tts_model = StubTTS(args.tts_ms / 1000)
+        ws_handler.visemas_model = StubVisemas(args.visemas_ms / 1000)
+        await ws_handler.handler()
+
+    first_audio, visemas = [], []
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")  # handler logs
+    try:
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            async with websockets.connect(f"ws://127.0.0.1:{port}", max_size=None) as ws:
+                for turn in range(args.turns):
+                    message = {"message": "hola", "id": f"t{turn}"}
+                    if version >= protocol.PROTOCOL_V2:
+                        message["protocol"] = version
+                    start = time.perf_counter()
+                    await ws.send(json.dumps(message))
+                    while True:
+                        frame = json.loads(await ws.recv())
+                        elapsed = time.perf_counter() - start
+                        if "audio_base64" in frame:
+                            first_audio.append(elapsed)
+                        if "visemas" in frame or "visemas_compact" in frame:
+                            visemas.append(elapsed)
+                            break
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return {"first_audio": first_audio, "visemas": visemas}
+
+
+def summary(values: list) -> str:
+    ordered = sorted(values)
+    return f"{statistics.median(ordered) * 1000:>8.1f} {ordered[int(0.95 * (len(ordered) - 1))] * 1000:>8.1f}"
+
+
+async def run(args):
+    print(f"{args.turns} turnos; TTS {args.tts_ms} ms, visemas {args.visemas_ms} ms, guardado {args.save_ms} ms\n")
+    print(f"{'protocolo':<10} {'1er audio p50':>13} {'p95':>8} {'visemas p50':>13} {'p95':>8}")
+    for version in (protocol.PROTOCOL_V1, protocol.PROTOCOL_V2):
+        result = await run_version(version, args)
+        print(f"v{version:<9} {summary(result['first_audio']):>22}  {summary(result['visemas']):>21}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first audio, frame protocol v1 vs v2")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--tts-ms", type=float, default=400)
+    parser.add_argument("--visemas-ms", type=float, default=150)
+    parser.add_argument("--save-ms", type=float, default=30)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
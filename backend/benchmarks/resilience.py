@@ -0,0 +1,271 @@
+"""
+Benchmark: deadlines, hedging y circuit breaker contra servicios falsos.
+
+Usage:
+    python benchmarks/resilience.py [--requests 200] [--slow-rate 0.05] [--checks-only]
+
+Levanta en local un TTS y un servicio de visemas falsos (aiohttp.web) y luego
+una ventana de errores. La latencia de cola (una fracción de peticiones tarda
+mucho) se inyecta en visemas, el servicio con hedge en main.py (TTS_HEDGE=0):
+compara p50/p99 de los clientes reales sin y con hedging, y muestra cómo el
+circuit breaker corta las llamadas mientras el servicio está caído y se
+recupera después.
+
+Antes corre comprobaciones deterministas contra los mismos servicios falsos
+(sale con error si alguna falla): deadline, hedge tras el percentil y no
+antes de tener muestras, breaker que abre con 5xx, no abre con 4xx y cierra
+tras reset_timeout.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resilience import CircuitOpenError, ResilientCaller, UpstreamHTTPError, UpstreamTimeoutError
+from transport import close_endpoints
+from visemas.librosa_client import LibrosaClient
+from vox.xtts_client import XTTSClient
+
+FAKE_WAV = b"RIFF" + b"\x00" * 40 + b"\x00\x01" * 1000
+
+
+class FakeUpstream:
+    """Latencia base + cola lenta + modo caído, configurable en caliente"""
+
+    def __init__(self, base: float, slow: float, slow_rate: float, seed: int):
+        self.base = base
+        self.slow = slow
+        self.slow_rate = slow_rate
+        self.down = False
+        self.bad_request = False
+        self.slow_next = 0  # próximas peticiones lentas (comprobaciones deterministas)
+        self.requests = 0
+        self._rng = random.Random(seed)
+
+    async def delay(self):
+        self.requests += 1
+        if self.down:
+            raise web.HTTPServiceUnavailable()
+        if self.bad_request:
+            raise web.HTTPBadRequest()
+        if self.slow_next:
+            self.slow_next -= 1
+            await asyncio.sleep(self.slow)
+            return
+        slow = self._rng.random() < self.slow_rate
+        await asyncio.sleep(self.slow if slow else self.base)
+
+
+async def start_fakes(tts: FakeUpstream, visemas: FakeUpstream):
+    async def generate_tts(request):
+        await tts.delay()
+        return web.Response(body=FAKE_WAV, content_type="audio/wav", headers={
+            "X-Audio-Url": "http://localhost/voice/fake.wav",
+            "X-Audio-Format": "wav",
+        })
+
+    async def generate_visemas(request):
+        await visemas.delay()
+        return web.json_response({"visemas": [{"visema": "A", "tiempo": 0.0}]})
+
+    app = web.Application()
+    app.router.add_post("/generate", generate_tts)
+    visemas_app = web.Application()
+    visemas_app.router.add_post("/generate", generate_visemas)
+
+    runners = []
+    for application in (app, visemas_app):
+        runner = web.AppRunner(application)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        runners.append(runner)
+    ports = [runner.addresses[0][1] for runner in runners]
+    return runners, ports
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_turns(tts_client: XTTSClient, visemas_client: LibrosaClient, count: int,
+                    concurrency: int = 8) -> dict:
+    """Turnos TTS + visemas como en WebSocketHandler._parallel1"""
+    latencies, errors = [], {"timeout": 0, "circuit_open": 0, "other": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def turn():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                tts_result = await tts_client.speech_to_text("hola")
+                await visemas_client.generate_visemes("hola", tts_result["audio_url"])
+                latencies.append(time.perf_counter() - start)
+            except UpstreamTimeoutError:
+                errors["timeout"] += 1
+            except CircuitOpenError:
+                errors["circuit_open"] += 1
+            except Exception:
+                errors["other"] += 1
+
+    await asyncio.gather(*(turn() for _ in range(count)))
+    return {"latencies": latencies, "errors": errors}
+
+
+def report(label: str, result: dict, callers: list = ()):
+    latencies = result["latencies"]
+    line = f"{label:<16}"
+    if latencies:
+        line += (f" p50 {percentile(latencies, 50) * 1000:7.1f} ms"
+                 f"  p99 {percentile(latencies, 99) * 1000:7.1f} ms")
+    line += f"  ok {len(latencies):4d}  errores {result['errors']}"
+    print(line)
+    for caller in callers:
+        stats = caller.stats()
+        print(f"    {caller.name:<8} hedges {stats['hedges']:3d}  ganados {stats['hedge_wins']:3d}"
+              f"  breaker {stats['breaker']}")
+
+
+async def expect(error: type, coroutine) -> float:
+    """Segundos hasta que coroutine lanza error (AssertionError si no lo lanza)"""
+    start = time.perf_counter()
+    try:
+        await coroutine
+    except error:
+        return time.perf_counter() - start
+    raise AssertionError(f"se esperaba {error.__name__}")
+
+
+async def check(visemas: FakeUpstream, visemas_url: str):
+    """Comprobaciones deterministas contra el servicio de visemas falso (base 20 ms, lenta 500 ms)"""
+    def client(caller: ResilientCaller) -> LibrosaClient:
+        return LibrosaClient(visemas_url, caller=caller)
+
+    async def call(caller: ResilientCaller):
+        return await client(caller).generate_visemes("hola", "http://localhost/voice/fake.wav")
+
+    slow_rate, visemas.slow_rate = visemas.slow_rate, 0.0
+    try:
+        # Deadline: una llamada lenta se corta en timeout, no cuando responde el servicio
+        caller = ResilientCaller("deadline", timeout=0.1, hedge=False)
+        visemas.slow_next = 1
+        elapsed = await expect(UpstreamTimeoutError, call(caller))
+        assert elapsed < visemas.slow / 2, f"deadline de 0.1 s cortó a los {elapsed:.3f} s"
+        assert caller.stats()["timeouts"] == 1
+        print(f"✅ deadline: cortada a los {elapsed * 1000:.0f} ms")
+
+        # Sin muestras suficientes no hay hedge aunque la primera llamada sea lenta
+        caller = ResilientCaller("hedge", timeout=2.0, hedge_min_samples=5)
+        visemas.slow_next = 1
+        await call(caller)
+        assert caller.stats()["hedges"] == 0, caller.stats()
+
+        # Con muestras (rápidas), una llamada lenta dispara el hedge, que gana
+        caller = ResilientCaller("hedge", timeout=2.0, hedge_min_samples=5)
+        for _ in range(5):
+            await call(caller)
+        assert caller.hedge_delay() is not None
+        visemas.slow_next = 1
+        start = time.perf_counter()
+        await call(caller)
+        elapsed = time.perf_counter() - start
+        stats = caller.stats()
+        assert stats["hedges"] == 1 and stats["hedge_wins"] == 1, stats
+        assert elapsed < visemas.slow / 2, f"el hedge no acortó la llamada ({elapsed:.3f} s)"
+        print(f"✅ hedge: tras {stats['hedge_delay'] * 1000:.0f} ms, respuesta en {elapsed * 1000:.0f} ms")
+
+        # 4xx: error de la petición, el breaker sigue cerrado
+        caller = ResilientCaller("breaker", timeout=2.0, hedge=False, failure_threshold=3, reset_timeout=0.3)
+        visemas.bad_request = True
+        for _ in range(5):
+            await expect(UpstreamHTTPError, call(caller))
+        visemas.bad_request = False
+        assert caller.breaker.state == "closed", caller.stats()
+        assert caller.stats()["client_errors"] == 5
+
+        # 5xx: abre tras failure_threshold fallos y deja de llamar al servicio
+        visemas.down = True
+        for _ in range(3):
+            await expect(UpstreamHTTPError, call(caller))
+        assert caller.breaker.state == "open", caller.stats()
+        before = visemas.requests
+        await expect(CircuitOpenError, call(caller))
+        assert visemas.requests == before, "llamada al servicio con el circuito abierto"
+        print("✅ breaker: 5 respuestas 4xx no lo abren, 3 respuestas 5xx sí")
+
+        # Recuperación: tras reset_timeout una llamada de prueba lo cierra
+        visemas.down = False
+        await asyncio.sleep(0.35)
+        await call(caller)
+        assert caller.breaker.state == "closed", caller.stats()
+        print("✅ breaker: cerrado tras reset_timeout con una llamada de prueba\n")
+    finally:
+        visemas.slow_rate = slow_rate
+
+
+async def run(args):
+    # Sin cola en TTS: sin hedge (como en main.py) no habría nada que comparar
+    tts = FakeUpstream(base=0.05, slow=1.0, slow_rate=0.0, seed=1)
+    visemas = FakeUpstream(base=0.02, slow=0.5, slow_rate=args.slow_rate, seed=2)
+    runners, (tts_port, visemas_port) = await start_fakes(tts, visemas)
+    tts_url, visemas_url = f"http://127.0.0.1:{tts_port}", f"http://127.0.0.1:{visemas_port}"
+
+    try:
+        await check(visemas, visemas_url)
+        if args.checks_only:
+            return
+
+        # 1) Sin resiliencia (llamada directa)
+        plain = await run_turns(XTTSClient(tts_url), LibrosaClient(visemas_url), args.requests)
+        report("sin hedging", plain)
+
+        # 2) Con deadline + hedging (en TTS no, como en main.py: ver TTS_HEDGE)
+        tts_caller = ResilientCaller("tts", timeout=3.0, hedge=False)
+        visemas_caller = ResilientCaller("visemas", timeout=2.0, hedge_min_samples=10)
+        tts_client = XTTSClient(tts_url, caller=tts_caller)
+        visemas_client = LibrosaClient(visemas_url, caller=visemas_caller)
+        hedged = await run_turns(tts_client, visemas_client, args.requests)
+        report("con hedging", hedged, (tts_caller, visemas_caller))
+        if plain["latencies"] and hedged["latencies"]:
+            before, after = percentile(plain["latencies"], 99), percentile(hedged["latencies"], 99)
+            print(f"    p99 {before * 1000:.0f} ms → {after * 1000:.0f} ms ({(1 - after / before) * 100:.0f}% menos)")
+
+        # 3) Servicio de visemas caído: el breaker abre y deja de llamarlo
+        breaker_caller = ResilientCaller("visemas", timeout=2.0, failure_threshold=5, reset_timeout=0.5)
+        visemas_client = LibrosaClient(visemas_url, caller=breaker_caller)
+        visemas.down = True
+        before = visemas.requests
+        down = await run_turns(tts_client, visemas_client, 50, concurrency=1)
+        report("visemas caído", down, (breaker_caller,))
+        print(f"    peticiones que llegaron al servicio caído: {visemas.requests - before} de 50")
+
+        # 4) Recuperación tras reset_timeout
+        visemas.down = False
+        await asyncio.sleep(0.6)
+        recovered = await run_turns(tts_client, visemas_client, 20, concurrency=1)
+        report("recuperado", recovered, (breaker_caller,))
+    finally:
+        await close_endpoints()
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--slow-rate", type=float, default=0.05,
+                        help="Fracción de peticiones de visemas con latencia de cola")
+    parser.add_argument("--checks-only", action="store_true",
+                        help="Solo las comprobaciones, sin el benchmark")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
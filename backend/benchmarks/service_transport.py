@@ -0,0 +1,175 @@
+"""
+Benchmark: TTS + visemas round trips over loopback TCP, Unix socket and /dev/shm.
+
+Usage:
+    python benchmarks/service_transport.py [--turns 30] [--audio-seconds 4] [--mode audio]
+
+Runs the real visemas service app and a stand-in TTS service (same /generate
+and /voice contract, returns a fixed WAV) in this process, each listening on
+a TCP port and on a Unix socket, and drives them with the backend clients
+(XTTSClient + LibrosaClient) as one turn does:
+
+- tcp: http://127.0.0.1 URLs, audio inline in the TTS response, visemas
+  service downloads audio_url over TCP
+- uds: http+unix:// URLs for both services and for audio_url
+- uds+shm: uds plus the shared audio store: the backend and the visemas
+  service read the WAV from the store directory instead of HTTP bodies
+
+Reports median and p95 per turn for the TTS call, the visemas call and both.
+"""
+import argparse
+import asyncio
+import io
+import math
+import os
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from transport import unix_socket_url
+from visemas.librosa_client import LibrosaClient
+from vox.xtts_client import XTTSClient
+
+TEXT = "Claro, con gusto le ayudo con el pago a sus proveedores."
+SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def speech_wav(seconds: float, rate: int = 24000) -> bytes:
+    """Tone bursts (syllables) with short gaps."""
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        envelope = 1.0 if (t * 5) % 1 < 0.7 else 0.0
+        frames += struct.pack("<h", int(12000 * envelope * math.sin(2 * math.pi * 220 * t)))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def tts_app(wav: bytes, store_dir: str):
+    """Stand-in TTS service: /generate (inline | url | path) and /voice/<filename>."""
+    from flask import Flask, Response, jsonify, request, send_file
+    from unix_socket import base_url
+
+    app = Flask("tts")
+    filename = "0" * 32 + ".wav"
+    with open(os.path.join(store_dir, filename), "wb") as f:
+        f.write(wav)
+
+    @app.post("/generate")
+    def generate():
+        data = request.get_json()
+        server_url = base_url(request.environ) or request.host_url.rstrip("/")
+        audio_url = f"{server_url}/voice/{filename}"
+        audio_path = os.path.join(store_dir, filename) if app.config.get("SHARED") else None
+        if data.get("response_mode") == "inline":
+            return Response(wav, mimetype="audio/wav", headers={"X-Audio-Url": audio_url, "X-Audio-Format": "wav"})
+        result = {"audio_url": audio_url, "audio_format": "wav"}
+        if audio_path:
+            result["audio_path"] = audio_path
+        return jsonify(result)
+
+    @app.get("/voice/<name>")
+    def voice(name):
+        return send_file(os.path.join(store_dir, name), mimetype="audio/wav")
+
+    return app
+
+
+def serve(app, socket_path: str) -> str:
+    """Serve app on a TCP port and on socket_path; returns the TCP base URL."""
+    import threading
+
+    from unix_socket import serve_unix_socket
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    serve_unix_socket(app, socket_path)
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+async def run_transport(tts: XTTSClient, visemas: LibrosaClient, turns: int) -> dict:
+    timings = {"tts": [], "visemas": [], "total": []}
+    for _ in range(turns + 1):
+        start = time.perf_counter()
+        result = await tts.speech_to_text(TEXT)
+        middle = time.perf_counter()
+        await visemas.generate_visemes(TEXT, result["audio_url"], audio_path=result.get("audio_path"))
+        end = time.perf_counter()
+        timings["tts"].append(middle - start)
+        timings["visemas"].append(end - middle)
+        timings["total"].append(end - start)
+    return {name: values[1:] for name, values in timings.items()}  # first turn warms connections
+
+
+def summary(values: list) -> str:
+    ordered = sorted(values)
+    return f"{statistics.median(ordered) * 1000:>7.2f} {ordered[int(0.95 * (len(ordered) - 1))] * 1000:>7.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS + visemas over TCP, Unix socket and /dev/shm")
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--audio-seconds", type=float, default=4.0)
+    parser.add_argument("--mode", choices=("audio", "text"), default="audio",
+                        help="visemas mode (text: header only, transport dominates)")
+    args = parser.parse_args()
+
+    store_dir = tempfile.mkdtemp(prefix="tts_audio_", dir=SHM_DIR)
+    socket_dir = tempfile.mkdtemp(prefix="tiendapago_")
+    os.environ["VISEMAS_SHARED_AUDIO_DIR"] = store_dir
+    os.environ.setdefault("VISEMAS_WARMUP", "0")
+    sys.path.insert(0, os.path.join(ROOT_DIR, "visemas_service"))
+
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")  # service logs
+    try:
+        import logging
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        import app as visemas_service
+
+        tts = tts_app(speech_wav(args.audio_seconds), store_dir)
+        tts_socket = os.path.join(socket_dir, "tts.sock")
+        visemas_socket = os.path.join(socket_dir, "visemas.sock")
+        tts_tcp = serve(tts, tts_socket)
+        visemas_tcp = serve(visemas_service.app, visemas_socket)
+
+        transports = {
+            "tcp": (tts_tcp, visemas_tcp, False),
+            "uds": (unix_socket_url(tts_socket), unix_socket_url(visemas_socket), False),
+            "uds+shm": (unix_socket_url(tts_socket), unix_socket_url(visemas_socket), True),
+        }
+        results = {}
+        for name, (tts_url, visemas_url, shared) in transports.items():
+            tts.config["SHARED"] = shared
+            results[name] = asyncio.run(run_transport(
+                XTTSClient(tts_url, shared_audio=shared), LibrosaClient(visemas_url, mode=args.mode), args.turns
+            ))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        shutil.rmtree(socket_dir, ignore_errors=True)
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    wav_kb = len(speech_wav(args.audio_seconds)) / 1024
+    print(f"{args.turns} turnos, WAV de {args.audio_seconds:g} s ({wav_kb:.0f} KiB), visemas modo {args.mode}, "
+          f"almacén en {SHM_DIR or 'disco'}\n")
+    print(f"{'transporte':<10} {'TTS p50':>9} {'p95':>7} {'visemas p50':>13} {'p95':>7} {'total p50':>11} {'p95':>7}  (ms)")
+    for name, timings in results.items():
+        print(f"{name:<10} {summary(timings['tts']):>17} {summary(timings['visemas']):>21} {summary(timings['total']):>19}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: knowledge-base lookups, default engine + ORM vs read-only engine + raw statements.
+
+Usage:
+    python benchmarks/sqlite_modes.py [--documents 300] [--iterations 2000] [--threads 4]
+
+Builds a temporary database with synthetic documents and times the two hot
+lookups of the agent (get_all_summaries, get_document_by_id), each in a fresh
+session as the agent nodes do:
+
+- orm: default engine, ORM queries hydrating KnowledgeBase objects (previous code)
+- read-only: mode=ro&immutable=1 + mmap engine, raw prepared statements (KnowledgeBaseRepository)
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Base, KnowledgeBase, create_read_only_engine
+from db.repository import KnowledgeBaseRepository
+
+
+def build_database(path: str, documents: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(3)
+    words = "ahorro credito proveedor inventario pago tienda cliente venta deuda estres pausa".split()
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([
+            KnowledgeBase(
+                doc_id=f"doc_{i}",
+                topic_summary=" ".join(rng.choices(words, k=20)),
+                full_content=" ".join(rng.choices(words, k=800))
+            )
+            for i in range(documents)
+        ])
+        session.commit()
+    engine.dispose()
+
+
+def orm_summaries(session):
+    return [{"doc_id": doc.doc_id, "topic_summary": doc.topic_summary} for doc in session.query(KnowledgeBase).all()]
+
+
+def orm_document(session, doc_id):
+    doc = session.query(KnowledgeBase).filter_by(doc_id=doc_id).first()
+    return doc.full_content if doc else None
+
+
+def time_lookups(session_factory, lookup, iterations: int, threads: int) -> list:
+    """Per-call latencies (seconds) of lookup(session, i) with `threads` concurrent workers."""
+    def one(i):
+        start = time.perf_counter()
+        with session_factory() as session:
+            lookup(session, i)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(one, range(iterations)))
+
+
+def report(label: str, latencies: list):
+    ordered = sorted(latencies)
+    p99 = ordered[int(0.99 * (len(ordered) - 1))]
+    print(f"{label:<32} mean {statistics.mean(latencies) * 1e6:8.1f} µs   p99 {p99 * 1e6:8.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite ORM vs read-only raw lookups")
+    parser.add_argument("--documents", type=int, default=300)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_database(path, args.documents)
+
+        default_engine = create_engine(f"sqlite:///{path}")
+        read_only_engine = create_read_only_engine(path, pool_size=args.threads)
+        modes = {
+            "orm": (sessionmaker(bind=default_engine), orm_summaries, orm_document),
+            "read-only": (
+                sessionmaker(bind=read_only_engine),
+                lambda session: KnowledgeBaseRepository(session).get_all_summaries(),
+                lambda session, doc_id: KnowledgeBaseRepository(session).get_document_by_id(doc_id)
+            ),
+        }
+
+        summary_iterations = max(1, args.iterations // 10)
+        print(f"{args.documents} documentos, {args.threads} hilos\n")
+        for name, (factory, summaries, document) in modes.items():
+            # Warm up pools and statement caches
+            time_lookups(factory, lambda s, i: document(s, "doc_0"), 50, args.threads)
+            report(f"{name} get_all_summaries", time_lookups(
+                factory, lambda s, i: summaries(s), summary_iterations, args.threads))
+            report(f"{name} get_document_by_id", time_lookups(
+                factory, lambda s, i: document(s, f"doc_{i % args.documents}"), args.iterations, args.threads))
+
+        default_engine.dispose()
+        read_only_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
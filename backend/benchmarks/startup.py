@@ -0,0 +1,119 @@
+"""
+Benchmark: backend import time and worker startup.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--top 8] [--modules main load_db agents.agent]
+
+Two measurements, each in fresh interpreters:
+
+- import: `python -X importtime -c "import <module>"` per module; reports the
+  median cumulative import time and the slowest top-level packages it pulls in
+- startup: runs main.py on a free port and polls it; reports the time until
+  the port answers HTTP (GET /ready, 503 while warming up) and until /ready
+  returns 200 (database, models, speech bundle and upstream pools warm)
+
+TTS and visemas services do not need to be running: the upstream warm-up marks
+them unavailable and the worker still becomes ready.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_FILE = os.path.join(BACKEND_DIR, "db", "tiendapago.db")
+
+
+def import_times(module: str) -> dict:
+    """{imported module: (self us, cumulative us, depth)} for one fresh `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Indentation of the name is the nesting depth (1: imported by the module itself)
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.setdefault(name.strip(), (int(self_us), int(cumulative_us), depth))
+    return times
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def startup_times(timeout: float) -> tuple:
+    """(seconds until the port answers HTTP, seconds until /ready is 200) for one main.py run."""
+    port = free_port()
+    env = dict(os.environ, WEBSOCKET_HOST="127.0.0.1", WEBSOCKET_PORT=str(port), WEBSOCKET_WORKERS="1")
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    url = f"http://127.0.0.1:{port}/ready"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "main.py"], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    listening = None
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1):
+                    ready = time.perf_counter() - start
+                    return listening or ready, ready
+            except urllib.error.HTTPError:
+                if listening is None:
+                    listening = time.perf_counter() - start
+            except OSError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"main.py terminó con código {process.returncode}")
+            time.sleep(0.01)
+        raise RuntimeError(f"/ready no respondió 200 en {timeout:g} s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend import time (-X importtime) and time to ready")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest packages listed per module")
+    parser.add_argument("--modules", nargs="+", default=["main", "load_db", "agents.agent"])
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    print(f"Imports ({args.runs} intérpretes nuevos por módulo, mediana)\n")
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.runs)]
+        total = statistics.median(run[module][1] for run in runs) / 1000
+        print(f"import {module}: {total:.0f} ms")
+        direct = [(name, statistics.median(run[name][1] for run in runs if name in run) / 1000)
+                  for name, (_, _, depth) in runs[0].items() if depth == 1]
+        for name, cumulative in sorted(direct, key=lambda item: -item[1])[:args.top]:
+            print(f"    {cumulative:>8.1f} ms  {name}")
+        print()
+
+    existed = os.path.exists(DATABASE_FILE)
+    try:
+        results = [startup_times(args.timeout) for _ in range(args.runs)]
+    finally:
+        if not existed and os.path.exists(DATABASE_FILE):
+            os.remove(DATABASE_FILE)  # created by main.py on init
+
+    listening = statistics.median(result[0] for result in results) * 1000
+    ready = statistics.median(result[1] for result in results) * 1000
+    print(f"Arranque de main.py ({args.runs} ejecuciones, mediana)\n")
+    print(f"{'puerto responde':<18} {listening:>8.0f} ms")
+    print(f"{'/ready 200':<18} {ready:>8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
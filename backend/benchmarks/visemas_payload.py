@@ -0,0 +1,60 @@
+"""
+Benchmark: tamaño del payload de visemas (lista clásica vs compact-v1).
+
+Usage:
+    python benchmarks/visemas_payload.py
+
+Genera secuencias sintéticas con la misma cadencia que el servicio de visemas
+(~3 fonemas por segundo de voz, pausas neutrales, repeticiones) y compara el
+tamaño en bytes del JSON, en crudo y con deflate (permessage-deflate de
+websockets está activo por defecto).
+"""
+import json
+import os
+import random
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from visemas.compact import VISEME_CODES, encode_visemes, decode_visemes
+
+
+def synthetic_visemes(seconds: float, seed: int = 7) -> list:
+    """Secuencia de visemas con tiempos redondeados a 10 ms como el servicio"""
+    rng = random.Random(seed)
+    visemas, tiempo = [], 0.0
+    while tiempo < seconds:
+        visema = rng.choice(VISEME_CODES[1:]) if rng.random() > 0.15 else "neutral"
+        visemas.append({"visema": visema, "tiempo": round(tiempo, 2)})
+        if rng.random() < 0.2:
+            # Repetición consecutiva (candidata a run-length)
+            visemas.append({"visema": visema, "tiempo": round(tiempo + 0.12, 2)})
+        tiempo += rng.uniform(0.08, 0.35)
+    return visemas
+
+
+def size(payload) -> int:
+    return len(json.dumps(payload, separators=(", ", ": ")).encode("utf-8"))
+
+
+def deflated(payload) -> int:
+    return len(zlib.compress(json.dumps(payload).encode("utf-8")))
+
+
+def main():
+    print(f"{'audio':>7} {'n':>5} {'json':>8} {'compact':>8} {'ratio':>6} {'json+z':>7} {'comp+z':>7}")
+    for seconds in (2, 5, 15, 30, 60):
+        visemas = synthetic_visemes(seconds)
+        compact = encode_visemes(visemas)
+        assert len(decode_visemes(compact)) <= len(visemas)
+
+        json_bytes, compact_bytes = size(visemas), size(compact)
+        print(
+            f"{seconds:>6}s {len(visemas):>5} {json_bytes:>8} {compact_bytes:>8} "
+            f"{compact_bytes / json_bytes:>6.2f} {deflated(visemas):>7} {deflated(compact):>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Benchmark: connection and turn throughput of the backend vs number of worker processes.
+
+Usage:
+    python benchmarks/workers.py [--workers 1 2 4] [--connections 64] [--turns 10]
+
+For each worker count it starts launcher.Launcher with workers running the real
+WebSocketHandler (stub agent, fake TTS/visemas services on localhost) and
+measures:
+
+- connections/s: WebSocket handshakes completed per second
+- turns/s: message → audio+visemas frame per second, with `--connections`
+  concurrent clients; every turn base64-encodes and JSON-serializes a ~5 s WAV
+  like the real _parallel1
+
+The fake services and the clients run in their own processes so they do not
+compete with the server for the GIL. Scaling is bounded by the cores available.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_RATE = 24000
+AUDIO_SECONDS = 5
+VISEMES = 150
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fake_wav() -> bytes:
+    pcm = b"\x00\x01" * (SAMPLE_RATE * AUDIO_SECONDS)
+    fmt = struct.pack("<IHHIIHH", 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16)
+    return b"RIFF" + struct.pack("<I", 36 + len(pcm)) + b"WAVEfmt " + fmt + b"data" + struct.pack("<I", len(pcm)) + pcm
+
+
+def run_fake_upstreams(tts_port: int, visemas_port: int):
+    """Fake TTS (inline WAV) and visemas services in one process"""
+    from aiohttp import web
+
+    wav = fake_wav()
+    visemas = {"visemas": [{"visema": "A" if i % 2 else "O", "tiempo": round(i * 0.033, 2)} for i in range(VISEMES)]}
+
+    async def tts(request):
+        return web.Response(body=wav, content_type="audio/wav", headers={
+            "X-Audio-Url": f"http://127.0.0.1:{tts_port}/voice/fake.wav", "X-Audio-Format": "wav"})
+
+    async def generate_visemas(request):
+        return web.json_response(visemas)
+
+    async def serve():
+        runners = []
+        for port, handler in ((tts_port, tts), (visemas_port, generate_visemas)):
+            app = web.Application()
+            app.router.add_post("/generate", handler)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", port, reuse_port=True).start()
+            runners.append(runner)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+class StubAgent:
+    """AgentProtocol without LLM calls"""
+
+    async def process_message(self, message: str) -> str:
+        return f"Respuesta de prueba para: {message}"
+
+
+def run_bench_worker(sock, notify_ready):
+    """Launcher worker: real WebSocketHandler with a stub agent"""
+    sys.stdout = open(os.devnull, "w")  # the handler logs every message
+    import websockets
+    from db.models import ChatHistory, DatabaseManager
+    from main import WebSocketHandler
+
+    async def serve():
+        async def handler(websocket):
+            handler = WebSocketHandler(StubAgent(), DatabaseManager(ChatHistory()), websocket)
+            await handler.handler()
+
+        listen = {"sock": sock} if sock is not None else {"host": "127.0.0.1", "port": int(os.environ["BENCH_PORT"]), "reuse_port": True}
+        server = await websockets.serve(handler, **listen)
+        notify_ready()
+        stop = asyncio.get_running_loop().create_future()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set_result, None)
+        await stop
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(serve())
+
+
+def run_launcher(workers: int, port: int, reuse_port: bool):
+    from launcher import Launcher
+
+    os.environ["BENCH_PORT"] = str(port)
+    Launcher(run_bench_worker, workers, "127.0.0.1", port, reuse_port=reuse_port, grace_seconds=2).run()
+
+
+def run_clients(port: int, connections: int, turns: int, results):
+    """One client process: handshakes first, then concurrent turns"""
+    import websockets
+
+    async def measure():
+        url = f"ws://127.0.0.1:{port}"
+
+        start = time.perf_counter()
+        sockets = await asyncio.gather(*(websockets.connect(url, max_size=None) for _ in range(connections)))
+        handshake_seconds = time.perf_counter() - start
+
+        async def conversation(ws, n):
+            for turn in range(turns):
+                await ws.send(json.dumps({"message": f"hola {n}-{turn}", "id": f"{n}-{turn}"}))
+                frame = json.loads(await ws.recv())
+                assert "audio_base64" in frame, frame
+
+        start = time.perf_counter()
+        await asyncio.gather(*(conversation(ws, n) for n, ws in enumerate(sockets)))
+        turn_seconds = time.perf_counter() - start
+
+        await asyncio.gather(*(ws.close() for ws in sockets))
+        results.put((connections, handshake_seconds, connections * turns, turn_seconds))
+
+    asyncio.run(measure())
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Puerto {port} no disponible")
+
+
+def wait_for_server(port: int, timeout: float = 30.0):
+    """Wait for a WebSocket handshake (a bare TCP probe makes the server log handshake errors)"""
+    import websockets
+
+    async def probe():
+        async with websockets.connect(f"ws://127.0.0.1:{port}"):
+            pass
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(probe())
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Servidor en {port} no disponible")
+
+
+def bench(workers: int, args, tts_port: int, visemas_port: int) -> tuple:
+    port = free_port()
+    launcher = multiprocessing.Process(target=run_launcher, args=(workers, port, not args.shared_socket))
+    launcher.start()
+    try:
+        wait_for_server(port)
+        time.sleep(1.0)  # let every worker bind
+        results = multiprocessing.Queue()
+        per_client = max(1, args.connections // args.client_processes)
+        clients = [
+            multiprocessing.Process(target=run_clients, args=(port, per_client, args.turns, results))
+            for _ in range(args.client_processes)
+        ]
+        for client in clients:
+            client.start()
+        measures = [results.get(timeout=300) for _ in clients]
+        for client in clients:
+            client.join()
+    finally:
+        os.kill(launcher.pid, signal.SIGTERM)
+        launcher.join(timeout=10)
+
+    connections = sum(m[0] for m in measures)
+    turns = sum(m[2] for m in measures)
+    return connections / max(m[1] for m in measures), turns / max(m[3] for m in measures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend throughput vs worker processes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--client-processes", type=int, default=2)
+    parser.add_argument("--shared-socket", action="store_true", help="Socket heredado en vez de SO_REUSEPORT")
+    args = parser.parse_args()
+
+    tts_port, visemas_port = free_port(), free_port()
+    os.environ["TTS_SERVICE_URL"] = f"http://127.0.0.1:{tts_port}"
+    os.environ["VISEMAS_SERVICE_URL"] = f"http://127.0.0.1:{visemas_port}"
+    os.environ["VISEMAS_PAYLOAD_FORMAT"] = "json"
+    upstream = multiprocessing.Process(target=run_fake_upstreams, args=(tts_port, visemas_port), daemon=True)
+    upstream.start()
+    wait_for_port(tts_port)
+    wait_for_port(visemas_port)
+
+    print(f"{os.cpu_count()} CPUs, {args.connections} conexiones × {args.turns} turnos, "
+          f"audio {AUDIO_SECONDS} s ({len(fake_wav()) // 1024} KiB)\n")
+    print(f"{'workers':>7}  {'conexiones/s':>12}  {'turnos/s':>9}")
+    for workers in args.workers:
+        connections_per_second, turns_per_second = bench(workers, args, tts_port, visemas_port)
+        print(f"{workers:>7}  {connections_per_second:>12.0f}  {turns_per_second:>9.1f}")
+
+    upstream.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Build the precomputed audio + viseme bundle for canned and frequent answers.
+
+Usage:
+    python build_bundle.py [--input db/canned_phrases.json] [--output db/speech_bundle.json]
+                           [--concurrency 4]
+
+Input (.json or .txt, one phrase per line):
+    [
+        "¡Hola! ¿En qué te puedo ayudar hoy?",
+        {"answer": "Puedes pagar a tu proveedor desde la app.",
+         "questions": ["¿Cómo pago a mi proveedor?"]}
+    ]
+
+This script:
+1. Reads the phrases / FAQs
+2. Runs TTS and visemes for each phrase in parallel (bounded concurrency)
+3. Writes a versioned bundle that main.py loads at startup
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import settings
+from vox.bundle import BUNDLE_FORMAT_VERSION, normalize_answer, normalize_question
+from vox.xtts_client import XTTSClient
+from visemas.librosa_client import LibrosaClient
+from visemas.compact import visemas_frame_fields
+
+
+def read_phrases(path: str) -> list:
+    """
+    Read phrases and FAQs from a .json or .txt file.
+
+    Returns:
+        List of {"answer": str, "questions": [str]}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            raw = json.load(f)
+        else:
+            raw = [line.strip() for line in f if line.strip()]
+
+    items = []
+    for item in raw:
+        if isinstance(item, str):
+            items.append({"answer": item, "questions": []})
+        else:
+            items.append({"answer": item["answer"], "questions": item.get("questions", [])})
+    return items
+
+
+async def build_entry(answer: str, tts: XTTSClient, visemas: LibrosaClient,
+                      semaphore: asyncio.Semaphore) -> dict:
+    """Synthesize one answer and compute its visemes."""
+    async with semaphore:
+        tts_result = await tts.speech_to_text(answer)
+        visemas_result = await visemas.generate_visemes(
+            answer, tts_result["audio_url"], audio_path=tts_result.get("audio_path")
+        )
+        return {
+            "audio_base64": tts_result["audio_base64"],
+            "audio_format": tts_result["audio_format"],
+            **visemas_frame_fields(visemas_result)
+        }
+
+
+async def build_bundle(input_path: str, output_path: str, concurrency: int):
+    """Build the bundle file from the phrases in input_path."""
+    items = read_phrases(input_path)
+    answers = list(dict.fromkeys(normalize_answer(item["answer"]) for item in items))
+    print(f"📁 {len(answers)} respuestas a precalcular ({input_path})")
+
+    tts = XTTSClient(service_url=settings.TTS_SERVICE_URL, codec=settings.TTS_OUTPUT_CODEC,
+                     shared_audio=settings.TTS_SHARED_AUDIO)
+    visemas = LibrosaClient(service_url=settings.VISEMAS_SERVICE_URL)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    results = await asyncio.gather(
+        *(build_entry(answer, tts, visemas, semaphore) for answer in answers),
+        return_exceptions=True
+    )
+
+    entries = {}
+    for answer, result in zip(answers, results):
+        if isinstance(result, Exception):
+            print(f"   ❌ {answer[:50]}: {result}")
+            continue
+        entries[answer] = result
+        print(f"   ✅ {answer[:50]} ({len(result['visemas'])} visemas)")
+
+    questions = {}
+    for item in items:
+        answer = normalize_answer(item["answer"])
+        if answer not in entries:
+            continue
+        for question in item["questions"]:
+            questions[normalize_question(question)] = answer
+
+    bundle_version = hashlib.sha256(
+        json.dumps([answers, sorted(questions.items()), settings.TTS_OUTPUT_CODEC],
+                   ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+    # Client format name ("wav", "ogg"), as in every entry; not the codec setting ("wav16k", "opus")
+    audio_formats = sorted({entry["audio_format"] for entry in entries.values()})
+
+    bundle = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "bundle_version": bundle_version,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "audio_format": audio_formats[0] if len(audio_formats) == 1 else None,
+        "entries": entries,
+        "questions": questions
+    }
+
+    # Escritura atómica: el servidor nunca ve un bundle a medias
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False)
+    os.replace(temp_path, output_path)
+
+    print(f"\n🎉 Bundle {bundle_version[:12]} escrito en {output_path}: "
+          f"{len(entries)}/{len(answers)} respuestas, {len(questions)} preguntas.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed speech bundle")
+    parser.add_argument("--input", default=os.path.join("db", "canned_phrases.json"))
+    parser.add_argument("--output", default=settings.SPEECH_BUNDLE_PATH)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    asyncio.run(build_bundle(args.input, args.output, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,16 @@ Database models for knowledge base.
 In-memory chat history with FIFO queue (no persistence).
 """
 import os
-from sqlalchemy import create_engine, Column, String, Text
+import sqlite3
+from sqlalchemy import create_engine, event, Column, String, Text, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from collections import deque
 from typing import List, Dict
 
+import settings
+
 Base = declarative_base()
 
 
@@ -23,6 +27,7 @@ class KnowledgeBase(Base):
     doc_id = Column(String, primary_key=True)  # e.g., "finanzas", "operaciones"
     topic_summary = Column(Text, nullable=False)  # Brief description for Router
     full_content = Column(Text, nullable=False)   # Complete document content
+    content_hash = Column(String, nullable=True)  # sha256 of content + summary prompt (load_db.py)
 
     def to_dict(self):
         """Convert to dictionary."""
@@ -34,15 +39,70 @@ class KnowledgeBase(Base):
 
 
 # Database setup
-DATABASE_URL = "sqlite:///db/tiendapago.db"
+DATABASE_URL = f"sqlite:///{settings.DATABASE_PATH}"
 engine = create_engine(DATABASE_URL, echo=False)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def create_read_only_engine(path: str, mmap_size: int = 64 * 1024 * 1024, pool_size: int = 4):
+    """
+    Engine for a database file that never changes while the process runs.
+
+    Opens the file with mode=ro&immutable=1 (no locking, no change detection),
+    maps it in memory (PRAGMA mmap_size) and keeps a small fixed pool of
+    connections shared across threads. Writes fail with "readonly database".
+
+    Args:
+        path: SQLite file path
+        mmap_size: Bytes of the file to memory-map
+        pool_size: Number of pooled connections
+    """
+    uri = f"file:{os.path.abspath(path)}?mode=ro&immutable=1"
+    read_only = create_engine(
+        "sqlite://",
+        creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+        echo=False
+    )
+
+    @event.listens_for(read_only, "connect")
+    def _configure(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+        cursor.execute("PRAGMA query_only = 1")
+        cursor.close()
+
+    return read_only
+
+
+# Engine for request-time lookups: read-only when the database is baked into the image
+if settings.DATABASE_READ_ONLY:
+    read_engine = create_read_only_engine(
+        settings.DATABASE_PATH,
+        mmap_size=settings.DATABASE_MMAP_SIZE,
+        pool_size=settings.DATABASE_POOL_SIZE
+    )
+else:
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
 def init_db():
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+
+def _add_missing_columns():
+    """Add columns introduced after a database was created (create_all skips existing tables)."""
+    existing = {column["name"] for column in inspect(engine).get_columns(KnowledgeBase.__tablename__)}
+    if "content_hash" not in existing:
+        with engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {KnowledgeBase.__tablename__} ADD COLUMN content_hash VARCHAR"))
 
 
 def get_db_session():
@@ -103,12 +163,21 @@ class DatabaseManager:
     Database manager implementing DatabaseManagerProtocol.
     
     Uses in-memory chat history (no DB persistence).
+    The server gives each WebSocket connection its own ChatHistory: a connection
+    lives in a single worker process, so history never needs to cross processes.
     """
 
+    def __init__(self, history: ChatHistory = None):
+        """
+        Args:
+            history: History of this conversation (process-wide singleton if None)
+        """
+        self.chat_history = history if history is not None else chat_history
+
     async def save_conversation(self, user_message: str, agent_response: str) -> None:
         """Save conversation to in-memory history."""
-        chat_history.add_exchange(user_message, agent_response)
+        self.chat_history.add_exchange(user_message, agent_response)
 
     async def retrieve_conversation(self, hours: int = 12, limit: int = 10):
         """Retrieve conversation from in-memory history."""
-        return chat_history.get_history()
+        return self.chat_history.get_history()
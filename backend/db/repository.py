@@ -7,6 +7,11 @@ from sqlalchemy.orm import Session
 
 from db.models import KnowledgeBase
 
+# Hot lookups run as raw SQL on the driver connection: sqlite3 keeps a per-connection
+# cache of prepared statements, so repeated calls skip SQL compilation and ORM hydration
+_SUMMARIES_SQL = "SELECT doc_id, topic_summary FROM knowledge_base"
+_DOCUMENT_SQL = "SELECT full_content FROM knowledge_base WHERE doc_id = ?"
+
 
 class KnowledgeBaseRepository:
     """
@@ -15,6 +20,7 @@ class KnowledgeBaseRepository:
     Available methods:
     - get_all_summaries(): Get all document summaries for routing
     - get_document_by_id(doc_id): Get full document content by ID
+    - get_all_documents(): Get every document (search index build)
     """
 
     def __init__(self, session: Session):
@@ -34,10 +40,10 @@ class KnowledgeBaseRepository:
             List of dictionaries with doc_id and topic_summary
             Format: [{"doc_id": "finanzas", "topic_summary": "..."}]
         """
-        documents = self.session.query(KnowledgeBase).all()
+        rows = self.session.connection().exec_driver_sql(_SUMMARIES_SQL).all()
         return [
-            {"doc_id": doc.doc_id, "topic_summary": doc.topic_summary}
-            for doc in documents
+            {"doc_id": doc_id, "topic_summary": topic_summary}
+            for doc_id, topic_summary in rows
         ]
 
     def get_document_by_id(self, doc_id: str) -> Optional[str]:
@@ -50,8 +56,8 @@ class KnowledgeBaseRepository:
         Returns:
             Full document content, or None if not found
         """
-        doc = self.session.query(KnowledgeBase).filter_by(doc_id=doc_id).first()
-        return doc.full_content if doc else None
+        row = self.session.connection().exec_driver_sql(_DOCUMENT_SQL, (doc_id,)).first()
+        return row[0] if row else None
 
     def get_all_doc_ids(self) -> List[str]:
         """
@@ -62,3 +68,18 @@ class KnowledgeBaseRepository:
         """
         documents = self.session.query(KnowledgeBase.doc_id).all()
         return [doc.doc_id for doc in documents]
+
+    def get_all_documents(self) -> List[Dict[str, str]]:
+        """
+        Get every document with summary and full content.
+
+        Returns:
+            List of dictionaries with doc_id, topic_summary and full_content
+        """
+        documents = self.session.query(
+            KnowledgeBase.doc_id, KnowledgeBase.topic_summary, KnowledgeBase.full_content
+        ).all()
+        return [
+            {"doc_id": doc.doc_id, "topic_summary": doc.topic_summary, "full_content": doc.full_content}
+            for doc in documents
+        ]
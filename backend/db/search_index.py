@@ -0,0 +1,153 @@
+"""
+In-memory BM25 index over the knowledge base.
+
+Built once from the knowledge_base table (summaries + full content) and used to
+narrow the router candidates to the top-k documents, so the router prompt stays
+the same size no matter how many documents are loaded.
+Rebuild it (restart the server) after running load_db.py.
+"""
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from db.models import ReadSessionLocal
+from db.repository import KnowledgeBaseRepository
+
+# Spanish function words that carry no topic signal
+STOPWORDS = frozenset("""
+a al algo como con cual cuales cuando de del donde el ella ellas ellos en entre era es esa ese
+eso esta este esto estos fue ha hay la las le les lo los mas me mi mis muy no nos o os para pero
+por que quien se si sin sobre su sus te tu tus un una uno unos y ya yo usted ustedes puedo puede
+""".split())
+
+# Crude stemming: keep the first letters of each word ("estresado", "estrés" → "estre")
+STEM_LENGTH = 5
+
+# Summary terms count more than body terms: the summary is written for routing
+SUMMARY_BOOST = 3
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents, drop stopwords and truncate to STEM_LENGTH."""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    return [
+        token[:STEM_LENGTH]
+        for token in _TOKEN_RE.findall(normalized)
+        if token not in STOPWORDS and len(token) > 1 and not token.isdigit()
+    ]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over documents made of a summary and a full content.
+
+    Postings are kept per term, so a search only touches documents that share
+    at least one term with the query.
+    """
+
+    def __init__(self, documents: List[Dict[str, str]], k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            documents: Dicts with doc_id, topic_summary and full_content
+            k1: Term frequency saturation
+            b: Length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._doc_ids: List[str] = []
+        self._summaries: Dict[str, str] = {}
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for position, doc in enumerate(documents):
+            terms = tokenize(doc["topic_summary"]) * SUMMARY_BOOST + tokenize(doc.get("full_content", ""))
+            self._doc_ids.append(doc["doc_id"])
+            self._summaries[doc["doc_id"]] = doc["topic_summary"]
+            self._lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self._postings.setdefault(term, []).append((position, frequency))
+
+        count = len(self._doc_ids)
+        self._avg_length = (sum(self._lengths) / count) if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def contains(self, doc_id: str) -> bool:
+        """Whether doc_id is an indexed document."""
+        return doc_id in self._summaries
+
+    def summary(self, doc_id: str) -> Optional[str]:
+        """Topic summary of an indexed document."""
+        return self._summaries.get(doc_id)
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank documents for a query.
+
+        Args:
+            query: Free text (user question)
+            top_k: Maximum number of results
+
+        Returns:
+            [(doc_id, score)] with score > 0, best first
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for position, frequency in postings:
+                norm = 1 - self.b + self.b * self._lengths[position] / self._avg_length
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self._doc_ids[position], score) for position, score in ranked]
+
+    def candidates(self, query: str, top_k: int = 5, fallback_query: str = "") -> List[str]:
+        """
+        Documents the router should consider.
+
+        Small knowledge bases (<= top_k documents) are passed whole, best
+        matches first. Otherwise the top-k BM25 matches of the query, or of
+        query + fallback_query (e.g. chat history) when the query alone
+        matches nothing. Empty when nothing matches.
+        """
+        ranked = [doc_id for doc_id, _ in self.search(query, top_k)]
+        if not ranked and fallback_query:
+            ranked = [doc_id for doc_id, _ in self.search(f"{query} {fallback_query}", top_k)]
+        if len(self._doc_ids) <= top_k:
+            ranked += [doc_id for doc_id in self._doc_ids if doc_id not in ranked]
+        return ranked
+
+
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index(rebuild: bool = False) -> BM25Index:
+    """
+    Shared index over the knowledge_base table, built on first use.
+
+    Args:
+        rebuild: Reload documents from the database
+    """
+    global _index
+    with _index_lock:
+        if _index is None or rebuild:
+            with ReadSessionLocal() as session:
+                documents = KnowledgeBaseRepository(session).get_all_documents()
+            _index = BM25Index(documents)
+            print(f"🔎 Índice BM25 construido: {len(_index)} documentos, {len(_index._postings)} términos")
+        return _index
@@ -0,0 +1,272 @@
+"""
+Lanzador multiproceso del servidor WebSocket
+
+El proceso maestro arranca N workers (fork) que comparten el puerto:
+
+- reuse_port=True: cada worker abre su propio socket con SO_REUSEPORT y el
+  kernel reparte las conexiones entrantes entre ellos (Linux)
+- reuse_port=False: el maestro abre el socket una vez y los workers lo heredan
+
+Señales al maestro:
+- SIGHUP: reinicio gradual (arranca workers nuevos y, cuando todos avisan que
+  están listos, pide a los viejos que terminen; los viejos dejan de aceptar y
+  cierran sus conexiones al terminar el periodo de gracia)
+- SIGTERM / SIGINT: parada gradual de todos los workers
+
+Cada worker avisa al maestro por un pipe cuando termina de calentar (ver
+notify_ready en worker_main). Un worker que muere inesperadamente se vuelve a
+arrancar; si muere antes de estar listo la espera crece (backoff exponencial)
+y tras MAX_FAST_FAILURES fallos seguidos el maestro deja de arrancarlo.
+
+El estado de cada conexión (historial de chat) vive en el worker que la
+atiende; las cachés de solo lectura (bundle de voz, índice BM25) se cargan
+en cada worker; breakers y métricas son por worker.
+"""
+import os
+import select
+import signal
+import socket
+import time
+from typing import Callable, Dict, Optional, Set
+
+# Intervalo del bucle de supervisión del maestro
+SUPERVISE_INTERVAL = 0.5
+# Espera antes de rearrancar un worker que murió sin llegar a estar listo:
+# RESPAWN_BACKOFF * 2^(fallos - 1), hasta RESPAWN_BACKOFF_MAX
+RESPAWN_BACKOFF = 0.5
+RESPAWN_BACKOFF_MAX = 30.0
+# Fallos seguidos antes de listo tras los que no se rearranca más
+MAX_FAST_FAILURES = 5
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Socket TCP en escucha, heredable por los procesos hijos"""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Launcher:
+    """Maestro que supervisa N workers que comparten el puerto"""
+
+    def __init__(self, worker_main: Callable[[Optional[socket.socket], Callable[[], None]], None], workers: int,
+                 host: str, port: int, reuse_port: bool = True, grace_seconds: float = 30.0):
+        """
+        Args:
+            worker_main: Función que ejecuta un worker hasta recibir SIGTERM.
+                Recibe el socket heredado (o None si debe abrir el suyo con
+                SO_REUSEPORT) y notify_ready, que debe llamar al estar listo
+            workers: Número de procesos worker
+            host: Host de escucha
+            port: Puerto de escucha
+            reuse_port: SO_REUSEPORT (un socket por worker) o socket heredado del maestro
+            grace_seconds: Tiempo que un worker viejo tiene para terminar
+        """
+        self.worker_main = worker_main
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port and hasattr(socket, "SO_REUSEPORT")
+        self.grace_seconds = grace_seconds
+
+        self._sock: Optional[socket.socket] = None
+        self._children: Dict[int, int] = {}    # pid -> generación
+        self._retiring: Dict[int, float] = {}  # pid -> instante del SIGTERM
+        self._ready_pipes: Dict[int, int] = {}  # fd de lectura -> pid (hasta que avisa o muere)
+        self._ready: Set[int] = set()
+        self._generation = 0
+        self._stopping = False
+        self._restart_requested = False
+        self._fast_failures = 0
+        self._respawn_at = 0.0
+        self._gave_up = False
+
+    def run(self) -> int:
+        """
+        Arranca los workers y los supervisa hasta SIGTERM/SIGINT
+
+        Returns:
+            Código de salida: 1 si se dejó de rearrancar workers que fallaban
+        """
+        if not self.reuse_port:
+            self._sock = bind_socket(self.host, self.port)
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_restart)
+
+        mode = "SO_REUSEPORT" if self.reuse_port else "socket compartido"
+        print(f"🚀 Maestro {os.getpid()}: {self.workers} workers en {self.host}:{self.port} ({mode})")
+        self._spawn_generation()
+
+        # Sin workers se sigue solo si hay un rearranque pendiente (backoff)
+        while self._children or not (self._stopping or self._gave_up):
+            if self._restart_requested and not self._stopping:
+                self._restart_requested = False
+                self._rolling_restart()
+            self._reap()
+            self._kill_overdue()
+            if not self._stopping:
+                self._retire_old_generations()
+                self._respawn_missing()
+            self._wait_ready(SUPERVISE_INTERVAL)
+
+        if self._sock is not None:
+            self._sock.close()
+        print("👋 Maestro detenido")
+        return 1 if self._gave_up else 0
+
+    def _on_stop(self, signum, frame):
+        if self._stopping:
+            return
+        self._stopping = True
+        print(f"🛑 Maestro: deteniendo {len(self._children)} workers")
+        for pid in list(self._children):
+            self._retire(pid)
+
+    def _on_restart(self, signum, frame):
+        self._restart_requested = True
+
+    def _spawn_generation(self):
+        self._generation += 1
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Worker: señales por defecto; el worker instala su propio SIGTERM
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C llega al grupo: decide el maestro
+            for fd in (read_fd, *self._ready_pipes):
+                os.close(fd)
+            code = 0
+            try:
+                self.worker_main(self._sock, _ready_notifier(write_fd))
+            except BaseException as e:
+                print(f"❌ Worker {os.getpid()} terminó con error: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        self._ready_pipes[read_fd] = pid
+        self._children[pid] = self._generation
+        print(f"   ▶️ Worker {pid} (generación {self._generation})")
+
+    def _rolling_restart(self):
+        # Los de un reinicio anterior que aún no están listos no atienden a nadie
+        for pid, generation in list(self._children.items()):
+            if generation == self._generation and pid not in self._ready:
+                self._retire(pid)
+        print(f"🔄 Reinicio gradual: {self.workers} workers nuevos (los viejos siguen hasta que estén listos)")
+        self._fast_failures = 0
+        self._respawn_at = 0.0
+        self._gave_up = False
+        self._spawn_generation()
+
+    def _retire_old_generations(self):
+        """Retira las generaciones anteriores cuando la actual está completa y lista"""
+        ready = sum(1 for pid in self._ready
+                    if self._children.get(pid) == self._generation and pid not in self._retiring)
+        if ready < self.workers:
+            return
+        old = [pid for pid, generation in self._children.items()
+               if generation < self._generation and pid not in self._retiring]
+        if old:
+            print(f"🔄 Generación {self._generation} lista: retirando {len(old)} workers viejos")
+        for pid in old:
+            self._retire(pid)
+
+    def _wait_ready(self, timeout: float):
+        """Espera hasta timeout los avisos de workers listos (un byte, o EOF si murió)"""
+        if not self._ready_pipes:
+            time.sleep(timeout)
+            return
+        readable, _, _ = select.select(list(self._ready_pipes), [], [], timeout)
+        for fd in readable:
+            pid = self._ready_pipes.pop(fd)
+            if os.read(fd, 1):
+                self._ready.add(pid)
+                self._fast_failures = 0
+            os.close(fd)
+
+    def _retire(self, pid: int):
+        if pid in self._retiring:
+            return
+        self._retiring[pid] = time.monotonic()
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self):
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+            self._children.pop(pid, None)
+            for fd in [fd for fd, child in self._ready_pipes.items() if child == pid]:
+                os.close(self._ready_pipes.pop(fd))
+            was_ready = pid in self._ready
+            self._ready.discard(pid)
+            expected = self._retiring.pop(pid, None) is not None
+            if not expected:
+                print(f"⚠️ Worker {pid} terminó inesperadamente (estado {status})")
+                if not was_ready:
+                    self._count_fast_failure()
+
+    def _count_fast_failure(self):
+        """Backoff para rearrancar un worker que murió antes de estar listo"""
+        self._fast_failures += 1
+        if self._fast_failures >= MAX_FAST_FAILURES:
+            if not self._gave_up:
+                print(f"❌ {self._fast_failures} workers seguidos murieron antes de estar listos: "
+                      f"no se rearrancan (SIGHUP para reintentar)")
+            self._gave_up = True
+            return
+        delay = min(RESPAWN_BACKOFF_MAX, RESPAWN_BACKOFF * 2 ** (self._fast_failures - 1))
+        self._respawn_at = time.monotonic() + delay
+        print(f"   ⏳ Rearranque en {delay:.1f} s (fallo {self._fast_failures} de {MAX_FAST_FAILURES})")
+
+    def _kill_overdue(self):
+        # Margen sobre el periodo de gracia del propio worker
+        deadline = self.grace_seconds + 5
+        now = time.monotonic()
+        for pid, retired_at in list(self._retiring.items()):
+            if now - retired_at > deadline:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def _respawn_missing(self):
+        if self._gave_up or time.monotonic() < self._respawn_at:
+            return
+        current = sum(1 for pid, generation in self._children.items()
+                      if generation == self._generation and pid not in self._retiring)
+        for _ in range(self.workers - current):
+            self._spawn()
+
+
+def _ready_notifier(write_fd: int) -> Callable[[], None]:
+    """notify_ready de un worker: escribe un byte en su pipe hacia el maestro (solo la primera vez)"""
+    def notify_ready():
+        nonlocal write_fd
+        if write_fd is None:
+            return
+        try:
+            os.write(write_fd, b"R")
+            os.close(write_fd)
+        except OSError:
+            pass
+        write_fd = None
+    return notify_ready
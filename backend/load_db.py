@@ -2,112 +2,250 @@
 Load documents into the knowledge base with AI-generated summaries.
 
 Usage:
-    python load_db.py
+    python load_db.py [--dry-run] [--concurrency 8] [--prune]
 
 This script:
 1. Reads all .txt files from db/input_documents/
-2. Generates topic summaries using GPT-5-nano
-3. Saves documents to the knowledge_base table
+2. Compares their content hashes with the ones stored in knowledge_base
+3. Generates topic summaries using GPT-5-nano, only for new or changed documents,
+   with bounded concurrency
+4. Saves every change in a single transaction
+
+--dry-run reports what would change without calling the LLM or writing
+(missing tables or columns are reported, not created).
+--prune also deletes rows whose .txt file no longer exists.
 """
-import os
+import argparse
+import asyncio
 import glob
-from openai import OpenAI
+import hashlib
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from sqlalchemy import inspect
 
 import settings
-from db.models import init_db, SessionLocal, KnowledgeBase
+from db.models import engine, init_db, SessionLocal, KnowledgeBase
+
+if TYPE_CHECKING:
+    # Imported only when summaries are needed: --dry-run and no-op loads skip it
+    from openai import AsyncOpenAI
 
+SUMMARY_MODEL = "gpt-5-nano"
 
-def generate_summary(content: str, client: OpenAI) -> str:
+SUMMARY_PROMPT = """Genera un resumen MUY BREVE (1-2 oraciones) para clasificar preguntas de usuarios.
+
+Documento:
+{content}
+
+Ejemplos de resúmenes:
+- "Información sobre ahorro, créditos, tasas de interés y manejo de deudas."
+- "Guías sobre uso de la app, pagos a proveedores y manejo de inventario."
+
+Responde SOLO con el resumen, sin explicaciones adicionales:"""
+
+
+def content_hash(content: str) -> str:
+    """
+    Hash that decides whether a summary must be regenerated.
+
+    Includes the model and prompt, so changing either re-summarizes everything.
+    """
+    digest = hashlib.sha256()
+    for part in (SUMMARY_MODEL, SUMMARY_PROMPT, content):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def generate_summary(content: str, client: "AsyncOpenAI") -> str:
     """
     Generate a brief topic summary for routing using GPT-5-nano.
-    
+
     Args:
         content: Full document content
-        client: OpenAI client
-        
+        client: Async OpenAI client
+
     Returns:
         Short summary (1-2 sentences) for the router
     """
-    response = client.chat.completions.create(
-        model="gpt-5-nano",
+    response = await client.chat.completions.create(
+        model=SUMMARY_MODEL,
         messages=[
             {
                 "role": "user",
-                "content": f"""Genera un resumen MUY BREVE (1-2 oraciones) para clasificar preguntas de usuarios.
-
-Documento:
-{content}
-
-Ejemplos de resúmenes:
-- "Información sobre ahorro, créditos, tasas de interés y manejo de deudas."
-- "Guías sobre uso de la app, pagos a proveedores y manejo de inventario."
-
-Responde SOLO con el resumen, sin explicaciones adicionales:"""
+                "content": SUMMARY_PROMPT.format(content=content)
             }
         ]
     )
     return response.choices[0].message.content.strip()
 
 
-def load_documents():
-    """Load all documents from input_documents folder into the database."""
-    # Initialize database
-    print("🗄️ Inicializando base de datos...")
-    init_db()
-    
-    # Initialize OpenAI client
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-    
+def read_documents(input_dir: str) -> Dict[str, str]:
+    """
+    Read every .txt file in a folder.
+
+    Returns:
+        {doc_id: full_content}, doc_id being the filename without extension
+    """
+    documents = {}
+    for filepath in sorted(glob.glob(os.path.join(input_dir, "*.txt"))):
+        doc_id = os.path.splitext(os.path.basename(filepath))[0]
+        with open(filepath, "r", encoding="utf-8") as f:
+            documents[doc_id] = f.read()
+    return documents
+
+
+async def summarize_documents(documents: Dict[str, str], client: "AsyncOpenAI",
+                              concurrency: int) -> Dict[str, object]:
+    """
+    Summarize documents concurrently, at most `concurrency` requests in flight.
+
+    Returns:
+        {doc_id: summary or the Exception raised for that document}
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def summarize(doc_id: str, content: str) -> str:
+        async with semaphore:
+            summary = await generate_summary(content, client)
+            print(f"   📝 {doc_id}: {summary[:100]}...")
+            return summary
+
+    doc_ids = list(documents)
+    results = await asyncio.gather(
+        *(summarize(doc_id, documents[doc_id]) for doc_id in doc_ids),
+        return_exceptions=True
+    )
+    return dict(zip(doc_ids, results))
+
+
+def print_plan(new: List[str], changed: List[str], unchanged: List[str], removed: List[str], prune: bool):
+    """Print which documents will be created, updated, skipped or removed."""
+    print(f"   ✅ Nuevos: {len(new)} {new if new else ''}")
+    print(f"   ✏️ Modificados: {len(changed)} {changed if changed else ''}")
+    print(f"   ⏭️ Sin cambios: {len(unchanged)}")
+    if removed:
+        action = "se eliminarán" if prune else "se conservan (usa --prune para eliminarlos)"
+        print(f"   🗑️ Sin archivo: {len(removed)} {removed} → {action}")
+
+
+def check_schema() -> Optional[List[str]]:
+    """
+    Dry-run counterpart of init_db(): report what it would create without creating it.
+
+    The database file is not opened if it does not exist (connecting would create it).
+
+    Returns:
+        Missing knowledge_base columns, or None if the database file or the table does not exist
+    """
+    if not os.path.exists(settings.DATABASE_PATH):
+        print(f"   ⚠️ No existe {settings.DATABASE_PATH}: se creará al cargar")
+        return None
+    table = KnowledgeBase.__tablename__
+    inspector = inspect(engine)
+    if not inspector.has_table(table):
+        print(f"   ⚠️ No existe la tabla {table}: se creará al cargar")
+        return None
+    existing = {column["name"] for column in inspector.get_columns(table)}
+    missing = [column.name for column in KnowledgeBase.__table__.columns if column.name not in existing]
+    for name in missing:
+        print(f"   ⚠️ Falta la columna {table}.{name}: se agregará al cargar")
+    return missing
+
+
+async def load_documents(dry_run: bool = False, concurrency: int = 8, prune: bool = False):
+    """Load new or changed documents from input_documents folder into the database."""
+    if dry_run:
+        print("🔎 Revisando el esquema (dry run: no se crean tablas ni columnas)...")
+        missing_columns = check_schema()
+    else:
+        print("🗄️ Inicializando base de datos...")
+        init_db()
+        missing_columns = []
+
     # Get all .txt files from input_documents
     input_dir = os.path.join(os.path.dirname(__file__), "db", "input_documents")
-    txt_files = glob.glob(os.path.join(input_dir, "*.txt"))
-    
-    if not txt_files:
+    documents = read_documents(input_dir)
+
+    if not documents:
         print(f"⚠️ No se encontraron archivos .txt en {input_dir}")
         return
-    
-    print(f"📁 Encontrados {len(txt_files)} documentos")
-    
+
+    print(f"📁 Encontrados {len(documents)} documentos")
+    hashes = {doc_id: content_hash(content) for doc_id, content in documents.items()}
+
     with SessionLocal() as session:
-        for filepath in txt_files:
-            # Extract doc_id from filename (without extension)
-            filename = os.path.basename(filepath)
-            doc_id = os.path.splitext(filename)[0]
-            
-            # Read full content
-            with open(filepath, "r", encoding="utf-8") as f:
-                full_content = f.read()
-            
-            print(f"\n📄 Procesando: {filename}")
-            print(f"   doc_id: {doc_id}")
-            print(f"   Contenido: {len(full_content)} caracteres")
-            
-            # Generate summary using GPT-5-nano
-            print("   🤖 Generando resumen con GPT-5-nano...")
-            topic_summary = generate_summary(full_content, client)
-            print(f"   📝 Resumen: {topic_summary[:100]}...")
-            
-            # Check if document already exists
-            existing = session.query(KnowledgeBase).filter_by(doc_id=doc_id).first()
-            
-            if existing:
-                # Update existing document
-                existing.topic_summary = topic_summary
-                existing.full_content = full_content
-                print(f"   ✏️ Documento actualizado")
-            else:
-                # Create new document
-                doc = KnowledgeBase(
-                    doc_id=doc_id,
-                    topic_summary=topic_summary,
-                    full_content=full_content
-                )
-                session.add(doc)
-                print(f"   ✅ Documento creado")
-        
+        # Only ids and hashes: full contents are not needed to compute the plan
+        if missing_columns is None:
+            stored = {}
+        elif "content_hash" in missing_columns:
+            # Rows from before content hashes: all of them count as changed
+            stored = {doc_id: None for (doc_id,) in session.query(KnowledgeBase.doc_id)}
+        else:
+            stored = dict(session.query(KnowledgeBase.doc_id, KnowledgeBase.content_hash).all())
+
+        new = [doc_id for doc_id in documents if doc_id not in stored]
+        changed = [doc_id for doc_id in documents if doc_id in stored and stored[doc_id] != hashes[doc_id]]
+        unchanged = [doc_id for doc_id in documents if stored.get(doc_id) == hashes[doc_id]]
+        removed = sorted(set(stored) - set(documents))
+        print_plan(new, changed, unchanged, removed, prune)
+
+        if dry_run:
+            print("\n🔎 Dry run: no se generaron resúmenes ni se escribió en la base de datos.")
+            return
+
+        pending = {doc_id: documents[doc_id] for doc_id in new + changed}
+        summaries = {}
+        if pending:
+            print(f"\n🤖 Generando {len(pending)} resúmenes con {SUMMARY_MODEL} (concurrencia {concurrency})...")
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+            try:
+                summaries = await summarize_documents(pending, client, concurrency)
+            finally:
+                await client.close()
+
+        failed = {doc_id: error for doc_id, error in summaries.items() if isinstance(error, Exception)}
+        for doc_id, error in failed.items():
+            print(f"   ❌ {doc_id}: {error} (se reintentará en la próxima carga)")
+
+        rows = [
+            {
+                "doc_id": doc_id,
+                "topic_summary": summary,
+                "full_content": documents[doc_id],
+                "content_hash": hashes[doc_id]
+            }
+            for doc_id, summary in summaries.items()
+            if doc_id not in failed
+        ]
+
+        # Single transaction for every insert, update and delete
+        inserts = [row for row in rows if row["doc_id"] not in stored]
+        updates = [row for row in rows if row["doc_id"] in stored]
+        if inserts:
+            session.bulk_insert_mappings(KnowledgeBase, inserts)
+        if updates:
+            session.bulk_update_mappings(KnowledgeBase, updates)
+        if prune and removed:
+            session.query(KnowledgeBase).filter(KnowledgeBase.doc_id.in_(removed)).delete(synchronize_session=False)
         session.commit()
-        print(f"\n🎉 ¡Carga completada! {len(txt_files)} documentos procesados.")
+
+        print(f"\n🎉 ¡Carga completada! {len(inserts)} creados, {len(updates)} actualizados, "
+              f"{len(unchanged)} sin cambios, {len(failed)} con error"
+              + (f", {len(removed)} eliminados." if prune and removed else "."))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga incremental de la base de conocimiento")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar qué cambiaría")
+    parser.add_argument("--concurrency", type=int, default=8, help="Resúmenes en paralelo")
+    parser.add_argument("--prune", action="store_true", help="Eliminar documentos sin archivo .txt")
+    args = parser.parse_args()
+    asyncio.run(load_documents(dry_run=args.dry_run, concurrency=args.concurrency, prune=args.prune))
 
 
 if __name__ == "__main__":
-    load_documents()
+    main()
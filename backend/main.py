@@ -2,19 +2,34 @@ import websockets
 import asyncio
 import json
 import os
+import signal
+import socket
+import sys
+from typing import Callable
 
 import settings
 from agents.ducktyping import AgentProtocol
-from agents.agent import LibreraAgent
+from agents.profiles import TurnPolicy, build_models, load_profiles, node_stats
 from db.ducktyping import DatabaseManagerProtocol
-from db.models import DatabaseManager, init_db
 from vox.xtts_client import XTTSClient
 from visemas.librosa_client import LibrosaClient
+from visemas.wav import wav_duration_from_base64
+from vox.bundle import SpeechBundle
+from resilience import CircuitOpenError, UpstreamTimeoutError, get_caller, resilience_stats
+import metrics
+import protocol
+from outbound import OutboundQueue, outbound_stats
+from profiling import Profiler, ProfilingEndpoints
+from readiness import DONE, FAILED, UNAVAILABLE, Readiness
+from transport import close_endpoints, get_endpoint
+
+# Pasos de calentamiento antes de aceptar conexiones (GET /ready)
+WARMUP_STEPS = ("database", "agent", "speech_bundle", "upstreams")
 
-from langchain_openai import ChatOpenAI
 
 class WebSocketHandler:
-    def __init__(self, agent: AgentProtocol, db_manager: DatabaseManagerProtocol, websocket):
+    def __init__(self, agent: AgentProtocol, db_manager: DatabaseManagerProtocol, websocket,
+                 speech_bundle: SpeechBundle = None):
         """
         Inicializa el manejador de WebSocket.
 
@@ -22,16 +37,69 @@ class WebSocketHandler:
             agent: Instancia del agente (implementa AgentProtocol)
             db_manager: Manager de la base de datos (implementa DatabaseManagerProtocol)
             websocket: Conexión WebSocket del cliente
+            speech_bundle: Audio + visemas precalculados para respuestas fijas
         """
         self.agent = agent
         self.db_manager = db_manager
         self.websocket = websocket
-        self.tts_model = XTTSClient(service_url=settings.TTS_SERVICE_URL)
-        self.visemas_model = LibrosaClient(service_url=settings.VISEMAS_SERVICE_URL)
+        # Los frames salen por una cola acotada: un cliente lento no bloquea el turno
+        self.outbound = OutboundQueue(
+            websocket,
+            high_watermark=settings.OUTBOUND_HIGH_WATERMARK,
+            low_watermark=settings.OUTBOUND_LOW_WATERMARK,
+            max_bytes=settings.OUTBOUND_MAX_BYTES,
+            policy=settings.OUTBOUND_POLICY,
+            stall_seconds=settings.OUTBOUND_STALL_SECONDS
+        )
+        self.speech_bundle = speech_bundle or SpeechBundle()
+        # Tareas fuera del camino crítico (guardado de la conversación)
+        self._background = set()
+        self.tts_model = XTTSClient(
+            service_url=settings.TTS_SERVICE_URL,
+            codec=settings.TTS_OUTPUT_CODEC,
+            shared_audio=settings.TTS_SHARED_AUDIO,
+            caller=get_caller(
+                "tts",
+                timeout=settings.TTS_TIMEOUT,
+                hedge=settings.TTS_HEDGE,
+                hedge_percentile=settings.HEDGE_PERCENTILE,
+                failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.BREAKER_RESET_TIMEOUT
+            )
+        )
+        self.visemas_model = LibrosaClient(
+            service_url=settings.VISEMAS_SERVICE_URL,
+            payload_format=settings.VISEMAS_PAYLOAD_FORMAT,
+            caller=get_caller(
+                "visemas",
+                timeout=settings.VISEMAS_TIMEOUT,
+                hedge=settings.VISEMAS_HEDGE,
+                hedge_percentile=settings.HEDGE_PERCENTILE,
+                failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.BREAKER_RESET_TIMEOUT
+            ),
+            mode=settings.VISEMAS_MODE
+        )
 
     
+    def send(self, payload, message_id: str = None) -> bool:
+        """Encola un frame (dict → JSON) para la tarea escritora de la conexión"""
+        frame = payload if isinstance(payload, str) else json.dumps(payload)
+        return self.outbound.put(frame, message_id)
+
     async def handler(self):
         """Handler principal que rutea mensajes según su tipo"""
+        self.outbound.start()
+        try:
+            await self._receive_loop()
+        except websockets.ConnectionClosed:
+            # Cierre por consumidor lento (1013): esperado, no es un fallo del handler
+            if not self.outbound.closed:
+                raise
+        finally:
+            await self.outbound.stop()
+
+    async def _receive_loop(self):
         async for message in self.websocket:
             try:
                 print(f"Mensaje recibido: {message}")
@@ -43,85 +111,326 @@ class WebSocketHandler:
                     try:
                         msg_data = json.loads(message)
                         if "message" in msg_data and "id" in msg_data:
-                            await self.main(msg_data["message"], msg_data["id"])
+                            await self.main(
+                                msg_data["message"],
+                                msg_data["id"],
+                                msg_data.get("visemas_format"),
+                                protocol.negotiate(msg_data.get("protocol"))
+                            )
                         else:
-                            await self.websocket.send(json.dumps({
+                            self.send({
                                 "error": "Formato de mensaje inválido. Se requiere: {\"message\":\"...\", \"id\":\"...\"}", 
                                 "type": "error"
-                            }))
+                            })
                     except json.JSONDecodeError:
-                        await self.websocket.send(json.dumps({
+                        self.send({
                             "error": "JSON inválido", 
                             "type": "error"
-                        }))
+                        })
                         
             except Exception as e:
                 print(f"Error procesando mensaje: {e}")
-                await self.websocket.send(json.dumps({"error": str(e), "type": "error"}))
+                self.send({"error": str(e), "type": "error"})
     
     async def alive(self):
         """Responde al heartbeat para mantener conexión activa"""
-        await self.websocket.send("alive")
+        self.send("alive")
     
-    async def main(self, message: str, message_id: str):
+    async def main(self, message: str, message_id: str, visemas_format: str = None,
+                   protocol_version: int = protocol.PROTOCOL_V1):
         """Función principal que maneja el flujo de procesamiento"""
-        agent_response = await self.agent.process_message(message)
+        # Preguntas frecuentes con respuesta fija no pasan por el agente
+        agent_response = self.speech_bundle.answer_for(message)
+        if agent_response is None:
+            agent_response = await self.agent.process_message(message)
         print(f"Respuesta del agente: {agent_response}")
 
         # Procesamiento: TTS+Visemas (expresiones y animaciones ahora son frontend)
-        await self._parallel1(message, agent_response, message_id)
+        await self._parallel1(message, agent_response, message_id, visemas_format, protocol_version)
+
+    def _save_in_background(self, message: str, agent_response: str):
+        """Guarda la conversación sin retrasar el audio del turno"""
+        async def save():
+            try:
+                await self.db_manager.save_conversation(message, agent_response)
+            except Exception as e:
+                print(f"⚠️ Error guardando conversación: {e}")
+
+        task = asyncio.create_task(save())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
     
-    async def _parallel1(self, message: str, agent_response: str, message_id: str):
-        """Primera rama de procesamiento paralelo: audio y visemas"""
-        await self.db_manager.save_conversation(message, agent_response)
+    async def _parallel1(self, message: str, agent_response: str, message_id: str, visemas_format: str = None,
+                         protocol_version: int = protocol.PROTOCOL_V1):
+        """
+        Primera rama de procesamiento paralelo: audio y visemas
+
+        visemas_format: formato de visemas pedido por el cliente ("compact-v1"
+        envía "visemas_compact"; None mantiene la lista clásica en "visemas")
+        protocol_version: 1 = un frame con audio y visemas; 2 = frame de audio
+        en cuanto responde el TTS y frame de visemas después (ver protocol.py)
+        """
+        self._save_in_background(message, agent_response)
+        split = protocol_version >= protocol.PROTOCOL_V2
+
+        # Respuesta precalculada: sin TTS ni visemas
+        cached = self.speech_bundle.get(agent_response)
+        if cached is not None:
+            print("🎁 Respuesta servida desde el bundle de voz")
+            build = protocol.audio_frame if split else protocol.combined_frame
+            self.send(build(
+                message_id, cached["audio_base64"], cached["audio_format"], cached, visemas_format
+            ), message_id)
+            return
+
         tts_result = await self.tts_model.speech_to_text(agent_response)
         audio_url = tts_result["audio_url"]
         audio_base64 = tts_result["audio_base64"]
+        audio_format = tts_result.get("audio_format", "wav")
         
-        visemas = await self.visemas_model.generate_visemes(agent_response, audio_url) 
-        await self.websocket.send(json.dumps({
-            "audio_base64": audio_base64,
-            "audio_format": "wav",
-            "message_id": message_id, 
-            "visemas": visemas.get("visemas", [])
-        }))
+        if split:
+            # El cliente empieza a reproducir sin esperar el análisis de visemas
+            self.send(protocol.audio_frame(message_id, audio_base64, audio_format), message_id)
+
+        # Duración desde la cabecera del WAV: el modo texto no tiene que leer el audio
+        duration = wav_duration_from_base64(audio_base64) if audio_format == "wav" else None
+
+        try:
+            visemas = await self.visemas_model.generate_visemes(
+                agent_response, audio_url, duration, tts_result.get("audio_path")
+            )
+        except (CircuitOpenError, UpstreamTimeoutError) as e:
+            # Sin visemas el avatar sigue hablando: mejor audio sin labios que nada
+            print(f"⚠️ Visemas no disponibles: {e}")
+            visemas = {"visemas": []}
+        except Exception as e:
+            if not split:
+                raise
+            # El audio ya salió: el cliente espera el frame de visemas, aunque venga vacío
+            print(f"⚠️ Error generando visemas: {e}")
+            visemas = {"visemas": []}
+
+        if split:
+            self.send(protocol.visemas_frame(message_id, visemas, visemas_format), message_id)
+        else:
+            self.send(protocol.combined_frame(message_id, audio_base64, audio_format, visemas, visemas_format), message_id)
     
 
 
 
 
-async def start_server():
-    """Inicializa el servidor WebSocket"""
+def prepare_database():
+    """Inicializa la base de datos (el modo solo lectura abre el archivo tal cual)"""
+    if settings.DATABASE_READ_ONLY:
+        print(f"Base de datos en modo solo lectura: {settings.DATABASE_PATH}")
+    else:
+        from db.models import init_db
+
+        print("Inicializando base de datos...")
+        init_db()
+        print("Base de datos inicializada.")
+
+
+def preload_modules():
+    """
+    Importa las dependencias pesadas del primer turno (LangGraph, LangChain,
+    SQLAlchemy, cliente OpenAI)
+
+    import main no las carga: el worker abre el puerto antes y las importa al
+    calentar. El lanzador las precarga en el maestro antes del fork.
+    """
+    import agents.agent  # noqa: F401
+    import db.search_index  # noqa: F401
+    import langchain_openai  # noqa: F401
+
+
+def load_knowledge_index():
+    """Snapshot de la base de conocimiento en memoria (índice BM25)"""
+    from db.search_index import get_knowledge_index
+
+    return get_knowledge_index()
+
 
-    # Initialize database
-    print("Inicializando base de datos...")
-    init_db()
-    print("Base de datos inicializada.")
+def load_models() -> dict:
+    """Un modelo por perfil LLM, compartido por todas las conexiones del worker"""
+    preload_modules()
+    return build_models(load_profiles(settings.AGENT_PROFILES, settings.AGENT_MODEL), settings.OPENAI_API_KEY)
+
+
+async def warm_up(runtime: dict, readiness: Readiness, init_database: bool = True):
+    """
+    Calienta lo que necesita el primer turno con el puerto ya abierto
+
+    El trabajo de CPU (imports, base de datos, modelos) va a un hilo para que
+    el event loop siga respondiendo /ready y /metrics; los pools HTTP hacia
+    TTS y visemas se abren mientras tanto.
+
+    Un paso que lanza una excepción queda "failed" con el error en /ready y
+    el worker sigue respondiendo 503 (no se cae ni se da por listo).
+    """
+    async def step(name: str, work):
+        try:
+            await work()
+        except Exception as e:
+            print(f"❌ Calentamiento: {name} falló: {e}")
+            readiness.mark(name, FAILED, str(e) or type(e).__name__)
+
+    async def upstreams():
+        names = ("tts", "visemas")
+        results = await asyncio.gather(
+            get_endpoint(settings.TTS_SERVICE_URL).warm_up(),
+            get_endpoint(settings.VISEMAS_SERVICE_URL).warm_up()
+        )
+        down = [name for name, ok in zip(names, results) if not ok]
+        readiness.mark("upstreams", UNAVAILABLE if down else DONE, ", ".join(down) or None)
+
+    async def database():
+        if init_database:
+            await asyncio.to_thread(prepare_database)
+        runtime["index"] = await asyncio.to_thread(load_knowledge_index)
+        readiness.mark("database")
+
+    async def agent():
+        runtime["models"] = await asyncio.to_thread(load_models)
+        readiness.mark("agent")
+
+    async def speech_bundle():
+        runtime["speech_bundle"] = await asyncio.to_thread(SpeechBundle.load, settings.SPEECH_BUNDLE_PATH)
+        readiness.mark("speech_bundle")
+
+    upstreams_task = asyncio.create_task(step("upstreams", upstreams))
+    await step("database", database)
+    await step("agent", agent)
+    await step("speech_bundle", speech_bundle)
+    await upstreams_task
+
+
+async def start_server(sock: socket.socket = None, reuse_port: bool = False, init_database: bool = True,
+                       on_ready: Callable[[], None] = None):
+    """
+    Inicializa el servidor WebSocket y lo ejecuta hasta recibir SIGTERM
+
+    El puerto se abre antes de calentar (ver warm_up): GET /ready responde
+    503 y los handshakes se rechazan hasta que el worker está listo.
+
+    Args:
+        sock: Socket ya en escucha (heredado del lanzador multiproceso)
+        reuse_port: Abrir el puerto con SO_REUSEPORT (un socket por worker)
+        init_database: Inicializar la base de datos (el lanzador lo hace una vez en el maestro)
+        on_ready: Se llama cuando el worker está listo (aviso al lanzador para el reinicio gradual)
+    """
+    readiness = Readiness(WARMUP_STEPS, on_ready)
+    metrics.register("readiness", readiness.stats)
+    metrics.register("upstreams", resilience_stats)
+    active = {"connections": 0, "total": 0}
+    metrics.register("process", lambda: {"pid": os.getpid(), **active})
+
+    # Modelos, índice y bundle de voz: los carga warm_up
+    runtime = {}
+    policy = TurnPolicy(settings.AGENT_TRIVIAL_MAX_WORDS)
+    metrics.register("agent", node_stats.snapshot)
+    metrics.register("outbound", outbound_stats)
 
     async def handler_factory(websocket):
         """Factory para crear instancias de WebSocketHandler por cliente"""
-        # Create LibreraAgent with GPT-5-mini
-        model = ChatOpenAI(
-            model="gpt-5-nano",
-            api_key=settings.OPENAI_API_KEY
+        # Ya importados por warm_up (solo se aceptan handshakes con el worker
+        # listo): aquí el import es una consulta a sys.modules
+        from agents.agent import LibreraAgent
+        from db.models import ChatHistory, DatabaseManager
+
+        # Historial propio de la conexión: vive en el proceso que la atiende
+        chat_history = ChatHistory(max_size=6)
+        agent = LibreraAgent(
+            runtime["models"]["generator"],
+            index=runtime["index"],
+            router_top_k=settings.ROUTER_TOP_K,
+            chat_history=chat_history,
+            executor=settings.AGENT_EXECUTOR,
+            models=runtime["models"],
+            policy=policy
         )
-        agent = LibreraAgent(model)
 
         # Create DatabaseManager
-        db_manager = DatabaseManager()
+        db_manager = DatabaseManager(chat_history)
+
+        active["connections"] += 1
+        active["total"] += 1
+        try:
+            websocket_handler = WebSocketHandler(agent, db_manager, websocket, runtime["speech_bundle"])
+            await websocket_handler.handler()
+        finally:
+            active["connections"] -= 1
 
-        websocket_handler = WebSocketHandler(agent, db_manager, websocket)
-        await websocket_handler.handler()
+    if sock is not None:
+        listen = {"sock": sock}
+        print(f"Iniciando worker {os.getpid()} en socket compartido {sock.getsockname()}")
+    else:
+        listen = {"host": settings.WEBSOCKET_HOST, "port": settings.WEBSOCKET_PORT, "reuse_port": reuse_port}
+        print(f"Iniciando servidor WebSocket en {settings.WEBSOCKET_HOST}:{settings.WEBSOCKET_PORT}")
+    profiling = ProfilingEndpoints(Profiler(settings.PROFILING_DIR, name="backend"), settings.PROFILING_TOKEN)
+    profiling.install_signal_handler(asyncio.get_running_loop())
+
+    def process_request(connection, request):
+        """HTTP en el puerto del WebSocket: /debug/*, /metrics y /ready (sin calentar rechaza handshakes)"""
+        return (
+            profiling.process_request(connection, request)
+            or metrics.process_request(connection, request, settings.METRICS_TOKEN)
+            or readiness.process_request(connection, request)
+        )
 
-    print(f"Iniciando servidor WebSocket en {settings.WEBSOCKET_HOST}:{settings.WEBSOCKET_PORT}")
     server = await websockets.serve(
         handler_factory,
-        settings.WEBSOCKET_HOST,
-        settings.WEBSOCKET_PORT
+        process_request=process_request,
+        **listen
     )
-    print("Servidor iniciado. Esperando conexiones...")
-    await server.wait_closed()
+    print("Servidor iniciado. Calentando...")
+
+    # SIGTERM: dejar de aceptar, esperar a las conexiones abiertas durante el periodo de gracia
+    stop = asyncio.get_running_loop().create_future()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set_result, None)
+
+    await warm_up(runtime, readiness, init_database)
+    if readiness.ready:
+        print("Esperando conexiones...")
+    else:
+        print("⚠️ Calentamiento incompleto: /ready responde 503 hasta reiniciar el worker")
+    await stop
+
+    print(f"Deteniendo servidor ({active['connections']} conexiones abiertas)...")
+    server.close(close_connections=False)
+    try:
+        async with asyncio.timeout(settings.SHUTDOWN_GRACE_SECONDS):
+            await server.wait_closed()
+    except TimeoutError:
+        server.close()
+        await server.wait_closed()
+    await close_endpoints()
+
+
+def run_worker(sock: socket.socket = None, notify_ready: Callable[[], None] = None):
+    """Punto de entrada de un worker del lanzador multiproceso"""
+    from db.models import engine, read_engine
+
+    # Las conexiones SQLite abiertas por el maestro no se comparten entre procesos
+    engine.dispose(close=False)
+    read_engine.dispose(close=False)
+    asyncio.run(start_server(sock=sock, reuse_port=sock is None, init_database=False, on_ready=notify_ready))
 
 
 if __name__ == "__main__":
-    asyncio.run(start_server())
\ No newline at end of file
+    if settings.WEBSOCKET_WORKERS > 1:
+        from launcher import Launcher
+
+        prepare_database()
+        # Los workers heredan los módulos ya importados (copy-on-write)
+        preload_modules()
+        sys.exit(Launcher(
+            run_worker,
+            workers=settings.WEBSOCKET_WORKERS,
+            host=settings.WEBSOCKET_HOST,
+            port=settings.WEBSOCKET_PORT,
+            reuse_port=settings.WEBSOCKET_REUSE_PORT,
+            grace_seconds=settings.SHUTDOWN_GRACE_SECONDS
+        ).run())
+    else:
+        asyncio.run(start_server())
@@ -0,0 +1,38 @@
+"""
+Métricas servidas por HTTP en el mismo puerto del WebSocket
+
+GET /metrics devuelve un snapshot JSON de todos los proveedores registrados.
+Cada módulo registra una función sin argumentos que devuelve un dict serializable.
+Con METRICS_TOKEN la petición debe traer el header X-Metrics-Token (403 si no).
+"""
+import hmac
+import json
+from http import HTTPStatus
+from typing import Any, Callable, Dict
+
+_providers: Dict[str, Callable[[], Any]] = {}
+
+
+def register(name: str, provider: Callable[[], Any]):
+    """Registra un proveedor de métricas bajo una clave de primer nivel"""
+    _providers[name] = provider
+
+
+def snapshot() -> Dict[str, Any]:
+    """Valor actual de todos los proveedores"""
+    return {name: provider() for name, provider in _providers.items()}
+
+
+def process_request(connection, request, token: str = None):
+    """
+    Hook process_request de websockets: responde GET /metrics y deja
+    continuar el handshake WebSocket para cualquier otra ruta
+
+    Args:
+        token: Valor exigido en el header X-Metrics-Token (None = sin autenticación)
+    """
+    if request.path != "/metrics":
+        return None
+    if token and not hmac.compare_digest(request.headers.get("X-Metrics-Token", ""), token):
+        return connection.respond(HTTPStatus.FORBIDDEN, json.dumps({"error": "No autorizado"}) + "\n")
+    return connection.respond(HTTPStatus.OK, json.dumps(snapshot()) + "\n")
@@ -0,0 +1,231 @@
+"""
+Cola de salida acotada por conexión WebSocket
+
+El handler nunca espera al socket: encola el frame y sigue. Una tarea
+escritora por conexión envía los frames en orden; websocket.send espera a que
+el transporte drene, así que con un cliente lento los frames se acumulan en la
+cola en vez de bloquear el turno.
+
+Marcas de agua sobre los bytes pendientes (cola + buffer del transporte):
+- por encima de high_watermark la conexión pasa a congestionada
+- vuelve a la normalidad al bajar de low_watermark (histéresis)
+
+Con la conexión congestionada, al encolar un frame:
+- policy "drop": se descartan los frames pendientes de turnos anteriores
+  (superados por el turno nuevo); los frames sin turno (alive, errores) se
+  conservan
+- policy "close": se cierra la conexión (consumidor lento)
+
+En ambos casos se cierra la conexión si se supera max_bytes o si un envío
+no avanza en stall_seconds.
+"""
+import asyncio
+import weakref
+from collections import deque
+from typing import Any, Dict, Optional
+
+POLICIES = ("drop", "close")
+
+# Código de cierre para consumidores lentos (1013: Try Again Later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Conexiones con cola activa y contadores acumulados del proceso
+_queues: "weakref.WeakSet[OutboundQueue]" = weakref.WeakSet()
+_totals = {"dropped_frames": 0, "dropped_bytes": 0, "slow_consumers_closed": 0}
+
+
+class OutboundQueue:
+    """Frames pendientes de una conexión y su tarea escritora"""
+
+    def __init__(self, websocket, high_watermark: int = 1 << 20, low_watermark: int = 256 << 10,
+                 max_bytes: int = 4 << 20, policy: str = "drop", stall_seconds: float = 30.0):
+        """
+        Args:
+            websocket: Conexión WebSocket (websockets.asyncio)
+            high_watermark: Bytes pendientes a partir de los que la conexión está congestionada
+            low_watermark: Bytes pendientes por debajo de los que deja de estarlo
+            max_bytes: Límite duro de bytes pendientes; por encima se cierra la conexión
+            policy: "drop" (descartar turnos superados) o "close" (cerrar al congestionarse)
+            stall_seconds: Tiempo máximo de un envío sin drenar antes de cerrar
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Política de cola de salida desconocida: {policy}")
+        if not 0 <= low_watermark <= high_watermark <= max_bytes:
+            raise ValueError("Se requiere low_watermark <= high_watermark <= max_bytes")
+        self.websocket = websocket
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.stall_seconds = stall_seconds
+
+        self._frames: deque = deque()  # (frame, turn_id, tamaño)
+        self._queued_bytes = 0
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._close_task: Optional[asyncio.Task] = None
+        self.congested = False
+        self.closed = False
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self.dropped_frames = 0
+        self.dropped_bytes = 0
+        self.peak_bytes = 0
+
+    def start(self):
+        """Arranca la tarea escritora"""
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+            _queues.add(self)
+
+    async def stop(self):
+        """Detiene la tarea escritora descartando lo pendiente (la conexión ya terminó)"""
+        self.closed = True
+        _queues.discard(self)
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+        self._frames.clear()
+        self._queued_bytes = 0
+
+    def put(self, frame, turn_id: str = None) -> bool:
+        """
+        Encola un frame sin esperar al socket
+
+        Args:
+            frame: Texto (str) o binario (bytes) del mensaje
+            turn_id: Turno al que pertenece (message_id); None para frames de control
+
+        Returns:
+            False si la conexión se cerró por consumidor lento y el frame no se encoló
+        """
+        if self.closed:
+            return False
+        if self.congested and self.buffered_bytes() <= self.low_watermark:
+            self.congested = False
+
+        size = len(frame)
+        self._frames.append((frame, turn_id, size))
+        self._queued_bytes += size
+        self._ready.set()
+
+        buffered = self.buffered_bytes()
+        self.peak_bytes = max(self.peak_bytes, buffered)
+        if buffered > self.high_watermark:
+            self.congested = True
+        if self.congested:
+            if self.policy == "close":
+                self._close_slow_consumer(f"cola de salida sobre {self.high_watermark} bytes")
+                return False
+            self._drop_superseded(turn_id)
+        if self.buffered_bytes() > self.max_bytes:
+            self._close_slow_consumer(f"cola de salida sobre {self.max_bytes} bytes")
+            return False
+        return True
+
+    def transport_bytes(self) -> int:
+        """Bytes ya escritos al transporte pendientes de salir por el socket"""
+        transport = getattr(self.websocket, "transport", None)
+        return transport.get_write_buffer_size() if transport is not None else 0
+
+    def buffered_bytes(self) -> int:
+        """Bytes pendientes: cola + buffer del transporte"""
+        return self._queued_bytes + self.transport_bytes()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connection": _connection_id(self.websocket),
+            "depth": len(self._frames),
+            "queued_bytes": self._queued_bytes,
+            "transport_bytes": self.transport_bytes(),
+            "buffered_bytes": self.buffered_bytes(),
+            "peak_bytes": self.peak_bytes,
+            "congested": self.congested,
+            "sent_frames": self.sent_frames,
+            "sent_bytes": self.sent_bytes,
+            "dropped_frames": self.dropped_frames,
+            "dropped_bytes": self.dropped_bytes,
+        }
+
+    def _drop_superseded(self, turn_id: Optional[str]):
+        """Descarta frames pendientes de turnos distintos al actual"""
+        if turn_id is None:
+            return
+        kept = deque()
+        for entry in self._frames:
+            _, frame_turn, size = entry
+            if frame_turn is not None and frame_turn != turn_id:
+                self._queued_bytes -= size
+                self.dropped_frames += 1
+                self.dropped_bytes += size
+                _totals["dropped_frames"] += 1
+                _totals["dropped_bytes"] += size
+            else:
+                kept.append(entry)
+        self._frames = kept
+
+    def _close_slow_consumer(self, reason: str):
+        if self.closed:
+            return
+        self.closed = True
+        _totals["slow_consumers_closed"] += 1
+        print(f"🐢 Cerrando consumidor lento {_remote(self.websocket)}: {reason}")
+        self._frames.clear()
+        self._queued_bytes = 0
+        self._ready.set()
+        self._close_task = asyncio.get_running_loop().create_task(
+            self.websocket.close(SLOW_CONSUMER_CLOSE_CODE, "slow consumer")
+        )
+
+    async def _write_loop(self):
+        while not self.closed:
+            if not self._frames:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            frame, _, size = self._frames.popleft()
+            self._queued_bytes -= size
+            try:
+                async with asyncio.timeout(self.stall_seconds):
+                    await self.websocket.send(frame)
+            except TimeoutError:
+                self._close_slow_consumer(f"envío sin drenar en {self.stall_seconds:g} s")
+                return
+            except Exception as e:
+                # Conexión cerrada: el bucle de recepción del handler terminará
+                print(f"⚠️ Error enviando frame: {e}")
+                self.closed = True
+                return
+            self.sent_frames += 1
+            self.sent_bytes += size
+            if self.congested and self.buffered_bytes() <= self.low_watermark:
+                self.congested = False
+
+
+def _connection_id(websocket) -> str:
+    """Identificador de la conexión para /metrics (sin la dirección del cliente)"""
+    connection_id = getattr(websocket, "id", None)
+    return str(connection_id)[:8] if connection_id else "?"
+
+
+def _remote(websocket) -> str:
+    address = getattr(websocket, "remote_address", None)
+    return f"{address[0]}:{address[1]}" if address else "?"
+
+
+def outbound_stats(top: int = 20) -> Dict[str, Any]:
+    """Métricas de las colas de salida: totales y las `top` conexiones con más bytes pendientes"""
+    queues = [queue.stats() for queue in list(_queues)]
+    queues.sort(key=lambda stats: stats["buffered_bytes"], reverse=True)
+    return {
+        "connections": len(queues),
+        "congested": sum(stats["congested"] for stats in queues),
+        "depth": sum(stats["depth"] for stats in queues),
+        "buffered_bytes": sum(stats["buffered_bytes"] for stats in queues),
+        **_totals,
+        "top": queues[:top],
+    }
@@ -0,0 +1,247 @@
+"""
+Perfilado bajo demanda del proceso en ejecución
+
+- CPU: muestreo de las pilas de todos los hilos cada interval_ms durante N
+  segundos; se escribe en formato "folded" (speedscope, flamegraph.pl, inferno)
+- Memoria: tracemalloc durante N segundos; top de asignadores y crecimiento
+  (texto) más el snapshot (.tracemalloc, cargable con tracemalloc.Snapshot.load)
+- Pilas: volcado instantáneo de la pila de cada hilo y de cada corrutina
+  del event loop (también con SIGUSR1)
+
+Sin coste en reposo: el hilo de muestreo y tracemalloc solo existen mientras
+dura una captura. Los endpoints se sirven en el puerto del WebSocket (hook
+process_request), solo si PROFILING_TOKEN está definido, y exigen la
+cabecera X-Profiling-Token.
+"""
+
+import asyncio
+import hmac
+import io
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import traceback
+from collections import Counter
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+MAX_SECONDS = 300
+
+
+class ProfilerBusy(Exception):
+    """Ya hay una captura del mismo tipo en curso"""
+
+
+class Profiler:
+    """Capturas de CPU, memoria y pilas escritas en archivos"""
+
+    def __init__(self, output_dir: str = None, name: str = "service"):
+        """
+        Args:
+            output_dir: Directorio de resultados (temporal si es None)
+            name: Prefijo de los archivos
+        """
+        self.output_dir = output_dir or os.path.join(tempfile.gettempdir(), "profiles")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.name = name
+        self._running = {"cpu": None, "memory": None}
+        self._lock = threading.Lock()
+
+    def cpu(self, seconds: float = 10, interval_ms: float = 5) -> str:
+        """
+        Inicia un perfil de CPU por muestreo en segundo plano
+
+        Returns:
+            Ruta del archivo .folded que se escribirá al terminar
+        """
+        path = self._path("cpu", ".folded")
+        self._start("cpu", self._sample_cpu, _clamp(seconds), max(1.0, interval_ms) / 1000, path)
+        return path
+
+    def memory(self, seconds: float = 10, top: int = 25) -> str:
+        """
+        Inicia una captura de tracemalloc en segundo plano
+
+        Returns:
+            Ruta del informe .txt (el snapshot va al lado con extensión .tracemalloc)
+        """
+        path = self._path("memory", ".txt")
+        self._start("memory", self._trace_memory, _clamp(seconds), int(top), path)
+        return path
+
+    def stacks(self, extra_sections=()) -> tuple:
+        """
+        Vuelca la pila de cada hilo
+
+        Args:
+            extra_sections: Pares (título, texto) adicionales (p. ej. corrutinas)
+
+        Returns:
+            (ruta, texto)
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        lines = []
+        for thread_id, frame in sys._current_frames().items():
+            lines.append(f"--- Hilo {names.get(thread_id, '?')} ({thread_id}) ---\n")
+            lines.extend(traceback.format_stack(frame))
+            lines.append("\n")
+        for title, text in extra_sections:
+            lines.append(f"=== {title} ===\n{text}\n")
+
+        text = "".join(lines)
+        path = self._path("stacks", ".txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path, text
+
+    def status(self) -> dict:
+        """Capturas en curso (ruta de salida) y directorio de resultados"""
+        with self._lock:
+            return {"output_dir": self.output_dir, "running": dict(self._running)}
+
+    def _start(self, kind: str, target, *args):
+        with self._lock:
+            if self._running[kind]:
+                raise ProfilerBusy(f"Captura de {kind} en curso: {self._running[kind]}")
+            self._running[kind] = args[-1]
+
+        def run():
+            try:
+                target(*args)
+                print(f"📈 Perfil de {kind} escrito en {args[-1]}")
+            except Exception as e:
+                print(f"⚠️ Error en perfil de {kind}: {e}")
+            finally:
+                with self._lock:
+                    self._running[kind] = None
+
+        threading.Thread(target=run, name=f"profiler-{kind}", daemon=True).start()
+
+    def _sample_cpu(self, seconds: float, interval: float, path: str):
+        own = threading.get_ident()
+        counts = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _trace_memory(self, seconds: float, top: int, path: str):
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(25)
+        try:
+            start = tracemalloc.take_snapshot()
+            time.sleep(seconds)
+            end = tracemalloc.take_snapshot()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+        end.dump(os.path.splitext(path)[0] + ".tracemalloc")
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+        start, end = start.filter_traces(ignore), end.filter_traces(ignore)
+
+        lines = [f"Top {top} asignadores (memoria viva al final)"]
+        lines += [str(stat) for stat in end.statistics("lineno")[:top]]
+        lines += ["", f"Top {top} crecimientos en {seconds:g} s"]
+        lines += [str(stat) for stat in end.compare_to(start, "lineno")[:top]]
+        largest = end.statistics("traceback")[:1]
+        if largest:
+            lines += ["", f"Traceback del mayor asignador ({largest[0].size / 1024:.1f} KiB)"]
+            lines += largest[0].traceback.format()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _path(self, kind: str, extension: str) -> str:
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        return os.path.join(self.output_dir, f"{self.name}-{os.getpid()}-{kind}-{stamp}{extension}")
+
+
+def _clamp(seconds: float) -> float:
+    return min(max(float(seconds), 0.1), MAX_SECONDS)
+
+
+def coroutine_stacks() -> str:
+    """Pila de cada tarea del event loop en ejecución (llamar desde el loop)"""
+    buffer = io.StringIO()
+    for task in asyncio.all_tasks():
+        buffer.write(f"--- {task.get_name()} ---\n")
+        task.print_stack(file=buffer)
+        buffer.write("\n")
+    return buffer.getvalue()
+
+
+class ProfilingEndpoints:
+    """
+    Endpoints de perfilado para el hook process_request de websockets
+
+    GET  /debug/profile/cpu?seconds=10&interval_ms=5
+    GET  /debug/profile/memory?seconds=10&top=25
+    GET  /debug/stacks   (hilos + corrutinas)
+    GET  /debug/profile
+    """
+
+    def __init__(self, profiler: Profiler, token: str = None):
+        self.profiler = profiler
+        self.token = token
+
+    def install_signal_handler(self, loop: asyncio.AbstractEventLoop, signum=signal.SIGUSR1):
+        """Volcado de pilas (hilos + corrutinas) al recibir la señal"""
+        def dump():
+            path, _ = self.profiler.stacks([("Corrutinas", coroutine_stacks())])
+            print(f"🧵 Pilas en {path}")
+        loop.add_signal_handler(signum, dump)
+
+    def process_request(self, connection, request):
+        """Responde las rutas /debug/*; None para cualquier otra"""
+        url = urlsplit(request.path)
+        if not self.token or not url.path.startswith("/debug/"):
+            return None
+        if not hmac.compare_digest(request.headers.get("X-Profiling-Token", ""), self.token):
+            return self._json(connection, HTTPStatus.FORBIDDEN, {"error": "No autorizado"})
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/debug/profile/cpu":
+                path = self.profiler.cpu(float(params.get("seconds", 10)), float(params.get("interval_ms", 5)))
+                return self._json(connection, HTTPStatus.ACCEPTED, {"file": path})
+            if url.path == "/debug/profile/memory":
+                path = self.profiler.memory(float(params.get("seconds", 10)), int(params.get("top", 25)))
+                return self._json(connection, HTTPStatus.ACCEPTED, {"file": path})
+            if url.path == "/debug/stacks":
+                path, text = self.profiler.stacks([("Corrutinas", coroutine_stacks())])
+                return self._json(connection, HTTPStatus.OK, {"file": path, "stacks": text})
+            if url.path == "/debug/profile":
+                return self._json(connection, HTTPStatus.OK, self.profiler.status())
+        except ProfilerBusy as e:
+            return self._json(connection, HTTPStatus.CONFLICT, {"error": str(e)})
+        except ValueError as e:
+            return self._json(connection, HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        return self._json(connection, HTTPStatus.NOT_FOUND, {"error": "Ruta no encontrada"})
+
+    @staticmethod
+    def _json(connection, status: HTTPStatus, body: dict):
+        response = connection.respond(status, json.dumps(body) + "\n")
+        del response.headers["Content-Type"]
+        response.headers["Content-Type"] = "application/json"
+        return response
@@ -0,0 +1,75 @@
+"""
+Contrato versionado de frames WebSocket backend → frontend
+
+El cliente declara la versión que entiende con "protocol" en cada mensaje:
+
+    {"message": "...", "id": "...", "protocol": 2, "visemas_format": "compact-v1"}
+
+Versión 1 (sin "protocol"): un único frame por turno con audio y visemas
+
+    {"audio_base64": "...", "audio_format": "wav", "message_id": "...", "visemas": [...]}
+
+Versión 2: el audio sale en cuanto el TTS responde y los visemas llegan después
+en un frame propio enlazado por message_id
+
+    {"type": "audio", "protocol": 2, "message_id": "...", "audio_base64": "...",
+     "audio_format": "wav", "visemas_pending": true}
+    {"type": "visemas", "protocol": 2, "message_id": "...", "visemas": [...]}
+
+Si los visemas ya están disponibles (bundle de voz) van en el frame de audio
+con "visemas_pending": false y no hay frame de visemas. Los visemas usan el
+formato negociado con "visemas_format" ("visemas" o "visemas_compact").
+"""
+from typing import Any, Dict, Optional
+
+from visemas.compact import visemas_frame_fields
+
+PROTOCOL_V1 = 1
+PROTOCOL_V2 = 2
+# Versión más alta que entiende este servidor
+PROTOCOL_VERSION = PROTOCOL_V2
+
+
+def negotiate(requested: Any) -> int:
+    """Versión a usar con el cliente: la pedida, acotada a la del servidor (1 si no pide)"""
+    try:
+        return max(PROTOCOL_V1, min(int(requested), PROTOCOL_VERSION))
+    except (TypeError, ValueError):
+        return PROTOCOL_V1
+
+
+def combined_frame(message_id: str, audio_base64: str, audio_format: str,
+                   visemas: Dict[str, Any], visemas_format: Optional[str] = None) -> Dict[str, Any]:
+    """Frame v1: audio y visemas juntos"""
+    return {
+        "audio_base64": audio_base64,
+        "audio_format": audio_format,
+        "message_id": message_id,
+        **visemas_frame_fields(visemas, visemas_format)
+    }
+
+
+def audio_frame(message_id: str, audio_base64: str, audio_format: str,
+                visemas: Optional[Dict[str, Any]] = None, visemas_format: Optional[str] = None) -> Dict[str, Any]:
+    """Frame v2 de audio; con visemas=None el cliente debe esperar el frame de visemas"""
+    frame = {
+        "type": "audio",
+        "protocol": PROTOCOL_V2,
+        "message_id": message_id,
+        "audio_base64": audio_base64,
+        "audio_format": audio_format,
+        "visemas_pending": visemas is None,
+    }
+    if visemas is not None:
+        frame.update(visemas_frame_fields(visemas, visemas_format))
+    return frame
+
+
+def visemas_frame(message_id: str, visemas: Dict[str, Any], visemas_format: Optional[str] = None) -> Dict[str, Any]:
+    """Frame v2 de visemas de un audio ya enviado"""
+    return {
+        "type": "visemas",
+        "protocol": PROTOCOL_V2,
+        "message_id": message_id,
+        **visemas_frame_fields(visemas, visemas_format)
+    }
@@ -0,0 +1,74 @@
+"""
+Señal de readiness del worker
+
+El servidor abre el puerto en cuanto arranca y calienta en segundo plano lo
+que necesita el primer turno (modelos LLM, snapshot de la base de datos,
+pools HTTP hacia TTS y visemas). Mientras tanto:
+
+- GET /ready responde 503 con el estado de cada paso; 200 al terminar todos
+- los handshakes WebSocket se rechazan con 503 (el balanceador no debe
+  mandar tráfico a un pod que no está listo)
+- GET /metrics y /debug/* responden con normalidad
+
+Un paso puede terminar "unavailable" (p. ej. un servicio aguas arriba que no
+responde al precalentar): cuenta como terminado, el circuit breaker se
+encarga de ese servicio durante los turnos. Un paso "failed" (excepción al
+calentar) no cuenta: el worker sigue en 503 con el error en /ready.
+"""
+import json
+import time
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Iterable, Optional
+
+PENDING = "pending"
+DONE = "done"
+UNAVAILABLE = "unavailable"
+FAILED = "failed"
+
+
+class Readiness:
+    """Estado de los pasos de calentamiento de un worker"""
+
+    def __init__(self, steps: Iterable[str], on_ready: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            steps: Pasos de calentamiento, todos pendientes al empezar
+            on_ready: Se llama una vez cuando el worker queda listo (aviso al lanzador)
+        """
+        self._on_ready = on_ready
+        self._started = time.monotonic()
+        self._steps: Dict[str, Dict[str, Any]] = {name: {"state": PENDING} for name in steps}
+        self.ready_seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_seconds is not None
+
+    def mark(self, step: str, state: str = DONE, detail: str = None):
+        """Registra el final de un paso; el worker queda listo cuando no falta ninguno"""
+        entry = {"state": state, "seconds": round(time.monotonic() - self._started, 3)}
+        if detail:
+            entry["detail"] = detail
+        self._steps[step] = entry
+        if not self.ready and all(entry["state"] in (DONE, UNAVAILABLE) for entry in self._steps.values()):
+            self.ready_seconds = round(time.monotonic() - self._started, 3)
+            print(f"✅ Worker listo en {self.ready_seconds:.2f} s")
+            if self._on_ready:
+                self._on_ready()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "ready_seconds": self.ready_seconds, "steps": dict(self._steps)}
+
+    def process_request(self, connection, request):
+        """
+        Hook process_request de websockets: responde GET /ready y rechaza
+        los handshakes mientras el worker no está listo
+        """
+        if request.path == "/ready":
+            status = HTTPStatus.OK if self.ready else HTTPStatus.SERVICE_UNAVAILABLE
+            return connection.respond(status, json.dumps(self.stats()) + "\n")
+        if not self.ready:
+            failed = any(entry["state"] == FAILED for entry in self._steps.values())
+            message = "Calentamiento fallido" if failed else "Servidor iniciando"
+            return connection.respond(HTTPStatus.SERVICE_UNAVAILABLE, f"{message}\n")
+        return None
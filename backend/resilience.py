@@ -0,0 +1,253 @@
+"""
+Resiliencia de las llamadas a los servicios (TTS, visemas)
+
+- Deadline por llamada
+- Hedging: se envía una segunda petición idéntica cuando la primera supera
+  un percentil de latencia de las llamadas exitosas recientes (solo con
+  muestras suficientes: sin historial no hay hedge)
+- Circuit breaker por servicio: falla rápido mientras está abierto y prueba
+  de nuevo tras un tiempo de espera. Cuentan como fallo los timeouts, los
+  errores de conexión y las respuestas 5xx; una 4xx es un error de la
+  petición, no del servicio
+
+Los callers se comparten por nombre de servicio (ver get_caller), así el
+estado del breaker y el historial de latencias son comunes a todas las
+conexiones WebSocket.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict
+
+
+class CircuitOpenError(Exception):
+    """Se lanza sin llamar al servicio mientras su circuito está abierto"""
+
+
+class UpstreamTimeoutError(Exception):
+    """Se lanza cuando una llamada supera su deadline"""
+
+
+class UpstreamHTTPError(Exception):
+    """Respuesta de error de un servicio; status decide si cuenta para el breaker"""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+async def upstream_error(response, label: str) -> UpstreamHTTPError:
+    """UpstreamHTTPError a partir de una respuesta aiohttp (cuerpo JSON {"error": ...} si lo hay)"""
+    try:
+        error = (await response.json(content_type=None) or {}).get("error")
+    except (ValueError, AttributeError):
+        error = None
+    return UpstreamHTTPError(f"{label}: {error or f'HTTP {response.status}'}", response.status)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por fallos consecutivos
+
+    closed → (failure_threshold fallos) → open → (reset_timeout) → half_open
+    half_open → una llamada de prueba → closed si va bien / open si falla
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """Comprueba si la llamada puede continuar; si no, lanza CircuitOpenError"""
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"Servicio {self.name} no disponible (circuito abierto)")
+            self.state = "half_open"
+
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"Servicio {self.name} no disponible (probando recuperación)")
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                print(f"⚡ Circuito {self.name} abierto tras {self.consecutive_failures} fallos")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened
+        }
+
+
+class LatencyTracker:
+    """Ventana deslizante de latencias de llamadas exitosas recientes"""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class ResilientCaller:
+    """Deadline + hedging + circuit breaker alrededor de un servicio"""
+
+    def __init__(self, name: str, timeout: float = 30.0, hedge: bool = True,
+                 hedge_percentile: float = 95.0, hedge_min_delay: float = 0.05, hedge_min_samples: int = 20,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            name: Nombre del servicio (errores y métricas)
+            timeout: Deadline de la llamada completa, hedge incluido (segundos)
+            hedge: Si se envían peticiones de hedge
+            hedge_percentile: Percentil de latencia tras el cual se envía el hedge
+            hedge_min_delay: Espera mínima del hedge
+            hedge_min_samples: Llamadas exitosas necesarias antes del primer hedge
+            failure_threshold: Fallos consecutivos que abren el circuito
+            reset_timeout: Segundos que el circuito sigue abierto antes de probar
+        """
+        self.name = name
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.latency = LatencyTracker()
+        self._stats = {
+            "calls": 0, "failures": 0, "timeouts": 0, "client_errors": 0,
+            "short_circuited": 0, "hedges": 0, "hedge_wins": 0
+        }
+
+    def hedge_delay(self):
+        """Espera actual antes de enviar la petición de hedge (None: sin muestras suficientes, no hay hedge)"""
+        if len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.percentile(self.hedge_percentile))
+
+    async def call(self, request_factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta una petición con deadline, hedging y circuit breaker
+
+        Args:
+            request_factory: Función sin argumentos que devuelve una corrutina
+                nueva por intento (se llama dos veces si hay hedge)
+
+        Returns:
+            Resultado del primer intento que tenga éxito
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self._stats["short_circuited"] += 1
+            raise
+
+        self._stats["calls"] += 1
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(self.timeout):
+                result = await self._hedged(request_factory)
+        except TimeoutError:
+            self._stats["timeouts"] += 1
+            self.breaker.record_failure()
+            raise UpstreamTimeoutError(f"Servicio {self.name} sin respuesta en {self.timeout}s")
+        except UpstreamHTTPError as e:
+            if e.status >= 500:
+                self._stats["failures"] += 1
+                self.breaker.record_failure()
+            else:
+                # El servicio respondió: la petición era inválida, no está caído
+                self._stats["client_errors"] += 1
+                self.breaker.record_success()
+            raise
+        except Exception:
+            self._stats["failures"] += 1
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+        self.latency.add(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, request_factory: Callable[[], Awaitable[Any]]) -> Any:
+        primary = asyncio.create_task(request_factory())
+        delay = self.hedge_delay()
+        if not self.hedge or delay is None:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self._stats["hedges"] += 1
+                pending.add(asyncio.create_task(request_factory()))
+
+            last_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._stats["hedge_wins"] += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del breaker, contadores de hedge y percentiles de latencia"""
+        delay = self.hedge_delay()
+        stats = {
+            **self._stats,
+            "breaker": self.breaker.stats(),
+            "hedge_delay": round(delay, 3) if delay is not None else None
+        }
+        if len(self.latency):
+            stats["latency_p50"] = round(self.latency.percentile(50), 3)
+            stats["latency_p95"] = round(self.latency.percentile(95), 3)
+        return stats
+
+
+# Callers compartidos por nombre de servicio
+_callers: Dict[str, ResilientCaller] = {}
+
+
+def get_caller(name: str, **config) -> ResilientCaller:
+    """Devuelve (o crea en el primer uso) el caller compartido de un servicio"""
+    if name not in _callers:
+        _callers[name] = ResilientCaller(name, **config)
+    return _callers[name]
+
+
+def resilience_stats() -> Dict[str, Any]:
+    """Estadísticas de todos los callers, para /metrics"""
+    return {name: caller.stats() for name, caller in _callers.items()}
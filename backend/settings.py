@@ -2,15 +2,75 @@ import os
 
 WEBSOCKET_HOST = os.getenv("WEBSOCKET_HOST", "0.0.0.0")
 WEBSOCKET_PORT = int(os.getenv("WEBSOCKET_PORT", "8765"))
+# Procesos worker (python main.py); >1 usa launcher.py con el puerto compartido
+WEBSOCKET_WORKERS = int(os.getenv("WEBSOCKET_WORKERS", "1"))
+# SO_REUSEPORT (un socket por worker) o un socket abierto por el maestro y heredado
+WEBSOCKET_REUSE_PORT = os.getenv("WEBSOCKET_REUSE_PORT", "1") == "1"
+# Segundos que se esperan las conexiones abiertas al detener o reiniciar un worker
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "30"))
+# Cola de salida por conexión (bytes pendientes = cola + buffer del transporte):
+# congestionada sobre HIGH, normal bajo LOW; sobre MAX_BYTES o sin drenar en
+# STALL_SECONDS se cierra. Política al congestionarse: "drop" (descarta turnos
+# superados) o "close" (cierra al consumidor lento)
+OUTBOUND_HIGH_WATERMARK = int(os.getenv("OUTBOUND_HIGH_WATERMARK", str(1 << 20)))
+OUTBOUND_LOW_WATERMARK = int(os.getenv("OUTBOUND_LOW_WATERMARK", str(256 << 10)))
+OUTBOUND_MAX_BYTES = int(os.getenv("OUTBOUND_MAX_BYTES", str(4 << 20)))
+OUTBOUND_POLICY = os.getenv("OUTBOUND_POLICY", "drop")
+OUTBOUND_STALL_SECONDS = float(os.getenv("OUTBOUND_STALL_SECONDS", "30"))
+# Perfilado bajo demanda en /debug/* (deshabilitado sin token) y directorio de resultados
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILING_DIR = os.getenv("PROFILING_DIR")
+# Token exigido en GET /metrics (header X-Metrics-Token); sin token /metrics es público
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
+# URLs de los servicios: http://host:puerto o, en el mismo pod, socket Unix
+# http+unix://<ruta codificada>, p. ej. http+unix://%2Frun%2Ftiendapago%2Ftts.sock
 TTS_SERVICE_URL = os.getenv("TTS_SERVICE_URL", "http://localhost:5002")
+# Leer el audio del almacén compartido con el TTS (AUDIO_STORE_SHARED=1, /dev/shm)
+# en vez de recibirlo en el cuerpo HTTP; la ruta se pasa también al servicio de visemas
+TTS_SHARED_AUDIO = os.getenv("TTS_SHARED_AUDIO", "0") == "1"
+# Codec del audio enviado al frontend: "wav", "wav16k" (16 kHz) u "opus" (OGG)
+TTS_OUTPUT_CODEC = os.getenv("TTS_OUTPUT_CODEC", "wav")
 VISEMAS_SERVICE_URL = os.getenv("VISEMAS_SERVICE_URL", "http://localhost:5001")
+# Deadlines (s) y hedging de las llamadas a los servicios
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "30"))
+VISEMAS_TIMEOUT = float(os.getenv("VISEMAS_TIMEOUT", "15"))
+# Sin hedge en TTS por defecto: el servicio une peticiones idénticas en una
+# sola síntesis (SynthesisPool), así que el duplicado no corre por separado
+TTS_HEDGE = os.getenv("TTS_HEDGE", "0") == "1"
+VISEMAS_HEDGE = os.getenv("VISEMAS_HEDGE", "1") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+# Circuit breaker por servicio
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+# Formato pedido al servicio de visemas: "compact-v1" (columnar) o "json" (lista clásica)
+VISEMAS_PAYLOAD_FORMAT = os.getenv("VISEMAS_PAYLOAD_FORMAT", "compact-v1")
+# Modo de generación de visemas: "audio", "text" (texto + duración) o "auto"; vacío = el del servicio
+VISEMAS_MODE = os.getenv("VISEMAS_MODE") or None
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # Database is baked into the image (read-only demo mode)
 DATABASE_PATH = "db/tiendapago.db"
+# Modo solo lectura: mode=ro&immutable=1, mmap y pool pequeño (el archivo no cambia en ejecución)
+DATABASE_READ_ONLY = os.getenv("DATABASE_READ_ONLY", "0") == "1"
+DATABASE_MMAP_SIZE = int(os.getenv("DATABASE_MMAP_SIZE", str(64 * 1024 * 1024)))
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "4"))
+
+# Audio + visemas precalculados (python build_bundle.py)
+SPEECH_BUNDLE_PATH = os.getenv("SPEECH_BUNDLE_PATH", "db/speech_bundle.json")
+# Documentos candidatos (BM25) que ve el router del agente
+ROUTER_TOP_K = int(os.getenv("ROUTER_TOP_K", "5"))
+# Ejecutor del agente: "direct" (llamadas planas) o "graph" (runtime de LangGraph)
+AGENT_EXECUTOR = os.getenv("AGENT_EXECUTOR", "direct")
+# Modelo base de todos los perfiles LLM del agente y ajustes por perfil (JSON), p. ej.
+# '{"generator": {"model": "gpt-5-mini", "max_tokens": 512, "reasoning_effort": "low", "timeout": 15}}'
+# Perfiles: router, generator, fallback, trivial
+AGENT_MODEL = os.getenv("AGENT_MODEL", "gpt-5-nano")
+AGENT_PROFILES = os.getenv("AGENT_PROFILES")
+# Mensajes de hasta N palabras de saludo/cortesía: sin router, perfil "trivial" (0 = desactivado)
+AGENT_TRIVIAL_MAX_WORDS = int(os.getenv("AGENT_TRIVIAL_MAX_WORDS", "6"))
 
 PHONEME_TO_VISEME = {
     # Vocales principales
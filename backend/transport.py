@@ -0,0 +1,103 @@
+"""
+Endpoints HTTP de los servicios TTS y visemas: TCP o Unix domain socket
+
+TTS_SERVICE_URL / VISEMAS_SERVICE_URL aceptan, además de http://host:puerto,
+la forma http+unix://<ruta del socket codificada>, p. ej.
+
+    http+unix://%2Frun%2Ftiendapago%2Ftts.sock
+
+(convención de requests-unixsocket; ver TTS_SOCKET / VISEMAS_SOCKET en los
+servicios). Las peticiones van entonces por el socket con Host: localhost, y
+las URLs http+unix:// que devuelva el servicio se reescriben para la sesión.
+
+Cada endpoint mantiene una sesión aiohttp por proceso (pool de conexiones
+keep-alive), compartida por todas las conexiones WebSocket: get_endpoint()
+devuelve siempre la misma instancia para una URL y warm_up() abre la primera
+conexión antes de marcar el worker como listo.
+"""
+import asyncio
+from typing import Dict, Optional
+from urllib.parse import quote, unquote
+
+import aiohttp
+
+UNIX_SCHEME = "http+unix://"
+
+_endpoints: Dict[str, "ServiceEndpoint"] = {}
+
+
+def unix_socket_url(socket_path: str) -> str:
+    """URL http+unix:// de un socket"""
+    return UNIX_SCHEME + quote(socket_path, safe="")
+
+
+class ServiceEndpoint:
+    """URL base de un servicio y su sesión aiohttp compartida"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.socket_path = None
+        self.base_url = self.url
+        if self.url.startswith(UNIX_SCHEME):
+            self.socket_path = unquote(self.url[len(UNIX_SCHEME):].split("/", 1)[0])
+            self.base_url = "http://localhost"
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Sesión del endpoint en el event loop actual (se crea en el primer uso)
+
+        No se cierra tras cada petición: sus conexiones se reutilizan. Un
+        event loop nuevo (asyncio.run en scripts y benchmarks) recibe su propia
+        sesión.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self.socket_path is None:
+                connector = aiohttp.TCPConnector()
+            else:
+                connector = aiohttp.UnixConnector(path=self.socket_path)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+        return self._session
+
+    async def warm_up(self, path: str = "/health", timeout: float = 5.0) -> bool:
+        """Abre una conexión del pool con una petición barata; False si el servicio no responde"""
+        try:
+            async with self.session().get(f"{self.base_url}{path}",
+                                          timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                await response.read()
+                return response.status < 500
+        except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+            print(f"⚠️ No se pudo precalentar {self.url}: {e}")
+            return False
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def http_url(self, url: str) -> str:
+        """URL devuelta por el servicio, utilizable con session()"""
+        if self.socket_path is not None and url.startswith(UNIX_SCHEME):
+            path = url[len(UNIX_SCHEME):].partition("/")[2]
+            return f"{self.base_url}/{path}"
+        return url
+
+    def __repr__(self) -> str:
+        return f"ServiceEndpoint({self.url!r})"
+
+
+def get_endpoint(url: str) -> ServiceEndpoint:
+    """Devuelve (o crea en el primer uso) el endpoint compartido de una URL"""
+    key = url.rstrip("/")
+    if key not in _endpoints:
+        _endpoints[key] = ServiceEndpoint(key)
+    return _endpoints[key]
+
+
+async def close_endpoints():
+    """Cierra las sesiones de todos los endpoints (al detener el servidor)"""
+    for endpoint in _endpoints.values():
+        await endpoint.close()
@@ -0,0 +1,79 @@
+"""
+Formato compacto (columnar) para secuencias de visemas.
+
+Formato clásico:
+    [{"visema": "aa", "tiempo": 0.12}, {"visema": "oh", "tiempo": 0.31}, ...]
+
+Formato compacto (compact-v1):
+    {"format": "compact-v1", "v": [1, 4, ...], "t": [120, 310, ...]}
+
+- "v": índices en VISEME_CODES (tabla fija, versionada por el nombre del formato)
+- "t": tiempos en milisegundos enteros
+- Visemas iguales consecutivos se fusionan (se conserva el primer tiempo)
+"""
+from typing import Any, Dict, List, Optional
+
+COMPACT_FORMAT = "compact-v1"
+
+# Tabla de códigos: el índice es el valor que viaja en "v"
+VISEME_CODES = ["neutral", "aa", "ee", "ih", "oh", "ou"]
+_CODE_BY_VISEME = {viseme: code for code, viseme in enumerate(VISEME_CODES)}
+
+
+def encode_visemes(visemas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Codifica una lista de visemas al formato compacto.
+
+    Args:
+        visemas: Lista [{"visema": "aa", "tiempo": 0.12}, ...]
+
+    Returns:
+        Diccionario {"format": "compact-v1", "v": [...], "t": [...]}
+    """
+    codes: List[int] = []
+    times: List[int] = []
+    for item in visemas:
+        code = _CODE_BY_VISEME.get(item["visema"], 0)
+        if codes and codes[-1] == code:
+            continue  # Run-length: el visema ya está activo
+        codes.append(code)
+        times.append(int(round(item["tiempo"] * 1000)))
+    return {"format": COMPACT_FORMAT, "v": codes, "t": times}
+
+
+def decode_visemes(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Decodifica el formato compacto a la lista clásica de visemas.
+
+    Raises:
+        ValueError: Si el formato no es compact-v1
+    """
+    if payload.get("format") != COMPACT_FORMAT:
+        raise ValueError(f"Formato de visemas no soportado: {payload.get('format')}")
+    return [
+        {"visema": VISEME_CODES[code], "tiempo": ms / 1000}
+        for code, ms in zip(payload.get("v", []), payload.get("t", []))
+    ]
+
+
+def visemas_frame_fields(result: Dict[str, Any], visemas_format: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Campos de visemas para el frame WebSocket según el formato negociado.
+
+    Args:
+        result: Respuesta del servicio de visemas ("visemas" o "visemas_compact")
+        visemas_format: Formato pedido por el cliente (None = lista clásica)
+
+    Returns:
+        {"visemas": [...]} o {"visemas_compact": {...}}
+    """
+    if "visemas_compact" in result:
+        compact = result["visemas_compact"]
+        if visemas_format == COMPACT_FORMAT:
+            return {"visemas_compact": compact}
+        return {"visemas": decode_visemes(compact)}
+
+    visemas = result.get("visemas", [])
+    if visemas_format == COMPACT_FORMAT:
+        return {"visemas_compact": encode_visemes(visemas)}
+    return {"visemas": visemas}
@@ -1,20 +1,153 @@
 import aiohttp
+import asyncio
+import json
+from typing import AsyncIterator
+
+from resilience import ResilientCaller, upstream_error
+from transport import get_endpoint
+from visemas.compact import COMPACT_FORMAT
 
 class LibrosaClient:
-    def __init__(self, service_url: str = "http://localhost:5001"):
-        self.service_url = service_url
-    
-    async def generate_visemes(self, text: str, audio_url: str) -> dict:
-        """Genera visemas usando el servicio HTTP de librosa"""
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "text": text,
-                "audio_url": audio_url
-            }
+    def __init__(self, service_url: str = "http://localhost:5001", payload_format: str = "json",
+                 caller: ResilientCaller = None, mode: str = None):
+        """
+        Args:
+            service_url: URL base del servicio de visemas (http:// o http+unix://)
+            payload_format: "json" (lista clásica) o "compact-v1" (columnar)
+            caller: Deadline/hedging/circuit breaker compartido (None = llamada directa)
+            mode: "audio", "text" o "auto" (None = el configurado en el servicio)
+        """
+        self.endpoint = get_endpoint(service_url)
+        self.service_url = self.endpoint.base_url
+        self.payload_format = payload_format
+        self.caller = caller
+        self.mode = mode
+
+    async def _call(self, request_factory):
+        """Ejecuta un intento a través del caller resiliente, si hay uno"""
+        if self.caller is None:
+            return await request_factory()
+        return await self.caller.call(request_factory)
+
+    def _with_format(self, payload: dict) -> dict:
+        """Agrega el formato de respuesta y el modo negociados con el servicio"""
+        if self.payload_format == COMPACT_FORMAT:
+            payload["format"] = COMPACT_FORMAT
+        if self.mode:
+            payload["mode"] = self.mode
+        return payload
+
+    async def generate_visemes(self, text: str, audio_url: str, duration: float = None,
+                               audio_path: str = None) -> dict:
+        """
+        Genera visemas usando el servicio HTTP de librosa
+
+        Args:
+            duration: Duración del audio en segundos, si ya se conoce (el modo
+                texto no necesita leer la cabecera del WAV)
+            audio_path: Ruta del WAV en el almacén compartido con el TTS (el
+                servicio lo lee sin descargar audio_url)
+
+        Returns:
+            {"visemas": [...]} o, en modo compacto, {"visemas_compact": {...}}
+        """
+        return await self._call(lambda: self._generate_visemes(text, audio_url, duration, audio_path))
+
+    async def _generate_visemes(self, text: str, audio_url: str, duration: float = None,
+                                audio_path: str = None) -> dict:
+        """Un intento contra /generate"""
+        session = self.endpoint.session()
+        payload = self._with_format({
+            "text": text,
+            "audio_url": audio_url
+        })
+        if duration is not None:
+            payload["duration"] = duration
+        if audio_path:
+            payload["audio_path"] = audio_path
             
-            async with session.post(f"{self.service_url}/generate", json=payload) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_data = await response.json()
-                    raise Exception(f"Error visemas: {error_data.get('error', 'Unknown error')}")
\ No newline at end of file
+        async with session.post(f"{self.service_url}/generate", json=payload) as response:
+            if response.status == 200:
+                return await response.json()
+            else:
+                raise await upstream_error(response, "Error visemas")
+
+    async def generate_visemes_batch(self, items: list) -> list:
+        """
+        Genera visemas para varias locuciones en una sola llamada al servicio.
+
+        Args:
+            items: Lista de dicts con "text" y "audio_url"
+
+        Returns:
+            Lista (mismo orden) con {"visemas": [...]} (o "visemas_compact")
+            o {"error": "..."} por elemento
+
+        Raises:
+            ValueError: Si algún elemento no es un dict con "audio_url"
+        """
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get("audio_url"):
+                raise ValueError(f"Elemento {index} del batch sin 'audio_url'")
+        return await self._call(lambda: self._generate_visemes_batch(items))
+
+    async def _generate_visemes_batch(self, items: list) -> list:
+        """Un intento contra /generate_batch"""
+        session = self.endpoint.session()
+        payload = self._with_format({
+            "items": [
+                {
+                    "text": item.get("text", ""),
+                    "audio_url": item["audio_url"],
+                    **({"audio_path": item["audio_path"]} if item.get("audio_path") else {})
+                }
+                for item in items
+            ]
+        })
+
+        async with session.post(f"{self.service_url}/generate_batch", json=payload) as response:
+            if response.status == 200:
+                data = await response.json()
+                return data.get("results", [])
+            else:
+                raise await upstream_error(response, "Error visemas batch")
+
+    async def stream_visemes(self, text: str, audio_chunks: AsyncIterator[bytes],
+                             sample_rate: int = 24000) -> AsyncIterator[dict]:
+        """
+        Genera visemas en streaming mientras se envía el audio PCM.
+
+        Args:
+            text: Texto de referencia de la locución
+            audio_chunks: Iterador asíncrono de fragmentos PCM 16 bits mono
+            sample_rate: Frecuencia de muestreo del PCM
+
+        Yields:
+            Eventos {"visema": "...", "tiempo": 0.0} con tiempos absolutos
+        """
+        ws_url = self.service_url.replace("http", "ws", 1) + "/stream"
+
+        session = self.endpoint.session()
+        async with session.ws_connect(ws_url) as ws:
+            await ws.send_json({"type": "start", "text": text, "sample_rate": sample_rate})
+
+            async def send_audio():
+                async for chunk in audio_chunks:
+                    await ws.send_bytes(chunk)
+                await ws.send_json({"type": "end"})
+
+            sender = asyncio.create_task(send_audio())
+            try:
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    event = json.loads(msg.data)
+                    if event.get("type") == "error":
+                        raise Exception(f"Error visemas stream: {event.get('error', 'Unknown error')}")
+                    if event.get("type") == "end":
+                        break
+                    yield {"visema": event["visema"], "tiempo": event["tiempo"]}
+                await sender
+            finally:
+                if not sender.done():
+                    sender.cancel()
@@ -0,0 +1,57 @@
+"""
+Duración de un WAV a partir de su cabecera, sin decodificar el audio.
+
+Permite pedir al servicio de visemas el modo texto + duración sin que tenga
+que descargar ni leer el audio: el backend ya tiene el WAV en base64.
+"""
+import base64
+import binascii
+import struct
+from typing import Optional
+
+# Caracteres base64 decodificados para leer la cabecera (3072 bytes)
+_HEADER_BASE64_CHARS = 4096
+
+
+def wav_duration(header: bytes, total_size: Optional[int] = None) -> Optional[float]:
+    """
+    Duración en segundos según los chunks "fmt " y "data".
+
+    Args:
+        header: Primeros bytes del archivo (al menos hasta el chunk "data")
+        total_size: Tamaño total del archivo; se usa si la cabecera es de
+            streaming (tamaño 0xFFFFFFFF o 0)
+
+    Returns:
+        Duración en segundos, o None si no es un WAV reconocible
+    """
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+
+    byte_rate = None
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack("<I", header[offset + 4:offset + 8])[0]
+        if chunk_id == b"fmt " and offset + 20 <= len(header):
+            byte_rate = struct.unpack("<I", header[offset + 16:offset + 20])[0]
+        elif chunk_id == b"data":
+            data_offset = offset + 8
+            streaming = chunk_size in (0, 0xFFFFFFFF)
+            if total_size is not None and (streaming or data_offset + chunk_size > total_size):
+                chunk_size = total_size - data_offset
+            elif streaming:
+                return None
+            return max(chunk_size, 0) / byte_rate if byte_rate else None
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def wav_duration_from_base64(audio_base64: str) -> Optional[float]:
+    """Duración de un WAV en base64 decodificando solo la cabecera"""
+    try:
+        header = base64.b64decode(audio_base64[:_HEADER_BASE64_CHARS])
+    except (binascii.Error, ValueError):
+        return None
+    total_size = len(audio_base64) * 3 // 4 - audio_base64[-2:].count("=")
+    return wav_duration(header, total_size)
@@ -0,0 +1,83 @@
+"""
+Bundle precalculado de audio + visemas para respuestas fijas y frecuentes.
+
+Se genera offline con build_bundle.py y se carga al arrancar el servidor.
+Formato (JSON):
+
+{
+    "format_version": 1,
+    "bundle_version": "<sha256 de las frases>",
+    "built_at": "2026-01-01T00:00:00",
+    "audio_format": "wav",
+    "entries": {
+        "<respuesta>": {"audio_base64": "...", "audio_format": "wav", "visemas": [...]}
+    },
+    "questions": {
+        "<pregunta normalizada>": "<respuesta>"
+    }
+}
+"""
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Optional
+
+BUNDLE_FORMAT_VERSION = 1
+
+
+def normalize_answer(text: str) -> str:
+    """Clave de una respuesta: solo se colapsan espacios (el audio depende del texto exacto)"""
+    return " ".join(text.split())
+
+
+def normalize_question(text: str) -> str:
+    """Clave de una pregunta: minúsculas, sin acentos, puntuación ni espacios extra"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+class SpeechBundle:
+    """Bundle en memoria con búsqueda exacta por respuesta o pregunta"""
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.bundle_version = data.get("bundle_version")
+        self.entries: Dict[str, Dict[str, Any]] = data.get("entries", {})
+        self.questions: Dict[str, str] = data.get("questions", {})
+
+    @classmethod
+    def load(cls, path: str) -> "SpeechBundle":
+        """
+        Carga el bundle desde disco.
+
+        Returns:
+            Bundle cargado, o vacío si el archivo no existe o la versión no coincide
+        """
+        if not os.path.exists(path):
+            print(f"ℹ️ Sin bundle de voz en {path}")
+            return cls()
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("format_version") != BUNDLE_FORMAT_VERSION:
+            print(f"⚠️ Bundle de voz ignorado: format_version {data.get('format_version')}")
+            return cls()
+
+        bundle = cls(data)
+        print(f"🎁 Bundle de voz {bundle.bundle_version[:12]}: {len(bundle)} respuestas precalculadas")
+        return bundle
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, answer: str) -> Optional[Dict[str, Any]]:
+        """Audio + visemas precalculados para una respuesta exacta"""
+        return self.entries.get(normalize_answer(answer))
+
+    def answer_for(self, question: str) -> Optional[str]:
+        """Respuesta fija para una pregunta frecuente (FAQ), si existe"""
+        return self.questions.get(normalize_question(question))
@@ -1,36 +1,118 @@
 import aiohttp
 import asyncio
 import base64
+from typing import AsyncIterator
+
+from resilience import ResilientCaller, UpstreamHTTPError, upstream_error
+from transport import get_endpoint
 
 class XTTSClient:
-    def __init__(self, service_url: str = "http://localhost:5002"):
-        self.service_url = service_url
+    def __init__(self, service_url: str = "http://localhost:5002", codec: str = "wav",
+                 caller: ResilientCaller = None, shared_audio: bool = False):
+        """
+        Args:
+            service_url: URL base del servicio TTS (http:// o http+unix://)
+            codec: Codec del audio para el cliente ("wav", "wav16k" u "opus")
+            caller: Deadline/hedging/circuit breaker compartido (None = llamada directa)
+            shared_audio: Leer el audio del almacén compartido con el servicio
+                (AUDIO_STORE_SHARED=1) en vez de recibirlo en el cuerpo HTTP
+        """
+        self.endpoint = get_endpoint(service_url)
+        self.service_url = self.endpoint.base_url
+        self.codec = codec
+        self.caller = caller
+        self.shared_audio = shared_audio
     
     async def speech_to_text(self, text: str, entonacion: str = 'neutral') -> dict:
-        """Genera speech usando el servicio HTTP TTS y devuelve audio como base64"""
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "text": text,
-                "entonacion": entonacion
-            }
+        """
+        Genera speech usando el servicio HTTP TTS y devuelve audio como base64
+
+        Pide el audio inline (un solo round trip); si el servicio responde con
+        JSON (versión sin modo inline) descarga el audio desde audio_url.
+        audio_url siempre apunta al WAV original (análisis de visemas).
+
+        Con shared_audio pide el modo "path" y lee el audio del almacén
+        compartido; audio_path (ruta del WAV original o None) se devuelve para
+        que el servicio de visemas tampoco lo descargue.
+        """
+        if self.caller is None:
+            return await self._speech_to_text(text, entonacion)
+        return await self.caller.call(lambda: self._speech_to_text(text, entonacion))
+
+    async def _speech_to_text(self, text: str, entonacion: str) -> dict:
+        """Un intento de síntesis contra el servicio TTS"""
+        session = self.endpoint.session()
+        payload = {
+            "text": text,
+            "entonacion": entonacion,
+            "response_mode": "path" if self.shared_audio else "inline",
+            "codec": self.codec
+        }
             
-            async with session.post(f"{self.service_url}/generate", json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    audio_url = data["audio_url"]
-                    
-                    # Download audio and convert to base64
-                    async with session.get(audio_url) as audio_response:
-                        if audio_response.status == 200:
-                            audio_bytes = await audio_response.read()
-                            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-                            return {
-                                "audio_url": audio_url,  # Keep for backwards compat
-                                "audio_base64": audio_base64,
-                                "audio_format": "wav"
-                            }
-                        else:
-                            raise Exception(f"Error downloading audio: {audio_response.status}")
-                else:
-                    error_data = await response.json()
-                    raise Exception(f"Error TTS: {error_data.get('error', 'Unknown error')}")
\ No newline at end of file
+        async with session.post(f"{self.service_url}/generate", json=payload) as response:
+            if response.status != 200:
+                raise await upstream_error(response, "Error TTS")
+
+            if response.content_type.startswith("audio/"):
+                audio_bytes = await response.read()
+                # URL del WAV original, necesaria para el servicio de visemas
+                audio_url = response.headers.get("X-Audio-Url")
+                audio_format = response.headers.get("X-Audio-Format", "wav")
+                audio_path = response.headers.get("X-Audio-Path")
+            else:
+                data = await response.json()
+                audio_url = data["audio_url"]
+                audio_format = data.get("audio_format", "wav")
+                audio_path = data.get("audio_path")
+                audio_bytes = self._read_shared(data.get("playback_path", audio_path))
+                if audio_bytes is None:
+                    playback_url = data.get("playback_url", audio_url)
+                    audio_bytes = await self._download_audio(session, self.endpoint.http_url(playback_url))
+
+        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+        return {
+            "audio_url": audio_url,
+            "audio_base64": audio_base64,
+            "audio_format": audio_format,
+            "audio_path": audio_path
+        }
+
+    def _read_shared(self, path: str):
+        """Audio del almacén compartido (tmpfs: lectura síncrona de memoria); None si no está"""
+        if not self.shared_audio or not path:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError as e:
+            print(f"⚠️ Audio compartido no disponible ({e}), descargando")
+            return None
+
+    async def _download_audio(self, session: aiohttp.ClientSession, audio_url: str) -> bytes:
+        """Descarga un audio generado (modo URL)"""
+        async with session.get(audio_url) as audio_response:
+            if audio_response.status == 200:
+                return await audio_response.read()
+            raise UpstreamHTTPError(f"Error downloading audio: {audio_response.status}", audio_response.status)
+
+    async def stream_speech(self, text: str, chunk_size: int = 8192) -> AsyncIterator[bytes]:
+        """
+        Genera speech en streaming y entrega el audio en cuanto llega.
+
+        El primer fragmento empieza con la cabecera WAV de streaming (44 bytes),
+        el resto es PCM 16 bits mono (ver X-Sample-Rate en el servicio).
+
+        Args:
+            text: Texto a sintetizar
+            chunk_size: Tamaño máximo de cada fragmento entregado
+
+        Yields:
+            Bytes del WAV en orden
+        """
+        session = self.endpoint.session()
+        async with session.post(f"{self.service_url}/generate_stream", json={"text": text}) as response:
+            if response.status != 200:
+                raise await upstream_error(response, "Error TTS stream")
+
+            async for chunk in response.content.iter_chunked(chunk_size):
+                yield chunk
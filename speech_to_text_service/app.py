@@ -1,20 +1,87 @@
 #!/usr/bin/env python3
 """
-Servicio de Text-to-Speech con Gemini TTS
+Servicio de Text-to-Speech con Gemini TTS (y motor local opcional)
 """
 
 import os
-from flask import Flask, request, jsonify, send_file
+import mimetypes
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 
 from model_gemini.gemini_engine import GeminiEngine
+from model_gemini.local_engine import LocalEngine
+from model_gemini.engine_router import EngineRouter
+from model_gemini.wav import build_wav_header, parse_audio_mime_type
+from audio_store import AudioStore
+from synthesis_pool import CallSlots, SlotTimeoutError, SynthesisPool
+from audio_codecs import CODEC_INFO, SUPPORTED_CODECS, encode_audio
+from profiling import Profiler, register_profiling
+from unix_socket import base_url, serve_unix_socket
 
 app = Flask(__name__)
 CORS(app)
 
+# Cupo de llamadas simultáneas a Gemini: cada síntesis (o cada oración con
+# TTS_SENTENCE_SPLIT=1) y cada stream de /generate_stream ocupa uno
+TTS_MAX_IN_FLIGHT = int(os.getenv("TTS_MAX_IN_FLIGHT", "4"))
+gemini_slots = CallSlots(TTS_MAX_IN_FLIGHT)
+
 # Inicializar Gemini TTS
 print("🔧 Inicializando servicio TTS con Gemini...")
-tts_engine = GeminiEngine()
+tts_engine = GeminiEngine(call_slots=gemini_slots)
+
+# Motor local en CPU (TTS_LOCAL_ENGINE=auto|piper|espeak|none)
+local_engine = None
+if os.getenv("TTS_LOCAL_ENGINE", "auto") != "none":
+    try:
+        local_engine = LocalEngine(
+            backend=os.getenv("TTS_LOCAL_ENGINE", "auto"),
+            piper_model=os.getenv("PIPER_MODEL_PATH"),
+            espeak_voice=os.getenv("ESPEAK_VOICE", "es-419")
+        )
+    except ValueError as e:
+        print(f"⚠️ {e}")
+
+# Política: local para textos cortos/fijos o si Gemini está lento/caído
+tts_router = EngineRouter(
+    tts_engine,
+    local_engine,
+    short_max_chars=int(os.getenv("TTS_LOCAL_MAX_CHARS", "40")),
+    canned_phrases=EngineRouter.load_phrases(os.getenv("TTS_LOCAL_PHRASES")),
+    slow_rtf=float(os.getenv("TTS_GEMINI_SLOW_RTF", "1.0")),
+    slow_window=int(os.getenv("TTS_GEMINI_SLOW_WINDOW", "5")),
+    cooldown_seconds=float(os.getenv("TTS_GEMINI_COOLDOWN_SECONDS", "60"))
+)
+ENGINE_NAME = tts_router.name if local_engine else tts_engine.name
+
+# Almacén acotado de audios generados (servido en /voice/<filename>)
+audio_store = AudioStore(
+    root_dir=os.getenv("AUDIO_STORE_DIR") or None,
+    max_bytes=int(os.getenv("AUDIO_STORE_MAX_BYTES", str(200 * 1024 * 1024))),
+    max_age_seconds=float(os.getenv("AUDIO_STORE_MAX_AGE", "600")),
+    eviction_interval=float(os.getenv("AUDIO_STORE_EVICTION_INTERVAL", "30"))
+)
+# Almacén compartido con los servicios del pod (AUDIO_STORE_DIR en /dev/shm):
+# las respuestas incluyen la ruta de cada audio para leerlo sin HTTP
+AUDIO_STORE_SHARED = os.getenv("AUDIO_STORE_SHARED", "0") == "1"
+# Socket Unix adicional al puerto TCP (servicios en el mismo pod)
+TTS_SOCKET = os.getenv("TTS_SOCKET")
+
+# Pool acotado de síntesis; peticiones idénticas comparten síntesis (y motor)
+synthesis_pool = SynthesisPool(
+    tts_router.synthesize_with_engine,
+    max_in_flight=TTS_MAX_IN_FLIGHT
+)
+SYNTHESIS_TIMEOUT = float(os.getenv("TTS_SYNTHESIS_TIMEOUT", "60"))
+
+# Codec de salida por defecto (wav, wav16k, opus); el WAV original se conserva
+# siempre en audio_url para el análisis de visemas
+DEFAULT_CODEC = os.getenv("TTS_OUTPUT_CODEC", "wav")
+
+# Perfilado bajo demanda (/debug/*, solo con PROFILING_TOKEN) y pilas con SIGUSR1
+profiler = Profiler(os.getenv("PROFILING_DIR"), name="tts")
+register_profiling(app, profiler, os.getenv("PROFILING_TOKEN"))
+profiler.install_signal_handler()
 print("✅ Servicio TTS listo")
 
 @app.route('/health', methods=['GET'])
@@ -23,7 +90,10 @@ def health_check():
     return jsonify({
         "status": "healthy", 
         "service": "speech_to_text_service",
-        "engine": "gemini"
+        "engine": ENGINE_NAME,
+        "engines": tts_router.stats(),
+        "audio_store": audio_store.stats(),
+        "synthesis": {**synthesis_pool.stats(), "slots": gemini_slots.stats()}
     })
 
 @app.route('/generate', methods=['POST'])
@@ -33,52 +103,202 @@ def generate_speech():
     
     Body JSON:
     {
-        "text": "Hola mundo"
+        "text": "Hola mundo",
+        "voice": "Despina",                   (opcional)
+        "response_mode": "url" | "inline" | "path",  (opcional, default "url")
+        "codec": "wav" | "wav16k" | "opus"    (opcional, default TTS_OUTPUT_CODEC)
     }
+
+    Peticiones concurrentes con el mismo (text, voice) comparten una sola
+    síntesis en Gemini.
     
-    Response:
+    Response (url):
     {
         "audio_url": "/voice/filename.wav",
-        "engine": "gemini"
+        "audio_format": "wav",
+        "playback_url": "/voice/filename.ogg",   (solo si codec != wav)
+        "engine": motor que habló ("gemini", "piper", "espeak")
     }
+
+    Response (inline):
+        Cuerpo con el audio en el codec pedido y headers X-Audio-Url (WAV
+        original servido en /voice, para el servicio de visemas),
+        X-Audio-Format (wav u ogg) y X-Engine
+
+    Con AUDIO_STORE_SHARED=1 las respuestas incluyen además la ruta local de
+    cada audio: "audio_path" / "playback_path" (url y path) o el header
+    X-Audio-Path (inline). El modo "path" responde como "url" sin cuerpo de
+    audio: el cliente lee el archivo del almacén compartido.
+
+    Las URLs de una petición llegada por TTS_SOCKET son http+unix://.
     """
     try:
         data = request.get_json()
         
         if not data or not data.get('text'):
             return jsonify({"error": "text requerido"}), 400
+
+        response_mode = data.get('response_mode', 'url')
+        if response_mode not in ('url', 'inline', 'path'):
+            return jsonify({"error": f"response_mode no soportado: {response_mode}"}), 400
+
+        codec = data.get('codec', DEFAULT_CODEC)
+        if codec not in SUPPORTED_CODECS:
+            return jsonify({"error": f"codec no soportado: {codec}"}), 400
         
         text = data['text']
         print(f"🎤 Generando TTS: '{text[:50]}...'")
         
-        audio_file = tts_engine.generate_speech(text)
+        audio_bytes, extension, engine_name = synthesis_pool.synthesize(
+            text, data.get('voice'), timeout=SYNTHESIS_TIMEOUT
+        )
         
-        filename = os.path.basename(audio_file)
-        server_url = request.host_url.rstrip('/')
+        filename = audio_store.put(audio_bytes, extension)
+        server_url = base_url(request.environ) or request.host_url.rstrip('/')
         audio_url = f"{server_url}/voice/{filename}"
-        
-        return jsonify({
+        audio_path = os.path.join(audio_store.root_dir, filename) if AUDIO_STORE_SHARED else None
+
+        codec_extension, audio_format, codec_mimetype = CODEC_INFO[codec]
+        playback_bytes = encode_audio(audio_bytes, codec) if extension == ".wav" else audio_bytes
+
+        if response_mode == 'inline':
+            headers = {
+                "X-Audio-Url": audio_url,
+                "X-Audio-Format": audio_format,
+                "X-Engine": engine_name
+            }
+            if audio_path:
+                headers["X-Audio-Path"] = audio_path
+            return Response(playback_bytes, mimetype=codec_mimetype, headers=headers)
+
+        result = {
             "audio_url": audio_url,
-            "engine": "gemini"
-        })
+            "audio_format": audio_format,
+            "engine": engine_name
+        }
+        if audio_path:
+            result["audio_path"] = audio_path
+        if codec != "wav":
+            playback_filename = audio_store.put(playback_bytes, codec_extension)
+            result["playback_url"] = f"{server_url}/voice/{playback_filename}"
+            if audio_path:
+                result["playback_path"] = os.path.join(audio_store.root_dir, playback_filename)
+        
+        return jsonify(result)
         
     except Exception as e:
         print(f"❌ Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/generate_stream', methods=['POST'])
+def generate_speech_stream():
+    """
+    Genera speech desde texto enviando el audio mientras Gemini lo produce
+
+    Body JSON:
+    {
+        "text": "Hola mundo"
+    }
+
+    Response (chunked, audio/wav):
+        Cabecera WAV de 44 bytes (tamaño 0xFFFFFFFF, streaming) seguida de
+        cada fragmento PCM en cuanto llega. Headers X-Sample-Rate y
+        X-Bits-Per-Sample describen el PCM.
+
+    Un stream de Gemini ocupa uno de los TTS_MAX_IN_FLIGHT cupos mientras
+    dura (503 si no se libera ninguno en TTS_SYNTHESIS_TIMEOUT).
+    """
+    data = request.get_json()
+
+    if not data or not data.get('text'):
+        return jsonify({"error": "text requerido"}), 400
+
+    text = data['text']
+    print(f"🎤 Generando TTS (stream): '{text[:50]}...'")
+
+    try:
+        gemini_slots.acquire("stream", timeout=SYNTHESIS_TIMEOUT)
+    except SlotTimeoutError as e:
+        return jsonify({"error": str(e)}), 503
+    released = []
+
+    def release_slot():
+        if not released:
+            released.append(True)
+            gemini_slots.release("stream")
+
+    # Esperar el primer fragmento: los errores previos aún pueden devolver 500
+    # (si Gemini falla antes, el router responde con el motor local)
+    try:
+        engine, chunks = tts_router.open_stream(text)
+        first_data, mime_type = next(chunks)
+    except StopIteration:
+        release_slot()
+        return jsonify({"error": "No se generó audio"}), 500
+    except Exception as e:
+        release_slot()
+        print(f"❌ Error: {e}")
+        return jsonify({"error": str(e)}), 500
+    if engine is not tts_engine:
+        # El motor local no consume cupo de Gemini
+        release_slot()
+
+    headers = {"X-Engine": engine.name}
+
+    if mimetypes.guess_extension(mime_type) is None:
+        # PCM crudo: la cabecera WAV se construye antes del primer fragmento
+        parameters = parse_audio_mime_type(mime_type)
+        header = build_wav_header(parameters["rate"], parameters["bits_per_sample"])
+        headers["X-Sample-Rate"] = str(parameters["rate"])
+        headers["X-Bits-Per-Sample"] = str(parameters["bits_per_sample"])
+        response_mimetype = 'audio/wav'
+    else:
+        header = b""
+        response_mimetype = mime_type
+
+    def generate():
+        yield header + first_data
+        try:
+            for chunk_data, _ in chunks:
+                yield chunk_data
+        except Exception as e:
+            # El status ya se envió: solo se puede cortar el stream
+            print(f"❌ Error en stream TTS: {e}")
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype=response_mimetype,
+        headers=headers
+    )
+    # Se llama al cerrar la respuesta, también si el cliente corta el stream
+    response.call_on_close(release_slot)
+    return response
+
 @app.route('/voice/<filename>', methods=['GET'])
 def serve_audio(filename):
     """Sirve archivos de audio generados"""
-    file_path = os.path.join(tts_engine._temp_dir, filename)
+    file_path = audio_store.path(filename)
     
-    if not os.path.exists(file_path):
+    if file_path is None:
         return jsonify({"error": "Archivo no encontrado"}), 404
     
-    return send_file(file_path, mimetype='audio/wav')
+    mimetype = mimetypes.guess_type(filename)[0] or 'audio/wav'
+    return send_file(file_path, mimetype=mimetype)
 
 if __name__ == '__main__':
     print("🎤 Iniciando TTS Gemini en puerto 5002...")
     try:
-        app.run(host='0.0.0.0', port=5002, debug=True)
+        # Servidor multihilo: las peticiones esperan en el pool, no en serie.
+        # TTS_DEBUG=1 reactiva el modo debug (recarga automática).
+        if TTS_SOCKET:
+            serve_unix_socket(app, TTS_SOCKET)
+        app.run(
+            host='0.0.0.0',
+            port=5002,
+            debug=os.getenv("TTS_DEBUG") == "1",
+            threaded=True
+        )
     finally:
-        tts_engine.cleanup()
\ No newline at end of file
+        synthesis_pool.shutdown()
+        tts_router.cleanup()
+        audio_store.cleanup()
\ No newline at end of file
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Codecs de salida para el audio TTS
+
+- wav:     WAV PCM tal cual lo produce Gemini (24 kHz, 16 bits, mono)
+- wav16k:  WAV PCM remuestreado a 16 kHz mono vía ffmpeg
+- opus:    Opus en contenedor OGG vía ffmpeg (mucho menor tamaño)
+"""
+
+import struct
+import subprocess
+
+from model_gemini.wav import pcm_to_wav
+
+SUPPORTED_CODECS = ("wav", "wav16k", "opus")
+
+# Codec -> (extensión, audio_format para el cliente, mimetype)
+CODEC_INFO = {
+    "wav": (".wav", "wav", "audio/wav"),
+    "wav16k": (".wav", "wav", "audio/wav"),
+    "opus": (".ogg", "ogg", "audio/ogg"),
+}
+
+OPUS_BITRATE = "24k"
+
+
+def encode_audio(wav_bytes: bytes, codec: str) -> bytes:
+    """
+    Codifica un WAV PCM al codec pedido
+
+    Args:
+        wav_bytes: WAV PCM mono (cabecera de 44 bytes)
+        codec: Uno de SUPPORTED_CODECS
+
+    Returns:
+        Bytes codificados
+    """
+    if codec == "wav":
+        return wav_bytes
+    if codec == "wav16k":
+        return resample_wav(wav_bytes, 16000)
+    if codec == "opus":
+        return _ffmpeg_opus(wav_bytes)
+    raise ValueError(f"Codec no soportado: {codec}")
+
+
+def resample_wav(wav_bytes: bytes, target_rate: int) -> bytes:
+    """
+    Remuestrea un WAV PCM mono de 16 bits
+
+    Args:
+        wav_bytes: WAV con cabecera canónica de 44 bytes
+        target_rate: Frecuencia de muestreo destino
+
+    Returns:
+        WAV remuestreado
+    """
+    (sample_rate,) = struct.unpack_from("<I", wav_bytes, 24)
+    (bits_per_sample,) = struct.unpack_from("<H", wav_bytes, 34)
+    if bits_per_sample != 16:
+        raise ValueError("Solo se soporta PCM de 16 bits")
+    if sample_rate == target_rate:
+        return wav_bytes
+
+    # PCM crudo a la salida: un WAV escrito a un pipe no lleva los tamaños en
+    # la cabecera, y los clientes la leen para calcular la duración
+    resampled = _ffmpeg(wav_bytes, ["-ar", str(target_rate), "-ac", "1", "-f", "s16le"], "remuestreando WAV")
+    return pcm_to_wav(resampled, target_rate)
+
+
+def _ffmpeg_opus(wav_bytes: bytes) -> bytes:
+    """Codifica WAV a Opus/OGG con ffmpeg"""
+    return _ffmpeg(
+        wav_bytes,
+        ["-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg"],
+        "codificando Opus",
+    )
+
+
+def _ffmpeg(wav_bytes: bytes, output_args: list, action: str) -> bytes:
+    """Pasa un WAV por ffmpeg (stdin -> stdout) con los argumentos de salida dados"""
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "wav", "-i", "pipe:0",
+            *output_args,
+            "pipe:1",
+        ],
+        input=wav_bytes,
+        capture_output=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise Exception(f"Error {action}: {result.stderr.decode(errors='ignore').strip()}")
+    return result.stdout
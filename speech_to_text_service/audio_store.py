@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Almacén acotado de audios generados
+
+- IDs por contenido (sha256): sin colisiones entre peticiones concurrentes
+- Escritura atómica (archivo temporal + rename)
+- Límite de tamaño total y de antigüedad con desalojo en segundo plano
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+
+class AudioStore:
+    """Almacén de audios en disco con límites de tamaño y antigüedad"""
+
+    _FILENAME_RE = re.compile(r"^[0-9a-f]{32}\.[a-z0-9]{1,5}$")
+
+    def __init__(self, root_dir: str = None, max_bytes: int = 200 * 1024 * 1024,
+                 max_age_seconds: float = 600, eviction_interval: float = 30):
+        """
+        Args:
+            root_dir: Directorio de almacenamiento (temporal si es None)
+            max_bytes: Tamaño total máximo en bytes
+            max_age_seconds: Antigüedad máxima de un audio
+            eviction_interval: Segundos entre pasadas de desalojo
+        """
+        self.root_dir = root_dir or tempfile.mkdtemp(prefix="tts_audio_")
+        os.makedirs(self.root_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        self._lock = threading.Lock()
+        self._stats = {"stored": 0, "evicted": 0, "served": 0}
+
+        self._stop = threading.Event()
+        self._evictor = threading.Thread(
+            target=self._eviction_loop, args=(eviction_interval,), daemon=True
+        )
+        self._evictor.start()
+
+    def put(self, data: bytes, extension: str = ".wav") -> str:
+        """
+        Guarda un audio de forma atómica
+
+        Args:
+            data: Bytes del audio
+            extension: Extensión del archivo (con punto)
+
+        Returns:
+            Nombre de archivo (ID de contenido + extensión)
+        """
+        content_id = hashlib.sha256(data).hexdigest()[:32]
+        filename = f"{content_id}{extension}"
+        final_path = os.path.join(self.root_dir, filename)
+
+        fd, temp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, final_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._lock:
+            self._stats["stored"] += 1
+
+        if self._total_bytes() > self.max_bytes:
+            self.evict()
+
+        return filename
+
+    def path(self, filename: str):
+        """
+        Ruta de un audio almacenado
+
+        Returns:
+            Ruta absoluta, o None si el nombre es inválido o ya no existe
+        """
+        if not self._FILENAME_RE.match(filename):
+            return None
+        file_path = os.path.join(self.root_dir, filename)
+        if not os.path.exists(file_path):
+            return None
+        with self._lock:
+            self._stats["served"] += 1
+        return file_path
+
+    def evict(self) -> int:
+        """
+        Elimina audios vencidos y, si hace falta, los más antiguos hasta
+        quedar bajo el límite de tamaño
+
+        Returns:
+            Número de archivos eliminados
+        """
+        now = time.time()
+        entries = self._entries()
+        removed = 0
+
+        with self._lock:
+            total = sum(size for _, size, _ in entries)
+            for file_path, size, mtime in entries:  # Ordenados del más antiguo al más nuevo
+                expired = now - mtime > self.max_age_seconds
+                if not expired and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            self._stats["evicted"] += removed
+
+        return removed
+
+    def stats(self) -> dict:
+        """Estadísticas de uso para /health"""
+        entries = self._entries()
+        with self._lock:
+            return {
+                "files": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "max_age_seconds": self.max_age_seconds,
+                **self._stats,
+            }
+
+    def cleanup(self):
+        """Detiene el desalojo y borra el directorio"""
+        self._stop.set()
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def _entries(self):
+        """Lista (ruta, tamaño, mtime) de audios, del más antiguo al más nuevo"""
+        entries = []
+        try:
+            names = os.listdir(self.root_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not self._FILENAME_RE.match(name):
+                continue  # Ignorar escrituras en curso (.part)
+            file_path = os.path.join(self.root_dir, name)
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            entries.append((file_path, st.st_size, st.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def _total_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _eviction_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.evict()
+            except Exception as e:
+                print(f"⚠️ Error en desalojo de audios: {e}")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GeminiEngine vs LocalEngine sobre el mismo corpus
+
+Uso:
+    python benchmarks/engines.py [--repeat 3] [--corpus frases.json]
+
+Reporta por motor la latencia p50/p95, la duración del audio generado y el
+factor de tiempo real (RTF = latencia / duración del audio). Gemini se omite
+si no hay GEMINI_API_KEY; el motor local, si no hay piper ni espeak-ng.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Corpus por defecto: frases fijas cortas y respuestas típicas del agente
+DEFAULT_CORPUS = [
+    "¡Hola! ¿En qué te puedo ayudar hoy?",
+    "¡Hasta luego! Éxito con tu negocio.",
+    "No puedo ayudarte con eso, pero sí con temas de tu negocio.",
+    "Puedes pagar a tu proveedor desde la app, en la sección de pagos.",
+    "Te recomiendo separar el dinero del negocio del personal y anotar tus gastos diarios.",
+    "Si te sientes estresado, toma pausas cortas, respira profundo y organiza tus pendientes por prioridad.",
+]
+
+
+def wav_duration(wav_bytes: bytes) -> float:
+    """Duración de un WAV PCM con cabecera de 44 bytes"""
+    (byte_rate,) = struct.unpack_from("<I", wav_bytes, 28)
+    return (len(wav_bytes) - 44) / byte_rate
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(engine, corpus, repeat):
+    latencies, rtfs, durations = [], [], []
+    for _ in range(repeat):
+        for text in corpus:
+            start = time.perf_counter()
+            audio, _ = engine.synthesize(text)
+            elapsed = time.perf_counter() - start
+            duration = wav_duration(audio)
+            latencies.append(elapsed)
+            durations.append(duration)
+            rtfs.append(elapsed / duration if duration else float("inf"))
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "audio": statistics.mean(durations),
+        "rtf": statistics.median(rtfs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de motores TTS")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--corpus", help="Lista JSON de frases")
+    args = parser.parse_args()
+
+    corpus = DEFAULT_CORPUS
+    if args.corpus:
+        with open(args.corpus, "r", encoding="utf-8") as f:
+            corpus = json.load(f)
+
+    engines = []
+    if os.environ.get("GEMINI_API_KEY"):
+        from model_gemini.gemini_engine import GeminiEngine
+        engines.append(GeminiEngine())
+    try:
+        from model_gemini.local_engine import LocalEngine
+        engines.append(LocalEngine(
+            backend=os.getenv("TTS_LOCAL_ENGINE", "auto"),
+            piper_model=os.getenv("PIPER_MODEL_PATH")
+        ))
+    except ValueError as e:
+        print(f"⚠️ {e}")
+
+    if not engines:
+        print("❌ Ningún motor disponible")
+        return
+
+    print(f"\n{len(corpus)} frases x {args.repeat} repeticiones")
+    print(f"{'motor':>8} {'p50 (s)':>8} {'p95 (s)':>8} {'audio (s)':>10} {'RTF':>6}")
+    for engine in engines:
+        result = run(engine, corpus, args.repeat)
+        print(f"{engine.name:>8} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+              f"{result['audio']:>10.2f} {result['rtf']:>6.2f}")
+        engine.cleanup()
+
+
+if __name__ == "__main__":
+    main()
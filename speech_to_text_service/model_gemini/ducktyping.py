@@ -0,0 +1,41 @@
+from typing import Iterator, Optional, Protocol, Tuple
+
+
+class TTSEngineProtocol(Protocol):
+    """
+    Protocol defining the interface expected for a TTS engine.
+
+    Any class implementing this protocol must have:
+    - name: Engine identifier reported to clients ("gemini", "local", ...)
+    - synthesize(text, voice_name) -> (bytes, extension): Full audio in memory
+    - stream_speech(text, voice_name) -> Iterator[(bytes, mime_type)]: Audio chunks
+    - cleanup() -> None: Release resources
+    """
+
+    name: str
+
+    def synthesize(self, text: str, voice_name: Optional[str] = None) -> Tuple[bytes, str]:
+        """
+        Synthesize text to audio.
+
+        Args:
+            text: Text to synthesize
+            voice_name: Engine-specific voice (None = engine default)
+
+        Returns:
+            Tuple (audio bytes, file extension with dot)
+        """
+        ...
+
+    def stream_speech(self, text: str, voice_name: Optional[str] = None) -> Iterator[Tuple[bytes, str]]:
+        """
+        Synthesize text yielding audio chunks as they are produced.
+
+        Yields:
+            Tuples (chunk bytes, mime_type), e.g. raw PCM as "audio/L16;rate=24000"
+        """
+        ...
+
+    def cleanup(self) -> None:
+        """Release temporary files, pools and processes."""
+        ...
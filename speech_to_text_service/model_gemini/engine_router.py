@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Política de selección de motor TTS
+
+- Textos cortos o frases fijas -> motor local
+- Gemini lento o caído (en enfriamiento) -> motor local
+- Resto -> Gemini, con fallback al motor local si falla (también en streaming,
+  mientras no se haya enviado el primer fragmento)
+- Si el motor local falla se usa Gemini (p. ej. un error de piper en un texto
+  corto no es motivo para responder 500)
+
+"Lento" se mide en segundos de síntesis por segundo de audio (real-time
+factor), no en segundos absolutos: un texto largo tarda más sin que Gemini
+esté degradado. Se degrada cuando la mediana de las últimas llamadas supera
+el umbral, así una síntesis lenta aislada no manda todo el tráfico al motor
+local.
+"""
+
+import json
+import statistics
+import threading
+import time
+from collections import deque
+
+from model_gemini.wav import wav_duration
+
+# Estimación de duración para audio sin cabecera WAV (español, voz normal)
+CHARS_PER_AUDIO_SECOND = 15
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class EngineRouter:
+    """Enruta cada síntesis al motor adecuado (implementa TTSEngineProtocol)"""
+
+    name = "auto"
+
+    def __init__(self, primary, local=None, short_max_chars: int = 40,
+                 canned_phrases=(), slow_rtf: float = 1.0, slow_window: int = 5,
+                 cooldown_seconds: float = 60):
+        """
+        Args:
+            primary: Motor principal (GeminiEngine)
+            local: Motor local (LocalEngine) o None para usar solo el principal
+            short_max_chars: Textos de hasta este largo van al motor local
+            canned_phrases: Frases fijas que siempre van al motor local
+            slow_rtf: Segundos de síntesis por segundo de audio que se consideran lentos
+            slow_window: Llamadas recientes a Gemini cuya mediana se compara con slow_rtf
+            cooldown_seconds: Tiempo en motor local tras un fallo o lentitud de Gemini
+        """
+        self.primary = primary
+        self.local = local
+        self.short_max_chars = short_max_chars
+        self.canned_phrases = {_normalize(p) for p in canned_phrases}
+        self.slow_rtf = slow_rtf
+        self.cooldown_seconds = cooldown_seconds
+
+        self._degraded_until = 0.0
+        self._recent_rtf = deque(maxlen=slow_window)
+        self._lock = threading.Lock()
+        self._stats = {"primary": 0, "local": 0, "fallbacks": 0, "local_fallbacks": 0, "degradations": 0}
+
+    @staticmethod
+    def load_phrases(path: str) -> list:
+        """Lee una lista JSON de frases fijas (vacía si no hay archivo)"""
+        if not path:
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [p if isinstance(p, str) else p["answer"] for p in json.load(f)]
+
+    def choose(self, text: str):
+        """Motor para un texto según la política"""
+        if self.local is None:
+            return self.primary
+        if len(text) <= self.short_max_chars or _normalize(text) in self.canned_phrases:
+            return self.local
+        if time.monotonic() < self._degraded_until:
+            return self.local
+        return self.primary
+
+    def synthesize(self, text: str, voice_name: str = None) -> tuple:
+        """Sintetiza con el motor elegido; si uno falla usa el otro"""
+        audio_bytes, extension, _ = self.synthesize_with_engine(text, voice_name)
+        return audio_bytes, extension
+
+    def synthesize_with_engine(self, text: str, voice_name: str = None) -> tuple:
+        """
+        Como synthesize, indicando qué motor habló
+
+        Returns:
+            Tupla (bytes del audio, extensión, nombre del motor)
+        """
+        local_failed = False
+        if self.choose(text) is self.local:
+            try:
+                result = self.local.synthesize(text, voice_name)
+            except Exception as e:
+                print(f"⚠️ {self.local.name} falló, usando {self.primary.name}: {e}")
+                self._count("local_fallbacks")
+                local_failed = True
+            else:
+                self._count("local")
+                return (*result, self.local.name)
+
+        start = time.monotonic()
+        try:
+            result = self.primary.synthesize(text, voice_name)
+        except Exception as e:
+            if self.local is None or local_failed:
+                raise
+            print(f"⚠️ {self.primary.name} falló, usando motor local: {e}")
+            self._degrade()
+            self._count("fallbacks")
+            return (*self.local.synthesize(text, voice_name), self.local.name)
+
+        self._count("primary")
+        self._record_latency(time.monotonic() - start, text, *result)
+        return (*result, self.primary.name)
+
+    def open_stream(self, text: str, voice_name: str = None) -> tuple:
+        """
+        Inicia el streaming con el motor elegido y espera el primer fragmento
+
+        Si un motor falla antes del primer fragmento se usa el otro; un fallo
+        posterior corta el stream (la respuesta ya empezó).
+
+        Returns:
+            Tupla (motor usado, iterador de (bytes, mime_type) desde el primer fragmento)
+
+        Raises:
+            StopIteration: El motor terminó sin generar audio
+        """
+        local_failed = False
+        if self.choose(text) is self.local:
+            try:
+                chunks = self.local.stream_speech(text, voice_name)
+                first = next(chunks)
+            except StopIteration:
+                raise
+            except Exception as e:
+                print(f"⚠️ {self.local.name} falló en streaming, usando {self.primary.name}: {e}")
+                self._count("local_fallbacks")
+                local_failed = True
+            else:
+                self._count("local")
+                return self.local, self._prepend(chunks, first)
+
+        try:
+            chunks = self.primary.stream_speech(text, voice_name)
+            first = next(chunks)
+        except StopIteration:
+            raise
+        except Exception as e:
+            if self.local is None or local_failed:
+                raise
+            print(f"⚠️ {self.primary.name} falló en streaming, usando motor local: {e}")
+            self._degrade()
+            self._count("fallbacks")
+            return self.local, self.local.stream_speech(text, voice_name)
+
+        self._count("primary")
+        return self.primary, self._prepend(chunks, first)
+
+    def stream_speech(self, text: str, voice_name: str = None):
+        """Streaming con el motor elegido (con fallback antes del primer fragmento)"""
+        return self.open_stream(text, voice_name)[1]
+
+    def stats(self) -> dict:
+        """Estadísticas para /health"""
+        with self._lock:
+            return {
+                "primary": self.primary.name,
+                "local": self.local.name if self.local else None,
+                "degraded": time.monotonic() < self._degraded_until,
+                "recent_rtf": round(statistics.median(self._recent_rtf), 3) if self._recent_rtf else None,
+                **self._stats,
+            }
+
+    def cleanup(self):
+        self.primary.cleanup()
+        if self.local is not None:
+            self.local.cleanup()
+
+    @staticmethod
+    def _prepend(chunks, first):
+        """Iterador de fragmentos con first (ya leído del motor) delante"""
+        yield first
+        yield from chunks
+
+    def _record_latency(self, seconds: float, text: str, audio_bytes: bytes, extension: str):
+        """Registra el real-time factor de una síntesis de Gemini y degrada si la mediana es lenta"""
+        audio_seconds = wav_duration(audio_bytes) if extension == ".wav" else 0.0
+        if audio_seconds <= 0:
+            audio_seconds = max(len(text) / CHARS_PER_AUDIO_SECOND, 1.0)
+        with self._lock:
+            self._recent_rtf.append(seconds / audio_seconds)
+            slow = (
+                len(self._recent_rtf) >= min(3, self._recent_rtf.maxlen)
+                and statistics.median(self._recent_rtf) > self.slow_rtf
+            )
+        if slow:
+            self._degrade()
+
+    def _degrade(self):
+        with self._lock:
+            self._degraded_until = time.monotonic() + self.cooldown_seconds
+            self._stats["degradations"] += 1
+            # Tras el enfriamiento Gemini se vuelve a medir desde cero
+            self._recent_rtf.clear()
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
@@ -5,18 +5,28 @@ Configuración: Acento mexicano, voz neutral, poca emoción, informativo
 """
 
 import os
+import re
 import mimetypes
-import struct
 import tempfile
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from google import genai
 from google.genai import types
 
+from model_gemini.wav import build_wav_header, parse_audio_mime_type, pcm_to_wav
+
 
 class GeminiEngine:
-    """Motor TTS usando Gemini 2.5 Pro Preview TTS"""
+    """Motor TTS usando Gemini 2.5 Pro Preview TTS (implementa TTSEngineProtocol)"""
+
+    name = "gemini"
 
-    def __init__(self):
+    def __init__(self, call_slots=None):
+        """
+        Args:
+            call_slots: Cupo compartido de llamadas a Gemini (CallSlots); cada
+                llamada de síntesis ocupa uno, también las de cada oración
+        """
         print("🤖 Inicializando Gemini TTS...")
 
         # Obtener API key del entorno
@@ -30,165 +40,252 @@ class GeminiEngine:
         self.voice_name = "Despina"
 
         self._temp_dir = tempfile.mkdtemp()
+        self.call_slots = call_slots
+
+        # Síntesis por oraciones en paralelo (respuestas de varias oraciones);
+        # los hilos esperan cupo en call_slots antes de llamar a Gemini
+        self.sentence_split = os.environ.get("TTS_SENTENCE_SPLIT", "0") == "1"
+        self.sentence_pause_ms = int(os.environ.get("TTS_SENTENCE_PAUSE_MS", "150"))
+        self.sentence_min_chars = int(os.environ.get("TTS_SENTENCE_MIN_CHARS", "20"))
+        self._sentence_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("TTS_SENTENCE_CONCURRENCY", "4")),
+            thread_name_prefix="tts-sentence"
+        )
 
         print("✅ Gemini TTS inicializado")
         print(f"   Modelo: {self.model}")
         print(f"   Voz: {self.voice_name}")
 
-    def generate_speech(self, text: str) -> str:
+    def _build_request(self, text: str, voice_name: str = None):
         """
-        Genera audio con Gemini TTS
+        Construye contenido y configuración de la petición TTS
 
         Args:
             text: Texto a sintetizar
+            voice_name: Voz prediseñada (por defecto self.voice_name)
 
         Returns:
-            Ruta del archivo de audio generado
+            Tupla (contents, config) para generate_content_stream
         """
-        try:
-            # Agregar instrucciones de estilo al texto
-            text_with_style = f"""Habla con acento mexicano, voz neutral, poca emoción, tono informativo y profesional:
+        # Agregar instrucciones de estilo al texto
+        text_with_style = f"""Habla con acento mexicano, voz neutral, poca emoción, tono informativo y profesional:
 {text}"""
 
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=text_with_style),
-                    ],
-                ),
-            ]
-
-            generate_content_config = types.GenerateContentConfig(
-                temperature=0.7,
-                response_modalities=["audio"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=self.voice_name
-                        )
+        contents = [
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_text(text=text_with_style),
+                ],
+            ),
+        ]
+
+        generate_content_config = types.GenerateContentConfig(
+            temperature=0.7,
+            response_modalities=["audio"],
+            speech_config=types.SpeechConfig(
+                voice_config=types.VoiceConfig(
+                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                        voice_name=voice_name or self.voice_name
                     )
-                ),
-            )
+                )
+            ),
+        )
 
-            # Generar audio en streaming
-            timestamp = datetime.now().strftime("%Y%m%dT%H%M%S")
-            file_index = 0
+        return contents, generate_content_config
 
-            for chunk in self.client.models.generate_content_stream(
-                model=self.model,
-                contents=contents,
-                config=generate_content_config,
+    def stream_speech(self, text: str, voice_name: str = None):
+        """
+        Genera audio con Gemini TTS entregando cada fragmento en cuanto llega
+
+        Args:
+            text: Texto a sintetizar
+            voice_name: Voz prediseñada (por defecto self.voice_name)
+
+        Yields:
+            Tuplas (datos, mime_type) por cada fragmento con audio
+        """
+        contents, generate_content_config = self._build_request(text, voice_name)
+
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=generate_content_config,
+        ):
+            if (
+                chunk.candidates is None
+                or chunk.candidates[0].content is None
+                or chunk.candidates[0].content.parts is None
             ):
-                if (
-                    chunk.candidates is None
-                    or chunk.candidates[0].content is None
-                    or chunk.candidates[0].content.parts is None
-                ):
-                    continue
-
-                if (
-                    chunk.candidates[0].content.parts[0].inline_data
-                    and chunk.candidates[0].content.parts[0].inline_data.data
-                ):
-                    output_file = os.path.join(
-                        self._temp_dir, f"gemini_{timestamp}_{file_index}.wav"
-                    )
-                    file_index += 1
+                continue
 
-                    inline_data = chunk.candidates[0].content.parts[0].inline_data
-                    data_buffer = inline_data.data
-                    file_extension = mimetypes.guess_extension(inline_data.mime_type)
+            inline_data = chunk.candidates[0].content.parts[0].inline_data
+            if inline_data and inline_data.data:
+                yield inline_data.data, inline_data.mime_type
 
-                    if file_extension is None:
-                        file_extension = ".wav"
-                        data_buffer = self._convert_to_wav(
-                            inline_data.data, inline_data.mime_type
-                        )
+    def _synthesize_raw(self, text: str, voice_name: str = None) -> tuple:
+        """
+        Sintetiza un texto uniendo todos los fragmentos de Gemini
 
-                    with open(output_file, "wb") as f:
-                        f.write(data_buffer)
+        Returns:
+            Tupla (bytes tal cual los entrega Gemini, mime_type)
+        """
+        buffers = []
+        mime_type = None
 
-                    # Retornar el primer archivo generado
-                    return output_file
+        with self.call_slots.slot("synthesis") if self.call_slots else nullcontext():
+            for data, chunk_mime_type in self.stream_speech(text, voice_name):
+                buffers.append(data)
+                mime_type = mime_type or chunk_mime_type
 
+        if not buffers:
             raise Exception("No se generó ningún archivo de audio")
 
+        return b"".join(buffers), mime_type
+
+    def split_sentences(self, text: str) -> list:
+        """
+        Divide el texto en oraciones; las muy cortas se unen a la siguiente
+
+        Args:
+            text: Texto a dividir
+
+        Returns:
+            Lista de oraciones en orden
+        """
+        parts = [p.strip() for p in re.split(r"(?<=[.!?…])\s+", text.strip()) if p.strip()]
+
+        sentences = []
+        pending = ""
+        for part in parts:
+            pending = f"{pending} {part}".strip()
+            if len(pending) >= self.sentence_min_chars:
+                sentences.append(pending)
+                pending = ""
+        if pending:
+            if sentences:
+                sentences[-1] = f"{sentences[-1]} {pending}"
+            else:
+                sentences.append(pending)
+        return sentences
+
+    def _synthesize_sentences(self, sentences: list, voice_name: str = None):
+        """
+        Sintetiza oraciones en paralelo y une el PCM en orden en un solo WAV
+
+        Args:
+            sentences: Oraciones en orden
+            voice_name: Voz prediseñada
+
+        Returns:
+            Bytes WAV con silencio de sentence_pause_ms entre oraciones, o None
+            si Gemini no devolvió PCM unible (el llamador sintetiza el texto entero)
+        """
+        futures = [
+            self._sentence_executor.submit(self._synthesize_raw, sentence, voice_name)
+            for sentence in sentences
+        ]
+        results = [future.result() for future in futures]
+
+        mime_type = results[0][1]
+        parameters = self._parse_audio_mime_type(mime_type)
+        for _, segment_mime_type in results:
+            if mimetypes.guess_extension(segment_mime_type) is not None:
+                print(f"⚠️ No se puede unir audio {segment_mime_type}, sintetizando el texto entero")
+                return None
+            if self._parse_audio_mime_type(segment_mime_type) != parameters:
+                print("⚠️ Las oraciones tienen formatos de audio distintos, sintetizando el texto entero")
+                return None
+
+        block_align = parameters["bits_per_sample"] // 8
+        pause_samples = parameters["rate"] * self.sentence_pause_ms // 1000
+        silence = b"\x00" * (pause_samples * block_align)
+
+        pcm = silence.join(data for data, _ in results)
+        return self._convert_to_wav(pcm, mime_type)
+
+    def synthesize(self, text: str, voice_name: str = None) -> tuple:
+        """
+        Genera audio con Gemini TTS en memoria
+
+        Con TTS_SENTENCE_SPLIT=1 los textos de varias oraciones se sintetizan
+        por oración en paralelo y se unen en un solo WAV.
+
+        Args:
+            text: Texto a sintetizar
+            voice_name: Voz prediseñada (por defecto self.voice_name)
+
+        Returns:
+            Tupla (bytes del audio, extensión con punto)
+        """
+        try:
+            if self.sentence_split:
+                sentences = self.split_sentences(text)
+                if len(sentences) > 1:
+                    print(f"✂️ Sintetizando {len(sentences)} oraciones en paralelo")
+                    joined = self._synthesize_sentences(sentences, voice_name)
+                    if joined is not None:
+                        return joined, ".wav"
+
+            data_buffer, mime_type = self._synthesize_raw(text, voice_name)
+            file_extension = mimetypes.guess_extension(mime_type)
+
+            if file_extension is None:
+                file_extension = ".wav"
+                data_buffer = self._convert_to_wav(data_buffer, mime_type)
+
+            return data_buffer, file_extension
+
         except Exception as e:
             raise Exception(f"Error generando TTS con Gemini: {e}")
 
-    def _convert_to_wav(self, audio_data: bytes, mime_type: str) -> bytes:
+    def generate_speech(self, text: str) -> str:
         """
-        Convierte datos de audio raw a formato WAV
+        Genera audio con Gemini TTS
 
         Args:
-            audio_data: Datos de audio raw
-            mime_type: Tipo MIME del audio
+            text: Texto a sintetizar
 
         Returns:
-            Datos de audio en formato WAV
+            Ruta del archivo de audio generado
         """
-        parameters = self._parse_audio_mime_type(mime_type)
-        bits_per_sample = parameters["bits_per_sample"]
-        sample_rate = parameters["rate"]
-        num_channels = 1
-        data_size = len(audio_data)
-        bytes_per_sample = bits_per_sample // 8
-        block_align = num_channels * bytes_per_sample
-        byte_rate = sample_rate * block_align
-        chunk_size = 36 + data_size
-
-        header = struct.pack(
-            "<4sI4s4sIHHIIHH4sI",
-            b"RIFF",
-            chunk_size,
-            b"WAVE",
-            b"fmt ",
-            16,
-            1,
-            num_channels,
-            sample_rate,
-            byte_rate,
-            block_align,
-            bits_per_sample,
-            b"data",
-            data_size,
+        data_buffer, file_extension = self.synthesize(text)
+
+        fd, output_file = tempfile.mkstemp(
+            prefix="gemini_", suffix=file_extension, dir=self._temp_dir
         )
-        return header + audio_data
+        with os.fdopen(fd, "wb") as f:
+            f.write(data_buffer)
 
-    def _parse_audio_mime_type(self, mime_type: str) -> dict:
+        return output_file
+
+    def _convert_to_wav(self, audio_data: bytes, mime_type: str) -> bytes:
         """
-        Extrae parámetros de audio del MIME type
+        Convierte datos de audio raw a formato WAV
 
         Args:
-            mime_type: Tipo MIME (ej: "audio/L16;rate=24000")
+            audio_data: Datos de audio raw
+            mime_type: Tipo MIME del audio
 
         Returns:
-            Diccionario con bits_per_sample y rate
-        """
-        bits_per_sample = 16
-        rate = 24000
-
-        parts = mime_type.split(";")
-        for param in parts:
-            param = param.strip()
-            if param.lower().startswith("rate="):
-                try:
-                    rate_str = param.split("=", 1)[1]
-                    rate = int(rate_str)
-                except (ValueError, IndexError):
-                    pass
-            elif param.startswith("audio/L"):
-                try:
-                    bits_per_sample = int(param.split("L", 1)[1])
-                except (ValueError, IndexError):
-                    pass
-
-        return {"bits_per_sample": bits_per_sample, "rate": rate}
+            Datos de audio en formato WAV
+        """
+        parameters = parse_audio_mime_type(mime_type)
+        return pcm_to_wav(audio_data, parameters["rate"], parameters["bits_per_sample"])
+
+    def build_wav_header(self, sample_rate: int, bits_per_sample: int, data_size: int = None) -> bytes:
+        """Cabecera WAV (PCM mono); data_size None para streaming (ver wav.build_wav_header)"""
+        return build_wav_header(sample_rate, bits_per_sample, data_size)
+
+    def _parse_audio_mime_type(self, mime_type: str) -> dict:
+        """Parámetros de audio del MIME type (ver wav.parse_audio_mime_type)"""
+        return parse_audio_mime_type(mime_type)
 
     def cleanup(self):
         """Limpiar archivos temporales de Gemini"""
         import shutil
 
+        self._sentence_executor.shutdown(wait=False, cancel_futures=True)
+
         if os.path.exists(self._temp_dir):
             shutil.rmtree(self._temp_dir, ignore_errors=True)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Motor TTS local en CPU (sin red)
+
+Backends soportados:
+- piper:    voz neuronal offline (modelo .onnx, ej. es_MX-claude-high.onnx)
+- espeak:   espeak-ng, formantes, muy rápido y sin modelo
+"""
+
+import json
+import os
+import shutil
+import subprocess
+
+from model_gemini.wav import pcm_to_wav
+
+
+class LocalEngine:
+    """Motor TTS local en CPU (implementa TTSEngineProtocol)"""
+
+    name = "local"
+
+    def __init__(self, backend: str = "auto", piper_model: str = None,
+                 espeak_voice: str = "es-419", timeout: float = 20):
+        """
+        Args:
+            backend: "piper", "espeak" o "auto" (piper si hay modelo, si no espeak-ng)
+            piper_model: Ruta al modelo .onnx de Piper
+            espeak_voice: Voz de espeak-ng
+            timeout: Segundos máximos por síntesis
+        """
+        self.piper_model = piper_model
+        self.espeak_voice = espeak_voice
+        self.timeout = timeout
+        self.backend = self._resolve_backend(backend)
+        if self.backend is None:
+            raise ValueError("No hay motor TTS local disponible (piper o espeak-ng)")
+
+        self.sample_rate = self._piper_sample_rate() if self.backend == "piper" else 22050
+        print(f"✅ TTS local inicializado ({self.backend}, {self.sample_rate} Hz)")
+
+    def _resolve_backend(self, backend: str):
+        has_piper = shutil.which("piper") and self.piper_model and os.path.exists(self.piper_model)
+        has_espeak = shutil.which("espeak-ng")
+        if backend == "piper":
+            return "piper" if has_piper else None
+        if backend == "espeak":
+            return "espeak" if has_espeak else None
+        if has_piper:
+            return "piper"
+        if has_espeak:
+            return "espeak"
+        return None
+
+    def _piper_sample_rate(self) -> int:
+        """Lee la frecuencia de muestreo de <modelo>.onnx.json"""
+        config_path = f"{self.piper_model}.json"
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                return int(json.load(f)["audio"]["sample_rate"])
+        except (OSError, KeyError, ValueError):
+            return 22050
+
+    def _synthesize_pcm(self, text: str) -> bytes:
+        """Ejecuta el backend y devuelve PCM 16 bits mono crudo"""
+        if self.backend == "piper":
+            command = ["piper", "--model", self.piper_model, "--output-raw"]
+        else:
+            # espeak-ng escribe un WAV (22050 Hz) por stdout; se descarta la cabecera
+            command = ["espeak-ng", "-v", self.espeak_voice, "--stdout"]
+
+        result = subprocess.run(
+            command,
+            input=text.encode("utf-8"),
+            capture_output=True,
+            timeout=self.timeout,
+            check=False,
+        )
+        if result.returncode != 0 or not result.stdout:
+            raise Exception(f"Error TTS local ({self.backend}): "
+                            f"{result.stderr.decode(errors='ignore').strip()}")
+
+        return result.stdout if self.backend == "piper" else result.stdout[44:]
+
+    def stream_speech(self, text: str, voice_name: str = None):
+        """
+        Genera audio local (un solo fragmento PCM)
+
+        Yields:
+            Tupla (PCM, "audio/L16;rate=...")
+        """
+        yield self._synthesize_pcm(text), f"audio/L16;rate={self.sample_rate}"
+
+    def synthesize(self, text: str, voice_name: str = None) -> tuple:
+        """
+        Genera audio local en memoria
+
+        Args:
+            text: Texto a sintetizar
+            voice_name: Ignorado (la voz depende del modelo configurado)
+
+        Returns:
+            Tupla (bytes WAV, ".wav")
+        """
+        return pcm_to_wav(self._synthesize_pcm(text), self.sample_rate), ".wav"
+
+    def cleanup(self):
+        """Sin recursos que liberar"""
+        pass
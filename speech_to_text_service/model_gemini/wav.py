@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Utilidades WAV/PCM compartidas por los motores TTS
+"""
+
+import struct
+
+
+def build_wav_header(sample_rate: int, bits_per_sample: int, data_size: int = None) -> bytes:
+    """
+    Construye la cabecera WAV (PCM mono)
+
+    Args:
+        sample_rate: Frecuencia de muestreo
+        bits_per_sample: Bits por muestra
+        data_size: Tamaño de los datos en bytes; None para streaming
+            (tamaño desconocido, se usa 0xFFFFFFFF)
+
+    Returns:
+        Cabecera WAV de 44 bytes
+    """
+    num_channels = 1
+    bytes_per_sample = bits_per_sample // 8
+    block_align = num_channels * bytes_per_sample
+    byte_rate = sample_rate * block_align
+    if data_size is None:
+        data_size = 0xFFFFFFFF
+        chunk_size = 0xFFFFFFFF
+    else:
+        chunk_size = 36 + data_size
+
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        chunk_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        num_channels,
+        sample_rate,
+        byte_rate,
+        block_align,
+        bits_per_sample,
+        b"data",
+        data_size,
+    )
+
+
+def parse_audio_mime_type(mime_type: str) -> dict:
+    """
+    Extrae parámetros de audio del MIME type
+
+    Args:
+        mime_type: Tipo MIME (ej: "audio/L16;rate=24000")
+
+    Returns:
+        Diccionario con bits_per_sample y rate
+    """
+    bits_per_sample = 16
+    rate = 24000
+
+    parts = mime_type.split(";")
+    for param in parts:
+        param = param.strip()
+        if param.lower().startswith("rate="):
+            try:
+                rate_str = param.split("=", 1)[1]
+                rate = int(rate_str)
+            except (ValueError, IndexError):
+                pass
+        elif param.startswith("audio/L"):
+            try:
+                bits_per_sample = int(param.split("L", 1)[1])
+            except (ValueError, IndexError):
+                pass
+
+    return {"bits_per_sample": bits_per_sample, "rate": rate}
+
+
+def pcm_to_wav(audio_data: bytes, sample_rate: int, bits_per_sample: int = 16) -> bytes:
+    """
+    Envuelve PCM mono crudo en un WAV
+
+    Args:
+        audio_data: PCM crudo
+        sample_rate: Frecuencia de muestreo
+        bits_per_sample: Bits por muestra
+
+    Returns:
+        Datos de audio en formato WAV
+    """
+    return build_wav_header(sample_rate, bits_per_sample, len(audio_data)) + audio_data
+
+
+def wav_duration(wav_bytes: bytes) -> float:
+    """
+    Duración en segundos de un WAV con cabecera canónica de 44 bytes
+
+    Returns:
+        Segundos de audio (0.0 si la cabecera no es válida)
+    """
+    if len(wav_bytes) < 44 or wav_bytes[:4] != b"RIFF":
+        return 0.0
+    (byte_rate,) = struct.unpack_from("<I", wav_bytes, 28)
+    return (len(wav_bytes) - 44) / byte_rate if byte_rate else 0.0
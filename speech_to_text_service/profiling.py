@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Perfilado bajo demanda del proceso en ejecución
+
+- CPU: muestreo de las pilas de todos los hilos cada interval_ms durante N
+  segundos; se escribe en formato "folded" (speedscope, flamegraph.pl, inferno)
+- Memoria: tracemalloc durante N segundos; top de asignadores y crecimiento
+  (texto) más el snapshot (.tracemalloc, cargable con tracemalloc.Snapshot.load)
+- Pilas: volcado instantáneo de la pila de cada hilo (también con SIGUSR1)
+
+Sin coste en reposo: el hilo de muestreo y tracemalloc solo existen mientras
+dura una captura. Los endpoints solo se registran si PROFILING_TOKEN está
+definido y exigen la cabecera X-Profiling-Token.
+"""
+
+import hmac
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import traceback
+from collections import Counter
+
+MAX_SECONDS = 300
+
+
+class ProfilerBusy(Exception):
+    """Ya hay una captura del mismo tipo en curso"""
+
+
+class Profiler:
+    """Capturas de CPU, memoria y pilas escritas en archivos"""
+
+    def __init__(self, output_dir: str = None, name: str = "service"):
+        """
+        Args:
+            output_dir: Directorio de resultados (temporal si es None)
+            name: Prefijo de los archivos
+        """
+        self.output_dir = output_dir or os.path.join(tempfile.gettempdir(), "profiles")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.name = name
+        self._running = {"cpu": None, "memory": None}
+        self._lock = threading.Lock()
+
+    def cpu(self, seconds: float = 10, interval_ms: float = 5) -> str:
+        """
+        Inicia un perfil de CPU por muestreo en segundo plano
+
+        Returns:
+            Ruta del archivo .folded que se escribirá al terminar
+        """
+        path = self._path("cpu", ".folded")
+        self._start("cpu", self._sample_cpu, _clamp(seconds), max(1.0, interval_ms) / 1000, path)
+        return path
+
+    def memory(self, seconds: float = 10, top: int = 25) -> str:
+        """
+        Inicia una captura de tracemalloc en segundo plano
+
+        Returns:
+            Ruta del informe .txt (el snapshot va al lado con extensión .tracemalloc)
+        """
+        path = self._path("memory", ".txt")
+        self._start("memory", self._trace_memory, _clamp(seconds), int(top), path)
+        return path
+
+    def stacks(self, extra_sections=()) -> tuple:
+        """
+        Vuelca la pila de cada hilo
+
+        Args:
+            extra_sections: Pares (título, texto) adicionales (p. ej. corrutinas)
+
+        Returns:
+            (ruta, texto)
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        lines = []
+        for thread_id, frame in sys._current_frames().items():
+            lines.append(f"--- Hilo {names.get(thread_id, '?')} ({thread_id}) ---\n")
+            lines.extend(traceback.format_stack(frame))
+            lines.append("\n")
+        for title, text in extra_sections:
+            lines.append(f"=== {title} ===\n{text}\n")
+
+        text = "".join(lines)
+        path = self._path("stacks", ".txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path, text
+
+    def status(self) -> dict:
+        """Capturas en curso (ruta de salida) y directorio de resultados"""
+        with self._lock:
+            return {"output_dir": self.output_dir, "running": dict(self._running)}
+
+    def install_signal_handler(self, signum=signal.SIGUSR1):
+        """Volcado de pilas al recibir la señal (solo desde el hilo principal)"""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signum, lambda *_: print(f"🧵 Pilas en {self.stacks()[0]}"))
+
+    def _start(self, kind: str, target, *args):
+        with self._lock:
+            if self._running[kind]:
+                raise ProfilerBusy(f"Captura de {kind} en curso: {self._running[kind]}")
+            self._running[kind] = args[-1]
+
+        def run():
+            try:
+                target(*args)
+                print(f"📈 Perfil de {kind} escrito en {args[-1]}")
+            except Exception as e:
+                print(f"⚠️ Error en perfil de {kind}: {e}")
+            finally:
+                with self._lock:
+                    self._running[kind] = None
+
+        threading.Thread(target=run, name=f"profiler-{kind}", daemon=True).start()
+
+    def _sample_cpu(self, seconds: float, interval: float, path: str):
+        own = threading.get_ident()
+        counts = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _trace_memory(self, seconds: float, top: int, path: str):
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(25)
+        try:
+            start = tracemalloc.take_snapshot()
+            time.sleep(seconds)
+            end = tracemalloc.take_snapshot()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+        end.dump(os.path.splitext(path)[0] + ".tracemalloc")
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+        start, end = start.filter_traces(ignore), end.filter_traces(ignore)
+
+        lines = [f"Top {top} asignadores (memoria viva al final)"]
+        lines += [str(stat) for stat in end.statistics("lineno")[:top]]
+        lines += ["", f"Top {top} crecimientos en {seconds:g} s"]
+        lines += [str(stat) for stat in end.compare_to(start, "lineno")[:top]]
+        largest = end.statistics("traceback")[:1]
+        if largest:
+            lines += ["", f"Traceback del mayor asignador ({largest[0].size / 1024:.1f} KiB)"]
+            lines += largest[0].traceback.format()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _path(self, kind: str, extension: str) -> str:
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        return os.path.join(self.output_dir, f"{self.name}-{os.getpid()}-{kind}-{stamp}{extension}")
+
+
+def _clamp(seconds: float) -> float:
+    return min(max(float(seconds), 0.1), MAX_SECONDS)
+
+
+def register_profiling(app, profiler: Profiler, token: str = None):
+    """
+    Endpoints de perfilado en una app Flask (solo si hay token)
+
+    GET  /debug/profile/cpu?seconds=10&interval_ms=5
+    GET  /debug/profile/memory?seconds=10&top=25
+    GET  /debug/stacks
+    GET  /debug/profile
+    """
+    from flask import jsonify, request
+
+    if not token:
+        return
+
+    def authorized() -> bool:
+        return hmac.compare_digest(request.headers.get("X-Profiling-Token", ""), token)
+
+    def start(capture):
+        if not authorized():
+            return jsonify({"error": "No autorizado"}), 403
+        try:
+            return jsonify({"file": capture()}), 202
+        except ProfilerBusy as e:
+            return jsonify({"error": str(e)}), 409
+        except ValueError as e:
+            # seconds / interval_ms / top no numéricos
+            return jsonify({"error": str(e)}), 400
+
+    @app.route("/debug/profile/cpu", methods=["GET"])
+    def profile_cpu():
+        return start(lambda: profiler.cpu(
+            float(request.args.get("seconds", 10)), float(request.args.get("interval_ms", 5))
+        ))
+
+    @app.route("/debug/profile/memory", methods=["GET"])
+    def profile_memory():
+        return start(lambda: profiler.memory(
+            float(request.args.get("seconds", 10)), int(request.args.get("top", 25))
+        ))
+
+    @app.route("/debug/stacks", methods=["GET"])
+    def dump_stacks():
+        if not authorized():
+            return jsonify({"error": "No autorizado"}), 403
+        path, text = profiler.stacks()
+        return jsonify({"file": path, "stacks": text})
+
+    @app.route("/debug/profile", methods=["GET"])
+    def profile_status():
+        if not authorized():
+            return jsonify({"error": "No autorizado"}), 403
+        return jsonify(profiler.status())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Pool acotado de síntesis TTS con coalescencia de peticiones idénticas
+
+Las peticiones concurrentes con el mismo (texto, voz) comparten una sola
+llamada a Gemini (single-flight). El número de llamadas simultáneas a Gemini
+está limitado por un cupo (CallSlots) que ocupa cada llamada del motor (una
+por texto, o una por oración con TTS_SENTENCE_SPLIT) y cada stream.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class SlotTimeoutError(Exception):
+    """No se liberó un cupo de llamada a tiempo"""
+
+
+class CallSlots:
+    """Cupo compartido de llamadas simultáneas a Gemini (síntesis y streams)"""
+
+    def __init__(self, limit: int = 4):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self._active = {}
+        self._stats = {"acquired": 0, "timeouts": 0}
+
+    def acquire(self, kind: str = "synthesis", timeout: float = None):
+        """
+        Ocupa un cupo (bloquea hasta que haya uno libre)
+
+        Raises:
+            SlotTimeoutError: Si no se liberó ninguno en timeout segundos
+        """
+        if not self._semaphore.acquire(timeout=timeout):
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise SlotTimeoutError(f"Sin cupo para llamar a Gemini en {timeout}s")
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._active[kind] = self._active.get(kind, 0) + 1
+
+    def release(self, kind: str = "synthesis"):
+        with self._lock:
+            self._active[kind] -= 1
+        self._semaphore.release()
+
+    @contextmanager
+    def slot(self, kind: str = "synthesis", timeout: float = None):
+        """Cupo ocupado durante el bloque with"""
+        self.acquire(kind, timeout)
+        try:
+            yield
+        finally:
+            self.release(kind)
+
+    def stats(self) -> dict:
+        """Cupo, llamadas activas por tipo y contadores"""
+        with self._lock:
+            return {"limit": self.limit, "active": dict(self._active), **self._stats}
+
+
+class SynthesisPool:
+    """Ejecuta síntesis en un pool acotado compartiendo llamadas en curso"""
+
+    def __init__(self, synthesize, max_in_flight: int = 4):
+        """
+        Args:
+            synthesize: Función (text, voice_name) -> (bytes, extensión, ...)
+            max_in_flight: Síntesis simultáneas (hilos del pool); el cupo de
+                llamadas a Gemini lo aplica el motor con CallSlots
+        """
+        self._synthesize = synthesize
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="tts-synth"
+        )
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "coalesced": 0, "upstream_calls": 0, "errors": 0}
+
+    def submit(self, text: str, voice_name: str = None) -> Future:
+        """
+        Encola una síntesis o se une a una idéntica que ya esté en curso
+
+        Returns:
+            Future con el resultado de synthesize
+        """
+        key = (text, voice_name)
+        with self._lock:
+            self._stats["requests"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future
+
+            self._stats["upstream_calls"] += 1
+            future = self._executor.submit(self._synthesize, text, voice_name)
+            self._in_flight[key] = future
+
+        future.add_done_callback(lambda f: self._finish(key, f))
+        return future
+
+    def synthesize(self, text: str, voice_name: str = None, timeout: float = None) -> tuple:
+        """Versión bloqueante de submit()"""
+        return self.submit(text, voice_name).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        """Estadísticas para /health"""
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": len(self._in_flight),
+                **self._stats,
+            }
+
+    def shutdown(self):
+        """Detiene el pool sin esperar síntesis pendientes"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, key, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+            if not future.cancelled() and future.exception() is not None:
+                self._stats["errors"] += 1
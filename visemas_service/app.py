@@ -4,26 +4,41 @@ Servicio de generación de visemas usando Flask
 """
 
 import os
+
+# Caché persistente de las funciones JIT (numba) de librosa: debe definirse
+# antes de importar librosa. La imagen Docker la trae ya poblada.
+os.environ.setdefault(
+    "NUMBA_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".numba_cache")
+)
+
 import json
+import struct
+import threading
+import time
 import librosa
 import numpy as np
-import torch
-import requests
 from pathlib import Path
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from flask_sock import Sock
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from profiling import Profiler, register_profiling
+from unix_socket import serve_unix_socket, unix_socket_session
 
 app = Flask(__name__)
 CORS(app)
+sock = Sock(app)
 
-# Configurar MPS para operaciones de audio con GPU si está disponible
-if torch.backends.mps.is_available():
-    device = torch.device("mps")
-    print("🚀 Usando MPS para análisis de audio acelerado")
-else:
-    device = torch.device("cpu")
-    print("⚠️ Usando CPU para análisis de audio")
+# Número máximo de análisis simultáneos dentro de /generate_batch
+BATCH_MAX_WORKERS = int(os.getenv("VISEMAS_BATCH_WORKERS", "4"))
+# Límite de elementos por petición batch
+BATCH_MAX_ITEMS = int(os.getenv("VISEMAS_BATCH_MAX_ITEMS", "32"))
+# Socket Unix adicional al puerto TCP (servicios en el mismo pod)
+VISEMAS_SOCKET = os.getenv("VISEMAS_SOCKET")
+# Directorio compartido con el servicio TTS (p. ej. /dev/shm/tiendapago-audio):
+# un audio_path dentro de él se lee del disco en vez de descargar audio_url
+SHARED_AUDIO_DIR = os.getenv("VISEMAS_SHARED_AUDIO_DIR")
 
 # Mapeo mejorado de fonemas españoles a visemas VRoid
 PHONEME_TO_VISEME = {
@@ -90,6 +105,102 @@ VISEME_INTENSITY = {
     'neutral': 0.0  # Sin movimiento
 }
 
+# Secuencia usada cuando no hay texto de referencia
+DEFAULT_PHONEMES = ['h', 'o', 'l', 'a', 'sil', 'm', 'u', 'n', 'd', 'o']
+
+# Modo rápido (texto + duración): sin decodificar audio
+# - "audio": análisis con librosa (descarga y decodifica el WAV)
+# - "text": fonemas repartidos sobre la duración leída de la cabecera WAV
+# - "auto": "text" si el texto tiene como mucho FAST_MODE_MAX_CHARS caracteres
+# Por defecto "audio": "text"/"auto" cambian la sincronía labial, se activan
+# explícitamente (VISEMAS_MODE o "mode" en la petición)
+VISEME_MODES = ('audio', 'text', 'auto')
+DEFAULT_MODE = os.getenv("VISEMAS_MODE", "audio")
+FAST_MODE_MAX_CHARS = int(os.getenv("VISEMAS_FAST_MAX_CHARS", "80"))
+
+# Duración relativa de cada fonema en el modo rápido (vocal = 1.0)
+PHONEME_DURATION_WEIGHTS = {
+    'a': 1.0, 'e': 1.0, 'i': 0.9, 'o': 1.0, 'u': 0.9,
+    'p': 0.55, 'b': 0.55, 't': 0.55, 'd': 0.55, 'k': 0.55, 'g': 0.55, 'c': 0.55, 'q': 0.55,  # Oclusivas
+    'f': 0.8, 'v': 0.7, 's': 0.85, 'z': 0.85, 'j': 0.8, 'x': 0.9, 'h': 0.4,                  # Fricativas
+    'm': 0.7, 'n': 0.65, 'ñ': 0.7, 'l': 0.65, 'll': 0.75, 'y': 0.7, 'w': 0.6,                # Nasales y líquidas
+    'r': 0.45, 'rr': 0.9, 'ch': 0.85,
+    'sil': 0.3,  # Frontera entre palabras sin puntuación
+}
+DIPHTHONG_DURATION_WEIGHT = 1.4
+DEFAULT_DURATION_WEIGHT = 0.7
+
+# Pausas por puntuación en el modo rápido (segundos, antes de escalar)
+PUNCTUATION_PAUSES = {',': 0.18, ';': 0.25, ':': 0.25, '.': 0.35, '?': 0.35, '!': 0.35, '…': 0.4}
+# Fracción máxima de la duración total que pueden ocupar las pausas
+MAX_PAUSE_FRACTION = 0.35
+# Bytes de cabecera pedidos para leer la duración del WAV
+WAV_HEADER_BYTES = 4096
+
+# Parámetros del análisis en streaming (equivalentes a los del análisis completo:
+# top_db=15, frame_length=2048 y hop_length=512 a 22050 Hz)
+STREAM_TOP_DB = 15
+STREAM_FRAME_SECONDS = 2048 / 22050
+STREAM_HOP_SECONDS = 512 / 22050
+STREAM_SEGMENT_CLOSE_SECONDS = 0.1  # Silencio necesario para cerrar un segmento de voz
+STREAM_PAUSE_SECONDS = 0.15         # Pausa mínima entre segmentos para insertar neutral
+
+# Formato compacto (columnar) de respuesta: tabla fija de códigos + tiempos en ms
+COMPACT_FORMAT = "compact-v1"
+VISEME_CODES = ['neutral', 'aa', 'ee', 'ih', 'oh', 'ou']
+
+def encode_compact_visemes(visemes):
+    """Codifica visemas como {"format", "v", "t"} fusionando repeticiones consecutivas"""
+    codes, times = [], []
+    for item in visemes:
+        code = VISEME_CODES.index(item["visema"]) if item["visema"] in VISEME_CODES else 0
+        if codes and codes[-1] == code:
+            continue
+        codes.append(code)
+        times.append(int(round(item["tiempo"] * 1000)))
+    return {"format": COMPACT_FORMAT, "v": codes, "t": times}
+
+def parse_wav_duration(header, total_size=None):
+    """
+    Duración en segundos a partir de la cabecera WAV (sin decodificar audio)
+
+    Args:
+        header: Primeros bytes del archivo (al menos hasta el chunk "data")
+        total_size: Tamaño total del archivo, si se conoce; se usa cuando la
+            cabecera es de streaming (tamaño 0xFFFFFFFF o 0)
+
+    Returns:
+        Duración en segundos, o None si no se puede determinar
+    """
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+
+    byte_rate = None
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack('<I', header[offset + 4:offset + 8])[0]
+        if chunk_id == b'fmt ' and offset + 20 <= len(header):
+            byte_rate = struct.unpack('<I', header[offset + 16:offset + 20])[0]
+        elif chunk_id == b'data':
+            data_offset = offset + 8
+            streaming = chunk_size in (0, 0xFFFFFFFF)
+            if total_size is not None and (streaming or data_offset + chunk_size > total_size):
+                chunk_size = total_size - data_offset
+            elif streaming:
+                return None
+            if not byte_rate:
+                return None
+            return max(chunk_size, 0) / byte_rate
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+def format_visemes_result(result, response_format):
+    """Adapta {"visemas": [...]} al formato de respuesta pedido"""
+    if response_format == COMPACT_FORMAT and "visemas" in result:
+        return {"visemas_compact": encode_compact_visemes(result["visemas"])}
+    return result
+
 class VisemeGenerator:
     """Generador de visemas inicializado una sola vez para evitar cold starts"""
     
@@ -97,23 +208,86 @@ class VisemeGenerator:
         print("📦 Inicializando generador de visemas...")
         # Inicializar cualquier modelo o configuración pesada aquí
         self._temp_dir = tempfile.mkdtemp()
+        # Pool compartido para análisis en paralelo (batch)
+        self._executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS)
+        # Conexiones reutilizables, también hacia URLs http+unix:// del servicio TTS
+        self._http = unix_socket_session()
+        self._shared_dir = os.path.realpath(SHARED_AUDIO_DIR) if SHARED_AUDIO_DIR else None
         print("✅ Generador de visemas inicializado")
     
     def download_audio(self, audio_url):
         """Descarga audio desde URL"""
         try:
-            response = requests.get(audio_url, timeout=30)
+            response = self._http.get(audio_url, timeout=30)
             response.raise_for_status()
             
-            # Crear archivo temporal
-            temp_file = os.path.join(self._temp_dir, "audio.wav")
-            with open(temp_file, 'wb') as f:
+            # Crear archivo temporal único (peticiones concurrentes no se pisan)
+            fd, temp_file = tempfile.mkstemp(suffix=".wav", dir=self._temp_dir)
+            with os.fdopen(fd, 'wb') as f:
                 f.write(response.content)
             
             return temp_file
         except Exception as e:
             raise Exception(f"Error descargando audio: {e}")
-    
+
+    def read_audio_duration(self, audio_url):
+        """
+        Duración del WAV leyendo solo la cabecera (petición Range)
+
+        Si el servidor ignora el Range y la cabecera es de streaming sin
+        Content-Length, se lee el resto del cuerpo para conocer el tamaño.
+
+        Returns:
+            Duración en segundos, o None si el audio no es WAV
+        """
+        try:
+            headers = {"Range": f"bytes=0-{WAV_HEADER_BYTES - 1}"}
+            with self._http.get(audio_url, headers=headers, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                header = b''
+                chunks = response.iter_content(WAV_HEADER_BYTES)
+                for chunk in chunks:
+                    header += chunk
+                    if len(header) >= WAV_HEADER_BYTES:
+                        break
+
+                total_size = None
+                content_range = response.headers.get('Content-Range', '')
+                if response.status_code == 206 and '/' in content_range:
+                    total = content_range.rsplit('/', 1)[1]
+                    total_size = int(total) if total.isdigit() else None
+                elif response.status_code == 200 and response.headers.get('Content-Length'):
+                    total_size = int(response.headers['Content-Length'])
+
+                duration = parse_wav_duration(header, total_size)
+                if duration is None and response.status_code == 200 and total_size is None:
+                    total_size = len(header) + sum(len(chunk) for chunk in chunks)
+                    duration = parse_wav_duration(header, total_size)
+                return duration
+        except Exception as e:
+            raise Exception(f"Error leyendo cabecera de audio: {e}")
+
+    def shared_audio_path(self, audio_path):
+        """
+        Ruta local de un audio del directorio compartido con el TTS
+
+        Returns:
+            Ruta real, o None si no hay directorio compartido, la ruta queda
+            fuera de él o el archivo ya no existe (se usa audio_url)
+        """
+        if not audio_path or not self._shared_dir:
+            return None
+        real_path = os.path.realpath(audio_path)
+        if os.path.commonpath([real_path, self._shared_dir]) != self._shared_dir:
+            return None
+        return real_path if os.path.isfile(real_path) else None
+
+    def read_file_duration(self, audio_path):
+        """Duración de un WAV local leyendo solo su cabecera"""
+        with open(audio_path, 'rb') as f:
+            header = f.read(WAV_HEADER_BYTES)
+        return parse_wav_duration(header, os.path.getsize(audio_path))
+
     def text_to_advanced_phonemes(self, text):
         """Conversión mejorada de texto a fonemas españoles con patrones avanzados"""
         text = text.lower().strip()
@@ -228,7 +402,7 @@ class VisemeGenerator:
             print(f"📝 Fonemas detectados: {phonemes}")
         else:
             # Patrón más natural para español
-            phonemes = ['h', 'o', 'l', 'a', 'sil', 'm', 'u', 'n', 'd', 'o']
+            phonemes = list(DEFAULT_PHONEMES)
         
         visemes = []
         total_duration = len(y) / sr
@@ -406,10 +580,126 @@ class VisemeGenerator:
             })
         
         return processed
-    
-    def generate_visemes(self, audio_url, text):
-        """Genera visemas desde URL de audio y texto"""
+
+    def text_to_timed_phonemes(self, text):
+        """
+        Fonemas con su peso de duración y pausas según la puntuación
+
+        Returns:
+            Lista de (fonema, valor): peso relativo para fonemas, segundos
+            para las pausas ('pau')
+        """
+        import re
+        timed = []
+        for piece in re.split(r'([,;:.!?…]+)', text or ''):
+            if not piece.strip():
+                continue
+            if piece[0] in PUNCTUATION_PAUSES:
+                pause = max(PUNCTUATION_PAUSES.get(char, 0) for char in piece)
+                if timed and timed[-1][0] == 'pau':
+                    timed[-1] = ('pau', max(timed[-1][1], pause))
+                elif timed:
+                    timed.append(('pau', pause))
+                continue
+
+            phonemes = [p for p in self.text_to_advanced_phonemes(piece) if p != 'neutral']
+            while phonemes and phonemes[0] == 'sil':
+                phonemes.pop(0)
+            while phonemes and phonemes[-1] == 'sil':
+                phonemes.pop()
+            if phonemes and timed and timed[-1][0] != 'pau':
+                timed.append(('sil', PHONEME_DURATION_WEIGHTS['sil']))
+            timed.extend((phoneme, self._phoneme_weight(phoneme)) for phoneme in phonemes)
+        return timed
+
+    def _phoneme_weight(self, phoneme):
+        """Peso de duración de un fonema (los diptongos duran más que una vocal)"""
+        if phoneme in PHONEME_DURATION_WEIGHTS:
+            return PHONEME_DURATION_WEIGHTS[phoneme]
+        if len(phoneme) == 2 and phoneme[0] in 'aeiou' and phoneme[1] in 'aeiouy':
+            return DIPHTHONG_DURATION_WEIGHT
+        return DEFAULT_DURATION_WEIGHT
+
+    def generate_visemes_from_text(self, text, duration):
+        """
+        Modo rápido: reparte los fonemas del texto sobre una duración conocida
+
+        Cada fonema recibe un tramo proporcional a su peso; las pausas de
+        puntuación se colocan primero (escaladas si ocupan más de
+        MAX_PAUSE_FRACTION de la duración) y el resto se reparte entre fonemas.
+        No se descarga ni decodifica audio.
+        """
+        if not duration or duration <= 0:
+            raise ValueError("duración de audio requerida para el modo texto")
+
+        timed = self.text_to_timed_phonemes(text)
+        if not timed:
+            timed = [(phoneme, self._phoneme_weight(phoneme)) for phoneme in DEFAULT_PHONEMES]
+
+        pauses = sum(value for phoneme, value in timed if phoneme == 'pau')
+        pause_scale = min(1.0, MAX_PAUSE_FRACTION * duration / pauses) if pauses else 1.0
+        total_weight = sum(value for phoneme, value in timed if phoneme != 'pau')
+        unit = (duration - pauses * pause_scale) / total_weight if total_weight else 0.0
+
+        visemes = []
+        last_viseme = None
+        viseme_history = []
+        elapsed = 0.0
+
+        for phoneme, value in timed:
+            if phoneme == 'pau':
+                visemes.append({"visema": "neutral", "tiempo": round(elapsed, 2)})
+                # Igual que tras una pausa detectada en el audio
+                viseme_history.clear()
+                last_viseme = "neutral"
+                elapsed += value * pause_scale
+                continue
+
+            viseme = self._generate_smart_viseme(phoneme, last_viseme, viseme_history)
+            visemes.append({"visema": viseme, "tiempo": round(elapsed, 2)})
+            self._update_viseme_history(viseme_history, viseme)
+            last_viseme = viseme
+            elapsed += value * unit
+
+        return self._post_process_visemes(visemes)
+
+    def resolve_mode(self, text, mode=None):
+        """Modo efectivo: "auto" elige "text" para textos cortos"""
+        mode = mode or DEFAULT_MODE
+        if mode == 'auto':
+            return 'text' if text and len(text) <= FAST_MODE_MAX_CHARS else 'audio'
+        return mode
+
+    def generate_visemes(self, audio_url, text, mode=None, duration=None, audio_path=None):
+        """
+        Genera visemas desde URL de audio y texto
+
+        Args:
+            audio_url: URL del WAV
+            text: Texto de la locución
+            mode: "audio", "text" o "auto" (None = VISEMAS_MODE)
+            duration: Duración del audio en segundos, si el cliente ya la conoce
+                (modo texto sin leer la cabecera)
+            audio_path: Ruta del mismo WAV en el directorio compartido con el
+                TTS; si es válida se lee sin pasar por HTTP
+        """
         try:
+            local_path = self.shared_audio_path(audio_path)
+
+            if self.resolve_mode(text, mode) == 'text':
+                if duration is None:
+                    if local_path:
+                        duration = self.read_file_duration(local_path)
+                    else:
+                        duration = self.read_audio_duration(audio_url)
+                if duration:
+                    return {"visemas": self.generate_visemes_from_text(text, duration)}
+                print("⚠️ Duración no disponible en la cabecera, usando análisis de audio")
+
+            if local_path:
+                # El archivo es del TTS: se analiza en su sitio y no se borra
+                return {"visemas": self.estimate_phonemes_from_audio(local_path, text)}
+
             # Descargar audio
             audio_file = self.download_audio(audio_url)
             
@@ -427,13 +717,283 @@ class VisemeGenerator:
         except Exception as e:
             raise Exception(f"Error generando visemas: {e}")
 
+    def _generate_batch_item(self, item):
+        """Procesa un elemento del batch devolviendo visemas o error propio"""
+        if not isinstance(item, dict) or not item.get('audio_url'):
+            return {"error": "audio_url requerido"}
+        if item.get('mode') is not None and item['mode'] not in VISEME_MODES:
+            return {"error": f"mode no soportado: {item['mode']}"}
+        try:
+            return self.generate_visemes(
+                item['audio_url'], item.get('text', ''), item.get('mode'), item.get('duration'),
+                item.get('audio_path')
+            )
+        except Exception as e:
+            return {"error": str(e)}
+
+    def generate_visemes_batch(self, items):
+        """
+        Genera visemas para varias locuciones en paralelo.
+
+        Cada elemento se analiza de forma independiente: un fallo en uno no
+        afecta al resto. Los resultados conservan el orden de entrada.
+        """
+        return list(self._executor.map(self._generate_batch_item, items))
+
+class StreamingVisemeSession:
+    """
+    Sesión de generación incremental de visemas a partir de PCM en fragmentos.
+
+    Mantiene entre fragmentos el estado de energía (RMS por ventana, pico de
+    referencia, umbral de énfasis) y de silencio. En cuanto un segmento de voz
+    queda cerrado emite sus visemas con tiempos absolutos, reutilizando la
+    lógica de fonemas y anti-duplicación de VisemeGenerator.
+    """
+
+    def __init__(self, generator, text="", sample_rate=24000, sample_width=2):
+        if sample_width != 2:
+            raise ValueError("Solo se soporta PCM de 16 bits")
+        if sample_rate <= 0:
+            raise ValueError("sample_rate inválido")
+
+        self.generator = generator
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(round(STREAM_FRAME_SECONDS * sample_rate)))
+        self.hop_length = max(1, int(round(STREAM_HOP_SECONDS * sample_rate)))
+        self._close_frames = max(1, int(STREAM_SEGMENT_CLOSE_SECONDS * sample_rate / self.hop_length))
+
+        # Texto de referencia (puede llegar por partes)
+        self._text = ""
+        self.phonemes = list(DEFAULT_PHONEMES)
+        self.phoneme_idx = 0
+        self.append_text(text)
+
+        # Estado de audio
+        self._leftover = b""                          # Byte suelto de una muestra partida
+        self._pending = np.zeros(0, dtype=np.float32)  # Muestras de la próxima ventana
+        self._total_samples = 0
+        self._rms_values = []
+        self._ref_rms = 0.0
+
+        # Estado de segmentación
+        self._segment_start = None   # Primera ventana con voz del segmento abierto
+        self._segment_end = None     # Última ventana con voz del segmento abierto
+        self._silent_run = 0
+        self._last_segment_end_time = None
+
+        # Estado anti-duplicación
+        self.last_viseme = None
+        self.viseme_history = []
+        self._last_emitted = None
+
+    @property
+    def duration(self):
+        """Duración del audio recibido hasta ahora (segundos)"""
+        return self._total_samples / self.sample_rate
+
+    def append_text(self, text):
+        """Agrega texto de referencia y recalcula la secuencia de fonemas"""
+        text = (text or "").strip()
+        if not text:
+            return
+        self._text = f"{self._text} {text}".strip()
+        self.phonemes = self.generator.text_to_advanced_phonemes(self._text)
+
+    def feed(self, pcm_bytes):
+        """Procesa un fragmento PCM y devuelve los eventos de visema ya definitivos"""
+        data = self._leftover + bytes(pcm_bytes)
+        usable = len(data) - (len(data) % 2)
+        self._leftover = data[usable:]
+        if not usable:
+            return []
+
+        samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768.0
+        self._total_samples += len(samples)
+        self._pending = np.concatenate([self._pending, samples])
+
+        if len(self._pending) < self.frame_length:
+            return []
+
+        n_frames = 1 + (len(self._pending) - self.frame_length) // self.hop_length
+        windows = np.lib.stride_tricks.sliding_window_view(self._pending, self.frame_length)
+        frames = windows[::self.hop_length][:n_frames]
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        self._pending = self._pending[n_frames * self.hop_length:]
+
+        events = []
+        for value in rms:
+            events.extend(self._process_frame(float(value)))
+        return events
+
+    def finish(self):
+        """Cierra el stream: procesa el audio restante y el segmento abierto"""
+        events = []
+        if len(self._pending):
+            tail = np.pad(self._pending, (0, self.frame_length - len(self._pending)))
+            events.extend(self._process_frame(float(np.sqrt(np.mean(tail ** 2)))))
+            self._pending = np.zeros(0, dtype=np.float32)
+
+        if self._segment_start is not None:
+            events.extend(self._close_segment())
+        elif self._last_segment_end_time is None and self._rms_values:
+            # Sin voz detectada: repartir fonemas sobre la duración completa
+            events.extend(self._emit_span(0.0, self.duration, self.phonemes))
+
+        print(f"✅ Stream cerrado: {self.duration:.2f}s de audio")
+        return events
+
+    def _process_frame(self, value):
+        """Actualiza energía y silencio con una ventana nueva"""
+        frame_idx = len(self._rms_values)
+        self._rms_values.append(value)
+        self._ref_rms = max(self._ref_rms, value)
+
+        threshold = self._ref_rms * (10 ** (-STREAM_TOP_DB / 20))
+        if value > 0 and value > threshold:
+            if self._segment_start is None:
+                self._segment_start = frame_idx
+            self._segment_end = frame_idx
+            self._silent_run = 0
+            return []
+
+        if self._segment_start is None:
+            return []
+
+        self._silent_run += 1
+        if self._silent_run >= self._close_frames:
+            return self._close_segment()
+        return []
+
+    def _frame_time(self, frame_idx):
+        """Tiempo (s) del centro de una ventana, como las ventanas centradas de librosa"""
+        return (frame_idx * self.hop_length + self.frame_length / 2) / self.sample_rate
+
+    def _close_segment(self):
+        """Emite los visemas de un segmento de voz ya cerrado"""
+        start_time = self._frame_time(self._segment_start)
+        end_time = self._frame_time(self._segment_end + 1)
+        self._segment_start = None
+        self._segment_end = None
+        self._silent_run = 0
+
+        events = []
+        # Pausa significativa desde el segmento anterior
+        if self._last_segment_end_time is not None:
+            silence_duration = start_time - self._last_segment_end_time
+            if silence_duration > STREAM_PAUSE_SECONDS:
+                silence_time = round(self._last_segment_end_time + silence_duration / 2, 2)
+                events.extend(self._emit("neutral", silence_time))
+                self.viseme_history.clear()
+                self.last_viseme = "neutral"
+        self._last_segment_end_time = end_time
+
+        interval_duration = end_time - start_time
+        phonemes_per_interval = max(1, min(4, int(interval_duration * 3)))  # ~3 fonemas por segundo
+        current_phonemes = self.phonemes[self.phoneme_idx:self.phoneme_idx + phonemes_per_interval]
+        self.phoneme_idx += phonemes_per_interval
+
+        if not current_phonemes:  # Si se acabaron los fonemas, usar vocales
+            current_phonemes = ['a']
+
+        events.extend(self._emit_span(start_time, interval_duration, current_phonemes))
+        return events
+
+    def _emit_span(self, start_time, span_duration, phonemes):
+        """Reparte fonemas sobre un tramo y genera sus visemas"""
+        events = []
+        if not phonemes:
+            return events
+
+        emphasis_threshold = np.percentile(self._rms_values, 75) if self._rms_values else 0.0
+        phoneme_duration = span_duration / len(phonemes)
+
+        for i, phoneme in enumerate(phonemes):
+            tiempo = round(start_time + (i * phoneme_duration), 2)
+
+            frame_idx = max(0, int((tiempo * self.sample_rate - self.frame_length / 2) / self.hop_length))
+            if self._rms_values:
+                energy = self._rms_values[min(frame_idx, len(self._rms_values) - 1)]
+            else:
+                energy = 0.5
+            is_emphasized = energy > emphasis_threshold
+
+            viseme = self.generator._generate_smart_viseme(
+                phoneme, self.last_viseme, self.viseme_history, is_emphasized
+            )
+            events.extend(self._emit(viseme, tiempo))
+
+            self.generator._update_viseme_history(self.viseme_history, viseme)
+            self.last_viseme = viseme
+
+        return events
+
+    def _emit(self, viseme, tiempo):
+        """Crea el evento aplicando el mismo filtro que _post_process_visemes"""
+        if (self._last_emitted and
+            self._last_emitted["visema"] == viseme and
+            abs(self._last_emitted["tiempo"] - tiempo) < 0.1):
+            return []
+
+        event = {"type": "visema", "visema": str(viseme), "tiempo": tiempo}
+        self._last_emitted = event
+        return [event]
+
 # Inicializar generador una sola vez (evita cold starts)
 viseme_generator = VisemeGenerator()
 
+# Perfilado bajo demanda (/debug/*, solo con PROFILING_TOKEN) y pilas con SIGUSR1
+profiler = Profiler(os.getenv("PROFILING_DIR"), name="visemas")
+register_profiling(app, profiler, os.getenv("PROFILING_TOKEN"))
+profiler.install_signal_handler()
+
+# Warm-up: la primera llamada a librosa compila (numba) y carga módulos perezosos;
+# se paga al arrancar, en segundo plano, y /health no responde 200 hasta terminar
+VISEMAS_WARMUP = os.getenv("VISEMAS_WARMUP", "1") == "1"
+warmup_done = threading.Event()
+warmup_state = {"seconds": None, "error": None}
+
+def warm_up():
+    """Ejecuta el análisis completo (load, split, rms) sobre audio sintético"""
+    start = time.perf_counter()
+    sample_rate = 24000
+    t = np.arange(int(1.5 * sample_rate)) / sample_rate
+    voiced = (t % 0.5) < 0.35  # Sílabas separadas por silencios
+    pcm = (0.5 * np.sin(2 * np.pi * 150 * t) * voiced * 32767).astype(np.int16).tobytes()
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + len(pcm), b"WAVE", b"fmt ",
+        16, 1, 1, sample_rate, sample_rate * 2, 2, 16, b"data", len(pcm)
+    )
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header + pcm)
+        viseme_generator.estimate_phonemes_from_audio(path, "hola")
+    finally:
+        os.remove(path)
+    return time.perf_counter() - start
+
+def _run_warmup():
+    try:
+        warmup_state["seconds"] = round(warm_up(), 2)
+        print(f"🔥 Warm-up completado en {warmup_state['seconds']}s")
+    except Exception as e:
+        # Un fallo en el warm-up no debe dejar el servicio fuera: la primera petición pagará el coste
+        warmup_state["error"] = str(e)
+        print(f"⚠️ Error en warm-up: {e}")
+    finally:
+        warmup_done.set()
+
+if VISEMAS_WARMUP:
+    threading.Thread(target=_run_warmup, name="visemas-warmup", daemon=True).start()
+else:
+    warmup_done.set()
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Endpoint de health check"""
-    return jsonify({"status": "healthy", "service": "visemas_service"})
+    """Endpoint de health check (503 mientras dura el warm-up)"""
+    if not warmup_done.is_set():
+        return jsonify({"status": "warming_up", "service": "visemas_service"}), 503
+    return jsonify({"status": "healthy", "service": "visemas_service", "warmup": warmup_state})
 
 @app.route('/generate', methods=['POST'])
 def generate_visemes():
@@ -443,7 +1003,12 @@ def generate_visemes():
     Body JSON:
     {
         "audio_url": "http://example.com/audio.wav",
-        "text": "Hola mundo"
+        "text": "Hola mundo",
+        "format": "compact-v1",     (opcional)
+        "mode": "auto",             (opcional: audio | text | auto, default VISEMAS_MODE)
+        "duration": 1.84,           (opcional, segundos; evita leer la cabecera en modo text)
+        "audio_path": "/dev/shm/tiendapago-audio/abc.wav"
+                                    (opcional; dentro de VISEMAS_SHARED_AUDIO_DIR se lee sin HTTP)
     }
     
     Response:
@@ -453,6 +1018,11 @@ def generate_visemes():
             {"visema": "neutral", "tiempo": 0.5}
         ]
     }
+
+    Response con "format": "compact-v1":
+    {
+        "visemas_compact": {"format": "compact-v1", "v": [1, 0], "t": [0, 500]}
+    }
     """
     try:
         data = request.get_json()
@@ -462,18 +1032,145 @@ def generate_visemes():
         
         audio_url = data.get('audio_url')
         text = data.get('text', '')
+        response_format = data.get('format', 'json')
+        mode = data.get('mode')
+        duration = data.get('duration')
+        audio_path = data.get('audio_path')
         
         if not audio_url:
             return jsonify({"error": "audio_url requerido"}), 400
+
+        if response_format not in ('json', COMPACT_FORMAT):
+            return jsonify({"error": f"format no soportado: {response_format}"}), 400
+
+        if mode is not None and mode not in VISEME_MODES:
+            return jsonify({"error": f"mode no soportado: {mode}"}), 400
         
         # Generar visemas usando el generador inicializado
-        result = viseme_generator.generate_visemes(audio_url, text)
+        result = viseme_generator.generate_visemes(audio_url, text, mode, duration, audio_path)
         
-        return jsonify(result)
+        return jsonify(format_visemes_result(result, response_format))
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/generate_batch', methods=['POST'])
+def generate_visemes_batch():
+    """
+    Genera visemas para varias locuciones en una sola petición
+
+    Body JSON:
+    {
+        "items": [
+            {"audio_url": "http://example.com/a.wav", "text": "Hola"},
+            {"audio_url": "http://example.com/b.wav", "text": "Mundo"}
+        ]
+    }
+
+    Response (mismo orden que items):
+    {
+        "results": [
+            {"visemas": [{"visema": "aa", "tiempo": 0.0}]},
+            {"error": "Error generando visemas: ..."}
+        ]
+    }
+
+    Con "format": "compact-v1" cada resultado correcto trae "visemas_compact".
+    "mode" (audio | text | auto) se acepta a nivel de petición o por item,
+    igual que "duration" y "audio_path" por item.
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('items'), list):
+            return jsonify({"error": "items (lista) requerido"}), 400
+
+        items = data['items']
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({"error": f"máximo {BATCH_MAX_ITEMS} items por petición"}), 400
+
+        response_format = data.get('format', 'json')
+        if response_format not in ('json', COMPACT_FORMAT):
+            return jsonify({"error": f"format no soportado: {response_format}"}), 400
+
+        mode = data.get('mode')
+        if mode is not None and mode not in VISEME_MODES:
+            return jsonify({"error": f"mode no soportado: {mode}"}), 400
+        if mode is not None:
+            items = [{"mode": mode, **item} if isinstance(item, dict) else item for item in items]
+
+        results = [
+            format_visemes_result(result, response_format)
+            for result in viseme_generator.generate_visemes_batch(items)
+        ]
+
+        return jsonify({"results": results})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@sock.route('/stream')
+def stream_visemes(ws):
+    """
+    Genera visemas en streaming a medida que llega el audio (WebSocket)
+
+    Mensajes del cliente:
+    {"type": "start", "text": "Hola", "sample_rate": 24000, "sample_width": 2}
+    <binario>  PCM mono little-endian en fragmentos
+    {"type": "text", "text": "mundo"}   (opcional, texto incremental)
+    {"type": "end"}
+
+    Mensajes del servidor:
+    {"type": "visema", "visema": "aa", "tiempo": 0.52}   (tiempo absoluto)
+    {"type": "end", "duration": 1.84}
+    {"type": "error", "error": "..."}
+    """
+    session = None
+    try:
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+
+            if isinstance(message, (bytes, bytearray)):
+                if session is None:
+                    raise ValueError("Se requiere mensaje start antes del audio")
+                for event in session.feed(message):
+                    ws.send(json.dumps(event))
+                continue
+
+            data = json.loads(message)
+            msg_type = data.get('type')
+
+            if msg_type == 'start':
+                session = StreamingVisemeSession(
+                    viseme_generator,
+                    text=data.get('text', ''),
+                    sample_rate=int(data.get('sample_rate', 24000)),
+                    sample_width=int(data.get('sample_width', 2))
+                )
+            elif session is None:
+                raise ValueError("Se requiere mensaje start")
+            elif msg_type == 'text':
+                session.append_text(data.get('text', ''))
+            elif msg_type == 'end':
+                for event in session.finish():
+                    ws.send(json.dumps(event))
+                ws.send(json.dumps({"type": "end", "duration": round(session.duration, 2)}))
+                break
+            else:
+                raise ValueError(f"Tipo de mensaje desconocido: {msg_type}")
+
+    except Exception as e:
+        print(f"❌ Error en stream de visemas: {e}")
+        try:
+            ws.send(json.dumps({"type": "error", "error": str(e)}))
+        except Exception:
+            pass
+
 if __name__ == '__main__':
     print("🎭 Iniciando servicio de visemas en puerto 5001...")
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+    # VISEMAS_DEBUG=1 activa el modo debug; su recargador importa todo dos veces
+    if VISEMAS_SOCKET:
+        serve_unix_socket(app, VISEMAS_SOCKET)
+    app.run(host='0.0.0.0', port=5001, debug=os.getenv("VISEMAS_DEBUG") == "1", threaded=True)
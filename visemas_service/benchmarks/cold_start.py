@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: arranque en frío del servicio de visemas
+
+Uso:
+    python benchmarks/cold_start.py [--runs 3]
+
+Cada escenario corre en un proceso nuevo y mide:
+- import: tiempo de `import app` (librosa, numba, Flask...)
+- ready: desde el inicio del proceso hasta que /health responde 200
+- 1ª petición: latencia de la primera llamada a /generate en modo audio (audio servido en local)
+- 2ª petición: latencia de una segunda llamada, ya caliente
+
+Escenarios:
+- sin warm-up (VISEMAS_WARMUP=0), caché numba vacía
+- warm-up, caché numba vacía (primer arranque de una imagen sin caché)
+- warm-up, caché numba poblada (réplicas siguientes / imagen con caché horneada)
+"""
+
+import argparse
+import http.server
+import json
+import math
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXT = "Hola, bienvenido a Tienda Pago. ¿En qué te puedo ayudar hoy?"
+
+
+def synthetic_speech_wav(seconds: float = 3.0, sample_rate: int = 24000) -> bytes:
+    """WAV 16 bits mono con sílabas sintéticas (tono modulado) separadas por silencios"""
+    samples = []
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        voiced = (t % 0.5) < 0.35
+        envelope = math.sin(math.pi * (t % 0.5) / 0.35) if voiced else 0.0
+        value = envelope * 0.6 * math.sin(2 * math.pi * (140 + 40 * math.sin(2 * math.pi * 3 * t)) * t)
+        samples.append(int(value * 32767))
+    pcm = struct.pack(f"<{len(samples)}h", *samples)
+    fmt = struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+    return b"RIFF" + struct.pack("<I", 36 + len(pcm)) + b"WAVEfmt " + fmt + b"data" + struct.pack("<I", len(pcm)) + pcm
+
+
+def child():
+    """Proceso medido: importa app, espera /health y hace dos peticiones"""
+    process_start = float(os.environ["BENCH_PROCESS_START"])
+    wav = synthetic_speech_wav()
+
+    class AudioHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/wav")
+            self.send_header("Content-Length", str(len(wav)))
+            self.end_headers()
+            self.wfile.write(wav)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), AudioHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    audio_url = f"http://127.0.0.1:{server.server_address[1]}/audio.wav"
+
+    sys.path.insert(0, SERVICE_DIR)
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")  # logs del servicio
+
+    start = time.perf_counter()
+    import app
+    import_seconds = time.perf_counter() - start
+
+    client = app.app.test_client()
+    while client.get("/health").status_code != 200:
+        time.sleep(0.01)
+    ready_seconds = time.time() - process_start
+
+    latencies = []
+    for _ in range(2):
+        start = time.perf_counter()
+        response = client.post("/generate", json={"audio_url": audio_url, "text": TEXT, "mode": "audio"})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    sys.stdout = stdout
+    print(json.dumps({"import": import_seconds, "ready": ready_seconds, "first": latencies[0], "second": latencies[1]}))
+    os._exit(0)
+
+
+def run_scenario(env_overrides: dict) -> dict:
+    env = {**os.environ, **env_overrides, "BENCH_PROCESS_START": repr(time.time())}
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        env=env, capture_output=True, text=True, cwd=SERVICE_DIR, check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque en frío del servicio de visemas")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    scenarios = []
+    for run in range(args.runs):
+        cold_cache = tempfile.mkdtemp(prefix="numba_cold_")
+        warm_cache = tempfile.mkdtemp(prefix="numba_warm_")
+        # Poblar la caché "caliente" con un arranque previo
+        run_scenario({"VISEMAS_WARMUP": "1", "NUMBA_CACHE_DIR": warm_cache})
+        scenarios.append(("sin warm-up, caché vacía", run_scenario(
+            {"VISEMAS_WARMUP": "0", "NUMBA_CACHE_DIR": tempfile.mkdtemp(prefix="numba_none_")})))
+        scenarios.append(("warm-up, caché vacía", run_scenario(
+            {"VISEMAS_WARMUP": "1", "NUMBA_CACHE_DIR": cold_cache})))
+        scenarios.append(("warm-up, caché poblada", run_scenario(
+            {"VISEMAS_WARMUP": "1", "NUMBA_CACHE_DIR": warm_cache})))
+
+    print(f"{'escenario':<26} {'import':>8} {'ready':>8} {'1ª pet.':>9} {'2ª pet.':>9}")
+    for name in dict.fromkeys(name for name, _ in scenarios):
+        rows = [result for scenario, result in scenarios if scenario == name]
+        mean = {key: sum(row[key] for row in rows) / len(rows) for key in rows[0]}
+        print(f"{name:<26} {mean['import']:>7.2f}s {mean['ready']:>7.2f}s "
+              f"{mean['first'] * 1000:>7.0f}ms {mean['second'] * 1000:>7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark: modo rápido (texto + duración) frente al análisis de audio
+
+Uso:
+    python benchmarks/fast_mode.py [--runs 20]
+    python benchmarks/fast_mode.py --wav respuesta.wav --text "Texto de la respuesta"
+
+Para cada texto sirve un WAV en local (con soporte de Range, como /voice del
+servicio TTS) y mide la latencia de generate_visemes en modo "audio" (descarga
+y librosa), en modo "text" (solo cabecera WAV) y en modo "text" con la duración
+ya conocida (text+dur, sin red). Después compara ambas salidas:
+
+- acuerdo: fracción de instantes (cada 10 ms) en los que el visema activo coincide
+- acuerdo abierta/cerrada: igual, pero solo distinguiendo boca cerrada (neutral) o no
+- desfase: distancia media de cada cambio de visema del análisis de audio al
+  cambio más cercano del modo texto
+
+Sin --wav se usa audio sintético (sílabas de tono modulado) con una duración
+proporcional al texto; con voz real la divergencia es más representativa.
+"""
+
+import argparse
+import http.server
+import os
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+os.environ.setdefault("VISEMAS_WARMUP", "0")
+
+from cold_start import synthetic_speech_wav
+
+TEXTS = [
+    "Hola, ¿cómo está?",
+    "Claro, con gusto le ayudo.",
+    "Guarde el cinco por ciento de sus ganancias cada semana.",
+    "Para pagar a sus proveedores abra la aplicación, elija el pedido y confirme el monto.",
+    "Entiendo su preocupación. Le recomiendo separar el dinero del negocio del dinero de la casa, "
+    "llevar un registro diario de ventas y gastos, y revisar cada viernes cuánto le queda para reponer inventario.",
+]
+# Velocidad aproximada de la voz TTS (caracteres por segundo) para el audio sintético
+CHARS_PER_SECOND = 14
+FRAME_SECONDS = 0.01
+
+
+def serve_files(files: dict) -> str:
+    """Servidor HTTP local con soporte de Range; devuelve la URL base"""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = files[self.path.lstrip("/")]
+            status, headers = 200, {}
+            requested = self.headers.get("Range", "")
+            if requested.startswith("bytes="):
+                start, _, end = requested[6:].partition("-")
+                start, end = int(start), min(int(end or len(body) - 1), len(body) - 1)
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+                status, body = 206, body[start:end + 1]
+            self.send_response(status)
+            self.send_header("Content-Type", "audio/wav")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def active_visemes(visemes: list, duration: float) -> list:
+    """Visema activo en cada instante de FRAME_SECONDS"""
+    frames, index, current = [], 0, "neutral"
+    for step in range(int(duration / FRAME_SECONDS)):
+        now = step * FRAME_SECONDS
+        while index < len(visemes) and visemes[index]["tiempo"] <= now:
+            current = visemes[index]["visema"]
+            index += 1
+        frames.append(current)
+    return frames
+
+
+def change_times(visemes: list) -> list:
+    times, previous = [], None
+    for item in visemes:
+        if item["visema"] != previous:
+            times.append(item["tiempo"])
+            previous = item["visema"]
+    return times
+
+
+def divergence(audio: list, text: list, duration: float) -> dict:
+    audio_frames, text_frames = active_visemes(audio, duration), active_visemes(text, duration)
+    frames = max(len(audio_frames), 1)
+    agreement = sum(a == t for a, t in zip(audio_frames, text_frames)) / frames
+    open_closed = sum((a == "neutral") == (t == "neutral") for a, t in zip(audio_frames, text_frames)) / frames
+    text_changes = change_times(text) or [0.0]
+    offsets = [min(abs(t - other) for other in text_changes) for t in change_times(audio)]
+    return {
+        "agreement": agreement,
+        "open_closed": open_closed,
+        "offset": statistics.mean(offsets) if offsets else 0.0,
+    }
+
+
+def time_mode(generator, url: str, text: str, mode: str, runs: int, duration: float = None) -> tuple:
+    latencies, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = generator.generate_visemes(url, text, mode=mode, duration=duration)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies), result["visemas"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modo texto + duración frente a análisis de audio")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--wav", help="WAV real a comparar (requiere --text)")
+    parser.add_argument("--text", help="Texto de la locución de --wav")
+    args = parser.parse_args()
+
+    if args.wav:
+        if not args.text:
+            parser.error("--wav requiere --text")
+        with open(args.wav, "rb") as f:
+            cases = [(args.text, f.read())]
+    else:
+        cases = [(text, synthetic_speech_wav(max(1.0, len(text) / CHARS_PER_SECOND))) for text in TEXTS]
+
+    base_url = serve_files({f"{i}.wav": wav for i, (_, wav) in enumerate(cases)})
+
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")  # logs del generador
+    try:
+        import app
+        generator = app.viseme_generator
+        rows = []
+        for i, (text, wav) in enumerate(cases):
+            url = f"{base_url}/{i}.wav"
+            time_mode(generator, url, text, "audio", 1)  # calentar librosa
+            np.random.seed(0)
+            audio_seconds, audio_visemes = time_mode(generator, url, text, "audio", args.runs)
+            np.random.seed(0)
+            text_seconds, text_visemes = time_mode(generator, url, text, "text", args.runs)
+            duration = generator.read_audio_duration(url)
+            known_seconds, _ = time_mode(generator, url, text, "text", args.runs, duration)
+            rows.append((text, duration, audio_seconds, text_seconds, known_seconds, len(audio_visemes), len(text_visemes),
+                         divergence(audio_visemes, text_visemes, duration)))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"{'chars':>5} {'dur.':>6} {'audio':>9} {'text':>8} {'text+dur':>9} {'speedup':>8} "
+          f"{'visemas a/t':>11} {'acuerdo':>8} {'abierta/cerrada':>15} {'desfase':>8}")
+    for text, duration, audio_seconds, text_seconds, known_seconds, audio_count, text_count, diff in rows:
+        print(f"{len(text):>5} {duration:>5.2f}s {audio_seconds * 1000:>7.1f}ms {text_seconds * 1000:>6.2f}ms "
+              f"{known_seconds * 1000:>7.2f}ms {audio_seconds / text_seconds:>7.0f}x {audio_count:>5}/{text_count:<5} "
+              f"{diff['agreement']:>7.0%} {diff['open_closed']:>15.0%} {diff['offset'] * 1000:>6.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
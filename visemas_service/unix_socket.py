@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Transporte HTTP por Unix domain socket entre servicios del mismo pod
+
+- Servidor: serve_unix_socket() atiende la app Flask en un socket Unix además
+  del puerto TCP (los health checks siguen por TCP)
+- URLs: http+unix://<ruta del socket codificada>/<path>, p. ej.
+  http+unix://%2Frun%2Ftiendapago%2Ftts.sock/voice/abc.wav (convención de
+  requests-unixsocket). Las respuestas a peticiones llegadas por el socket
+  usan esta forma (base_url), así el consumidor sigue sin pasar por TCP
+- Cliente: unix_socket_session() es una sesión requests que además entiende
+  URLs http+unix://
+"""
+
+import os
+import socket
+import threading
+from urllib.parse import quote, unquote, urlparse
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from werkzeug.serving import make_server
+
+UNIX_SCHEME = "http+unix"
+# Clave del entorno WSGI con la ruta del socket por el que llegó la petición
+ENVIRON_KEY = "unix_socket.path"
+
+
+def unix_socket_url(socket_path: str) -> str:
+    """URL base http+unix:// de un socket"""
+    return f"{UNIX_SCHEME}://{quote(socket_path, safe='')}"
+
+
+def base_url(environ: dict):
+    """URL base para responder a una petición llegada por socket Unix (None si llegó por TCP)"""
+    socket_path = environ.get(ENVIRON_KEY)
+    return unix_socket_url(socket_path) if socket_path else None
+
+
+def serve_unix_socket(app, socket_path: str, mode: int = 0o660):
+    """
+    Atiende la app en un socket Unix desde un hilo en segundo plano
+
+    Args:
+        app: Aplicación WSGI (Flask)
+        socket_path: Ruta del socket (se reemplaza si ya existe)
+        mode: Permisos del socket (los procesos del pod comparten grupo)
+
+    Returns:
+        Servidor werkzeug (shutdown() para detenerlo)
+    """
+    def wsgi_app(environ, start_response):
+        environ[ENVIRON_KEY] = socket_path
+        return app(environ, start_response)
+
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    server = make_server(f"unix://{socket_path}", 0, wsgi_app, threaded=True)
+    os.chmod(socket_path, mode)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🔌 Escuchando en socket Unix {socket_path}")
+    return server
+
+
+class _UnixHTTPConnection(urllib3.connection.HTTPConnection):
+    def __init__(self, *args, socket_path: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+
+class _UnixHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _UnixHTTPConnection
+
+    def __init__(self, socket_path: str, **kwargs):
+        super().__init__("localhost", **kwargs)
+        self.conn_kw["socket_path"] = socket_path
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """Adaptador requests para URLs http+unix://"""
+
+    def __init__(self, **kwargs):
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        socket_path = unquote(urlparse(request.url).netloc)
+        with self._pools_lock:
+            if socket_path not in self._pools:
+                self._pools[socket_path] = _UnixHTTPConnectionPool(socket_path, maxsize=self._pool_maxsize)
+            return self._pools[socket_path]
+
+    def request_url(self, request, proxies):
+        return request.path_url
+
+    def close(self):
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+        super().close()
+
+
+def unix_socket_session() -> requests.Session:
+    """Sesión requests para URLs http(s):// y http+unix://"""
+    session = requests.Session()
+    session.mount(f"{UNIX_SCHEME}://", UnixSocketAdapter())
+    return session
@@ -311,7 +311,11 @@ export function useAudioPlayback(options: PlaybackOptions = {}) {
   const setupVisemaSync = (visemas: Visema[]): void => {
     // Sort visemas by time
     const sortedVisemas = [...visemas].sort((a, b) => a.tiempo - b.tiempo)
-    let currentVisemaIndex = 0
+    // Visemas arriving after playback started (protocol v2): skip the ones already past
+    let currentVisemaIndex = sortedVisemas.findIndex(visema => visema.tiempo >= state.value.currentTime)
+    if (currentVisemaIndex === -1) {
+      return
+    }
 
     const checkVisemas = () => {
       const currentTime = state.value.currentTime
@@ -338,6 +342,15 @@ export function useAudioPlayback(options: PlaybackOptions = {}) {
     requestAnimationFrame(checkVisemas)
   }
 
+  /**
+   * Attach visemas to the audio currently playing (protocol v2 visemas frame)
+   */
+  const attachVisemas = (visemas: Visema[]): void => {
+    if (state.value.isPlaying && visemas.length > 0) {
+      setupVisemaSync(visemas)
+    }
+  }
+
   /**
    * Start time updates
    */
@@ -457,6 +470,7 @@ export function useAudioPlayback(options: PlaybackOptions = {}) {
     loadAudio,
     playAudio,
     playAudioFromBase64,
+    attachVisemas,
     stop,
     pause,
     resume,
@@ -642,8 +642,9 @@ export function useAvatarRenderer(container: Ref<HTMLElement | undefined>, confi
 
   /**
    * Play visemas sequence with smooth transitions (like AvatarDemo.vue)
+   * offsetSeconds: audio already played when the visemas arrive (protocol v2)
    */
-  const playVisemas = (visemas: Visema[]): void => {
+  const playVisemas = (visemas: Visema[], offsetSeconds: number = 0): void => {
     if (!vrm?.expressionManager) {
       console.warn('Expression manager not available for visemas')
       return
@@ -651,18 +652,19 @@ export function useAvatarRenderer(container: Ref<HTMLElement | undefined>, confi
 
 
     // Launch smooth visema animation asynchronously
-    animateVisemasSmooth(visemas)
+    animateVisemasSmooth(visemas, offsetSeconds)
   }
 
   /**
    * Animate visemas with smooth transitions (async version like AvatarDemo.vue)
    */
-  const animateVisemasSmooth = async (visemas: Visema[]): Promise<void> => {
+  const animateVisemasSmooth = async (visemas: Visema[], offsetSeconds: number = 0): Promise<void> => {
     if (!vrm?.expressionManager) return
 
-    const startTime = Date.now()
+    const startTime = Date.now() - offsetSeconds * 1000
+    const pending = offsetSeconds > 0 ? visemas.filter(visemaData => visemaData.tiempo >= offsetSeconds) : visemas
 
-    for (const visemaData of visemas) {
+    for (const visemaData of pending) {
       const targetTime = visemaData.tiempo * 1000
       const currentTime = Date.now() - startTime
 
@@ -12,7 +12,8 @@ import type {
   AnimationsResponse,
   CompleteResponse,
   ResponseStatus,
-  ServerErrorResponse
+  ServerErrorResponse,
+  VisemasFrame
 } from '@/types/waifu-protocol'
 import {
   isFastOutputResponse,
@@ -20,7 +21,9 @@ import {
   isExpressionsResponse,
   isAnimationsResponse,
   isServerHeartbeat,
-  isServerErrorResponse
+  isServerErrorResponse,
+  isVisemasFrame,
+  decodeCompactVisemas
 } from '@/types/waifu-protocol'
 
 export function useResponseCoordinator() {
@@ -39,6 +42,7 @@ export function useResponseCoordinator() {
   const fastOutputCallbacks = new Set<(response: FastOutputResponse) => void>()
   const completeResponseCallbacks = new Set<(response: CompleteResponse) => void>()
   const errorCallbacks = new Set<(response: ServerErrorResponse) => void>()
+  const visemasCallbacks = new Set<(response: VisemasFrame) => void>()
 
   /**
    * Process incoming server response
@@ -55,6 +59,19 @@ export function useResponseCoordinator() {
       return
     }
 
+    // Expand compact visemas so the rest of the pipeline sees the classic list
+    if (typeof response === 'object' && response !== null && 'visemas_compact' in response) {
+      const compactResponse = response as AudioVisemaResponse
+      compactResponse.visemas = decodeCompactVisemas(compactResponse.visemas_compact!)
+      delete compactResponse.visemas_compact
+    }
+
+    // Protocol v2: visemas for an audio that is already playing
+    if (isVisemasFrame(response)) {
+      visemasCallbacks.forEach(callback => callback(response))
+      return
+    }
+
     // Handle fast output response (no message_id)
     if (isFastOutputResponse(response)) {
       handleFastOutput(response)
@@ -98,6 +115,11 @@ export function useResponseCoordinator() {
    * Handle audio + visemas response
    */
   const handleAudioVisemaResponse = (response: AudioVisemaResponse): void => {
+    // Protocol v2: play the audio now, visemas come in their own frame
+    if (response.visemas_pending || !response.visemas) {
+      response.visemas = []
+    }
+
     const completeResponse = getOrCreateCompleteResponse(response.message_id)
     completeResponse.audio = response
 
@@ -231,6 +253,17 @@ export function useResponseCoordinator() {
     }
   }
 
+  /**
+   * Subscribe to protocol v2 visemas frames
+   */
+  const onVisemas = (callback: (response: VisemasFrame) => void): (() => void) => {
+    visemasCallbacks.add(callback)
+
+    return () => {
+      visemasCallbacks.delete(callback)
+    }
+  }
+
   /**
    * Subscribe to server error responses
    */
@@ -279,6 +312,7 @@ export function useResponseCoordinator() {
     fastOutputCallbacks.clear()
     completeResponseCallbacks.clear()
     errorCallbacks.clear()
+    visemasCallbacks.clear()
 
     stats.totalFastOutputs = 0
     stats.totalCompleteResponses = 0
@@ -301,6 +335,7 @@ export function useResponseCoordinator() {
     // Event subscriptions
     onFastOutput,
     onCompleteResponse,
+    onVisemas,
     onServerError
   }
 }
@@ -10,7 +10,7 @@ import type {
   ConnectionState,
   WaifuConfig
 } from '@/types/waifu-protocol'
-import { DEFAULT_CONFIG } from '@/types/waifu-protocol'
+import { DEFAULT_CONFIG, COMPACT_VISEMAS_FORMAT, PROTOCOL_VERSION } from '@/types/waifu-protocol'
 
 export function useWebSocket(config: Partial<WaifuConfig> = {}) {
   // Merge with default config
@@ -80,7 +80,9 @@ export function useWebSocket(config: Partial<WaifuConfig> = {}) {
 
     const clientMessage: ClientMessage = {
       message,
-      id: messageId || generateMessageId()
+      id: messageId || generateMessageId(),
+      visemas_format: COMPACT_VISEMAS_FORMAT,
+      protocol: PROTOCOL_VERSION
     }
 
     ws.send(JSON.stringify(clientMessage))
@@ -8,8 +8,16 @@
 export interface ClientMessage {
   message: string
   id: string
+  visemas_format?: VisemasFormat  // Formato de visemas aceptado por el cliente
+  protocol?: number  // Versión de frames que entiende el cliente (sin ella: v1)
 }
 
+/**
+ * Frame protocol version understood by this client
+ * v1: one frame with audio + visemas; v2: audio frame first, visemas frame later
+ */
+export const PROTOCOL_VERSION = 2
+
 export type ClientHeartbeat = 'alive'
 
 export type ClientRequest = ClientMessage | ClientHeartbeat
@@ -21,6 +29,22 @@ export interface Visema {
   visema: string
 }
 
+/**
+ * Compact columnar visemas (compact-v1)
+ * v: indices into VISEMA_CODES, t: milliseconds; equal consecutive visemas are merged
+ */
+export interface CompactVisemas {
+  format: 'compact-v1'
+  v: number[]
+  t: number[]
+}
+
+export type VisemasFormat = 'compact-v1'
+
+export const COMPACT_VISEMAS_FORMAT: VisemasFormat = 'compact-v1'
+
+export const VISEMA_CODES = ['neutral', 'aa', 'ee', 'ih', 'oh', 'ou'] as const
+
 export interface Expression {
   expresion: string
   tiempo: number
@@ -62,7 +86,23 @@ export interface FastOutputResponse {
 export interface AudioVisemaResponse {
   audio_url: string
   visemas: Visema[]
+  visemas_compact?: CompactVisemas
+  message_id: string
+  type?: 'audio'  // Protocol v2
+  protocol?: number
+  visemas_pending?: boolean  // Protocol v2: visemas arrive later in a VisemasFrame
+}
+
+/**
+ * Protocol v2 - Visemas for an audio already sent (same message_id)
+ * Start them at the current playback position of that audio
+ */
+export interface VisemasFrame {
+  type: 'visemas'
+  protocol: number
   message_id: string
+  visemas: Visema[]
+  visemas_compact?: CompactVisemas
 }
 
 /**
@@ -101,6 +141,7 @@ export type ServerHeartbeat = 'alive'
 export type ServerResponse = 
   | FastOutputResponse
   | AudioVisemaResponse  
+  | VisemasFrame
   | ExpressionsResponse
   | AnimationsResponse
   | ServerErrorResponse
@@ -171,6 +212,13 @@ export function isAudioVisemaResponse(response: unknown): response is AudioVisem
   return typeof response === 'object' && response !== null && 'audio_url' in response && 'visemas' in response && 'message_id' in response
 }
 
+/**
+ * Type guard for protocol v2 Visemas Frame
+ */
+export function isVisemasFrame(response: unknown): response is VisemasFrame {
+  return typeof response === 'object' && response !== null && (response as any).type === 'visemas' && 'message_id' in response
+}
+
 /**
  * Type guard for Expressions Response
  */
@@ -199,6 +247,19 @@ export function isServerHeartbeat(response: unknown): response is ServerHeartbea
   return response === 'alive'
 }
 
+/**
+ * Expand compact-v1 visemas into the classic list format
+ */
+export function decodeCompactVisemas(payload: CompactVisemas): Visema[] {
+  if (payload.format !== COMPACT_VISEMAS_FORMAT) {
+    throw new Error(`Unsupported visemas format: ${payload.format}`)
+  }
+  return payload.v.map((code, index) => ({
+    visema: VISEMA_CODES[code] ?? 'neutral',
+    tiempo: (payload.t[index] ?? 0) / 1000
+  }))
+}
+
 // ============= Configuration =============
 
 export interface WaifuConfig {